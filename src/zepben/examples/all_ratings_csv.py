@@ -7,34 +7,47 @@
 import asyncio
 import json
 import os
+from functools import partial
 import pandas as pd
+import pyarrow as pa
 
-from typing import Dict, Callable, List
-from dataclasses import dataclass
+from typing import Dict, Callable, List, Optional
 from zepben.ewb import connect_with_token, NetworkConsumerClient, Feeder, Tracing, downstream, StepActionWithContextValue, \
     NetworkTraceStep, EnergyConsumer, StepContext, IdentifiedObject, Breaker, Fuse, PowerTransformer, TransformerFunctionKind, TreeNode, EquipmentTreeBuilder, \
-    ConductingEquipment, NetworkTrace, upstream, IncludedEnergizedContainers, Conductor, Switch
+    ConductingEquipment, NetworkTrace, upstream, IncludedEnergizedContainers, Conductor, Switch, NetworkService
+
+from zepben.examples.columnar_dataset import ColumnarDatasetWriter
+from zepben.examples.feeder_fetch_pool import FeederFetchPool
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache
 
 """
 This is a small script which can be configured to run concurrently to create CSVs of ratings for conductors, transformers, and switches in the network.
-Results are output as a CSV per feeder in a ./csvs directory.
+Results are output as a CSV per feeder in a ./csvs directory when processing feeders sequentially, or as a single Parquet dataset in a ./ratings directory,
+partitioned by equipment type, when processing them concurrently.
 """
 
+# Set this to a `FeederSnapshotCache` to only download each feeder from the EWB server once per network model. See feeder_snapshot_cache.py.
+snapshot_cache: Optional[FeederSnapshotCache] = None
 
-@dataclass
-class EquipmentWithRating:
-    mrid: str
-    type: str
-    rating_va: float | int | None
 
+RATINGS_SCHEMA = pa.schema([
+    ("feeder_mrid", pa.string()),
+    ("mrid", pa.string()),
+    ("type", pa.string()),
+    ("rating_va", pa.float64()),
+])
 
-def _get_client():
+
+def _get_channel():
     with open('config.json') as f:
         c = json.load(f)
 
         # Connect to server
-    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
-    return NetworkConsumerClient(channel)
+    return connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+
+
+def _get_client():
+    return NetworkConsumerClient(_get_channel())
 
 
 async def get_feeders(_client=None) -> Dict[str, Feeder]:
@@ -44,7 +57,8 @@ async def get_feeders(_client=None) -> Dict[str, Feeder]:
 
 async def get_feeder_equipment(client: NetworkConsumerClient, feeder_mrid: str) -> None:
     """Get all objects under the feeder, including LV Feeders"""
-    (await client.get_equipment_container(feeder_mrid, include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)).throw_on_error()
+    get_equipment_container = client.get_equipment_container if snapshot_cache is None else partial(snapshot_cache.get_equipment_container, client)
+    (await get_equipment_container(feeder_mrid, include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)).throw_on_error()
 
 
 async def write_ratings(feeder_mrid: str, client=None):
@@ -53,24 +67,32 @@ async def write_ratings(feeder_mrid: str, client=None):
     """
     client = client or _get_client()
     await get_feeder_equipment(client, feeder_mrid)
+    write_csv(ratings_from_network(client.service, feeder_mrid), feeder_mrid)
+
+
+def ratings_from_network(network: NetworkService, feeder_mrid: str) -> Dict[str, List]:
+    """The rating of every transformer, conductor and switch in `network`, as a list of values per column of `RATINGS_SCHEMA`."""
+    mrids = []
+    types = []
+    ratings = []
 
-    equip_with_ratings = []
-    for tx in client.service.objects(PowerTransformer):
-        equip_with_ratings.append(EquipmentWithRating(mrid=tx.mrid, type="PowerTransformer", rating_va=tx.get_end_by_num(1).rated_s))
-    for conductor in client.service.objects(Conductor):
-        if conductor.asset_info is not None:
-            equip_with_ratings.append(EquipmentWithRating(mrid=conductor.mrid, type=type(conductor).__name__, rating_va=conductor.asset_info.rated_current))
-        else:
-            equip_with_ratings.append(EquipmentWithRating(mrid=conductor.mrid, type=type(conductor).__name__, rating_va=None))
+    def add(equipment: IdentifiedObject, rating: float | int | None):
+        mrids.append(equipment.mrid)
+        types.append(type(equipment).__name__)
+        ratings.append(rating)
 
-    for switch in client.service.objects(Switch):
-        equip_with_ratings.append(EquipmentWithRating(mrid=switch.mrid, type=type(switch).__name__, rating_va=switch.rated_current))
+    for tx in network.objects(PowerTransformer):
+        add(tx, tx.get_end_by_num(1).rated_s)
+    for conductor in network.objects(Conductor):
+        add(conductor, conductor.asset_info.rated_current if conductor.asset_info is not None else None)
+    for switch in network.objects(Switch):
+        add(switch, switch.rated_current)
 
-    write_csv(equip_with_ratings, feeder_mrid)
+    return {"feeder_mrid": [feeder_mrid] * len(mrids), "mrid": mrids, "type": types, "rating_va": ratings}
 
 
-def write_csv(equip: List[EquipmentWithRating], feeder_mrid: str):
-    network_objects = pd.DataFrame(equip)
+def write_csv(ratings: Dict[str, List], feeder_mrid: str):
+    network_objects = pd.DataFrame(ratings)
     os.makedirs("csvs", exist_ok=True)
     network_objects.to_csv(f"csvs/{feeder_mrid}_ratings.csv", index=False)
 
@@ -82,28 +104,41 @@ def process_feeders_sequentially():
         Differences between the functions passable as `trace_type` are documented in the relevant docstrings.
         """
         from tqdm import tqdm
-        client = _get_client()
-        feeders = list(await get_feeders(client))
+        channel = _get_channel()
+        feeders = list(await get_feeders(NetworkConsumerClient(channel)))
         # feeders = ["<FEEDER_ID>"] # Uncomment to process just one (or configured) feeder(s).
         for _feeder in tqdm(feeders):
-            await writer(_feeder, client)
+            # Each feeder is fetched into its own client, so it can be snapshotted by the `snapshot_cache` and released once its CSV is written.
+            await writer(_feeder, NetworkConsumerClient(channel))
 
     asyncio.run(main_async(write_ratings))
 
 
-def multi_proc(_feeder):
-    asyncio.run(write_ratings(_feeder))
+def process_feeders_concurrently():
+    async def main_async():
+        """
+        Fetch up to 4 feeders at a time over a single channel, appending the ratings of each one to the ./ratings dataset as it arrives.
+        """
+        from tqdm import tqdm
+        channel = _get_channel()
+        # Get a list of feeders before entering main compute section of script. This will iterate over all feeders in the network.
+        feeders = list(await get_feeders(NetworkConsumerClient(channel)))
 
+        with ColumnarDatasetWriter("ratings", RATINGS_SCHEMA, partition_by=["type"], overwrite=True) as writer, tqdm(total=len(feeders)) as progress:
+            def write_feeder_ratings(feeder_mrid: str, network: NetworkService):
+                writer.write_columns(ratings_from_network(network, feeder_mrid))
 
-def process_feeders_concurrently():
-    # Get a list of feeders before entering main compute section of script. This will iterate over all feeders in the network.
-    feeders = list(asyncio.run(get_feeders()))
+            pool = FeederFetchPool(channel, max_in_flight=4, snapshot_cache=snapshot_cache)
+            results = await pool.run(feeders, write_feeder_ratings, on_progress=lambda _: progress.update())
+
+        # Read the dataset back with e.g. `pd.read_parquet("ratings", filters=[("type", "=", "PowerTransformer")])`.
+
+        for feeder_mrid, error in results.failed.items():
+            print(f"Failed to process {feeder_mrid}: {error}")
 
-    from tqdm.contrib.concurrent import process_map
-    # Parallelise up to half the cores available on your machine
-    process_map(multi_proc, feeders, max_workers=int(os.cpu_count() / 2))
+    asyncio.run(main_async())
 
 
 if __name__ == "__main__":
-    # process_feeders_sequentially() # Uncomment and comment concurrently below to process feeder at a time, note concurrently is resource intensive.
+    # process_feeders_sequentially() # Uncomment and comment concurrently below to process one feeder at a time.
     process_feeders_concurrently()
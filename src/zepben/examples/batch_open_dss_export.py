@@ -0,0 +1,354 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Exports OpenDSS models for every combination of a list of feeders, scenarios and years, and downloads them.
+
+Model generation requests are sent a few at a time, no faster than `submissions_per_second`, and no more than `max_generating` models are left generating on
+EAS at once. Every request is recorded in an `ExportManifest` the moment EAS returns its model id, and every model is recorded again once it has been
+downloaded, so running the same batch again skips the models that were already downloaded and picks up the ones that were still generating, rather than
+asking EAS to generate them again.
+"""
+
+import asyncio
+import itertools
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from zepben.eas import EasClient, Mutation, OpenDssModelInput
+
+from zepben.examples.model_download import ModelDownloader
+from zepben.examples.model_job_poller import ModelJobPoller, ModelJob, ModelJobState, opendss_model_statuses, opendss_model_download_url
+
+__all__ = ["BatchOpenDssExport", "ExportSpec", "ExportManifest", "ManifestEntry", "BatchExportResults", "export_matrix", "DOWNLOADED"]
+
+DOWNLOADED = "DOWNLOADED"
+"""The manifest state of a model that has been downloaded. Every other manifest state is a `ModelJobState` value."""
+
+# Models in these states are still on EAS, so a rerun waits for them instead of requesting them again.
+_RESUMABLE_STATES = {ModelJobState.CREATION.value, ModelJobState.COMPLETED.value, ModelJobState.TIMED_OUT.value, DOWNLOADED}
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    """One model to export."""
+
+    feeder_mrid: str
+    scenario: str
+    year: int
+
+    def model_name(self, prefix: str) -> str:
+        return f"{prefix}-{self.feeder_mrid}-{self.scenario}-{self.year}"
+
+
+def export_matrix(feeder_mrids: Iterable[str], scenarios: Iterable[str], years: Iterable[int]) -> List[ExportSpec]:
+    """Every combination of feeder, scenario and year, grouped by feeder."""
+    return [ExportSpec(*combination) for combination in itertools.product(feeder_mrids, scenarios, years)]
+
+
+@dataclass
+class ManifestEntry:
+    """What is known about the export of one `ExportSpec`."""
+
+    spec: ExportSpec
+    model_name: str
+    model_id: Optional[str]
+    state: str
+    path: Optional[str] = None
+    sha256: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    updated_at: Optional[str] = None
+
+
+class ExportManifest:
+    """
+    A SQLite record of the models requested by a `BatchOpenDssExport`, and which of them have been downloaded.
+
+    :param manifest_file: The SQLite file to store the manifest in. It is created if it does not exist.
+    """
+
+    def __init__(self, manifest_file: Union[Path, str]):
+        self.manifest_file = Path(manifest_file)
+
+        self._connection = sqlite3.connect(self.manifest_file)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS open_dss_exports (
+                feeder_mrid TEXT NOT NULL,
+                scenario TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                model_name TEXT NOT NULL,
+                model_id TEXT,
+                state TEXT NOT NULL,
+                path TEXT,
+                sha256 TEXT,
+                errors TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (feeder_mrid, scenario, year)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def __enter__(self) -> 'ExportManifest':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def get(self, spec: ExportSpec) -> Optional[ManifestEntry]:
+        row = self._connection.execute(
+            "SELECT * FROM open_dss_exports WHERE feeder_mrid = ? AND scenario = ? AND year = ?",
+            (spec.feeder_mrid, spec.scenario, spec.year)
+        ).fetchone()
+        return _entry(row) if row is not None else None
+
+    def entries(self) -> Iterator[ManifestEntry]:
+        for row in self._connection.execute("SELECT * FROM open_dss_exports ORDER BY feeder_mrid, scenario, year"):
+            yield _entry(row)
+
+    def record(self, entry: ManifestEntry):
+        entry.updated_at = datetime.now().isoformat()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO open_dss_exports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry.spec.feeder_mrid, entry.spec.scenario, entry.spec.year, entry.model_name, entry.model_id, entry.state, entry.path, entry.sha256,
+                json.dumps(entry.errors), entry.updated_at
+            )
+        )
+        self._connection.commit()
+
+
+def _entry(row) -> ManifestEntry:
+    feeder_mrid, scenario, year, model_name, model_id, state, path, sha256, errors, updated_at = row
+    return ManifestEntry(ExportSpec(feeder_mrid, scenario, year), model_name, model_id, state, path, sha256, json.loads(errors), updated_at)
+
+
+@dataclass
+class BatchExportResults:
+    """The outcome of a `BatchOpenDssExport.run`."""
+
+    downloaded: List[ExportSpec] = field(default_factory=list)
+    """The models downloaded by this run."""
+
+    skipped: List[ExportSpec] = field(default_factory=list)
+    """The models that had already been downloaded by an earlier run."""
+
+    failed: Dict[ExportSpec, str] = field(default_factory=dict)
+    """Why each model that could not be exported failed."""
+
+
+class BatchOpenDssExport:
+    """
+    Requests, waits for and downloads many OpenDSS models.
+
+    :param eas_client: The client to request the models with. It must have been created with `asynchronous=True`.
+    :param manifest: The manifest to record the progress of each model in.
+    :param model_input: Builds the `OpenDssModelInput` for a model, given its spec and its name.
+    :param host: The host of EAS, as passed to `eas_client`, to download the models from.
+    :param port: The port of EAS, as passed to `eas_client`.
+    :param output_dir: The directory to download the models to. Each model is saved as `<model name>.zip`.
+    :param name_prefix: The prefix of every model name.
+    :param max_concurrent_submissions: The number of model requests that may be waiting on EAS at once.
+    :param submissions_per_second: The most model requests to send per second.
+    :param max_generating: The most models this run may have generating on EAS at once. New requests wait for earlier models to finish. None for no limit.
+    :param poller_options: Keyword arguments for the `ModelJobPoller` that waits for the models, e.g. `timeout`.
+    :param on_progress: Called with the manifest entry of a model every time it changes.
+    :param protocol: The protocol of EAS, as passed to `eas_client`.
+    """
+
+    def __init__(
+        self,
+        eas_client: EasClient,
+        manifest: ExportManifest,
+        model_input: Callable[[ExportSpec, str], OpenDssModelInput],
+        host: str,
+        port: int,
+        output_dir: Union[Path, str] = ".",
+        name_prefix: str = "export",
+        max_concurrent_submissions: int = 4,
+        submissions_per_second: float = 2.0,
+        max_generating: Optional[int] = 50,
+        poller_options: Dict = None,
+        on_progress: Callable[[ManifestEntry], None] = None,
+        protocol: str = "https"
+    ):
+        self.eas_client = eas_client
+        self.manifest = manifest
+        self.model_input = model_input
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.output_dir = Path(output_dir)
+        self.name_prefix = name_prefix
+        self.max_concurrent_submissions = max_concurrent_submissions
+        self.submissions_per_second = submissions_per_second
+        self.max_generating = max_generating
+        self.poller_options = poller_options or {}
+        self.on_progress = on_progress
+
+        self._specs: Dict[str, ExportSpec] = {}
+        self._generating: Optional[asyncio.Semaphore] = None
+        self._next_submission_at = 0.0
+        self._submission_lock: Optional[asyncio.Lock] = None
+
+    async def run(self, specs: Iterable[ExportSpec]) -> BatchExportResults:
+        """Export every model in `specs` that has not already been downloaded, waiting for all of them to be downloaded or to fail."""
+        results = BatchExportResults()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._specs = {}
+        self._generating = asyncio.Semaphore(self.max_generating) if self.max_generating is not None else None
+        self._submission_lock = asyncio.Lock()
+
+        to_submit = []
+        async with ModelDownloader() as downloader, ModelJobPoller(
+            opendss_model_statuses(self.eas_client),
+            on_completed=lambda job: self._download(downloader, job),
+            on_progress=self._job_finished,
+            **self.poller_options
+        ) as poller:
+            for spec in specs:
+                entry = self.manifest.get(spec)
+                if entry is not None and entry.state == DOWNLOADED and Path(entry.path).exists():
+                    results.skipped.append(spec)
+                elif entry is not None and entry.model_id is not None and entry.state in _RESUMABLE_STATES:
+                    # Requested by an earlier run, so wait for it again rather than asking EAS to generate it twice.
+                    await self._track(poller, spec, entry.model_id, entry.model_name)
+                else:
+                    to_submit.append(spec)
+
+            remaining = iter(to_submit)
+
+            async def submit_remaining():
+                for next_spec in remaining:
+                    await self._submit(poller, next_spec, results)
+
+            await asyncio.gather(*(submit_remaining() for _ in range(self.max_concurrent_submissions)))
+
+        for entry in (self.manifest.get(spec) for spec in self._specs.values()):
+            if entry.state == DOWNLOADED:
+                results.downloaded.append(entry.spec)
+            else:
+                results.failed[entry.spec] = f"{entry.state}: {'; '.join(entry.errors)}" if entry.errors else entry.state
+
+        return results
+
+    async def _submit(self, poller: ModelJobPoller, spec: ExportSpec, results: BatchExportResults):
+        model_name = spec.model_name(self.name_prefix)
+        if self._generating is not None:
+            await self._generating.acquire()
+
+        try:
+            await self._wait_for_rate_limit()
+            response = await self.eas_client.mutation(Mutation.create_open_dss_model(self.model_input(spec, model_name)))
+            model_id = str(response["data"]["createOpenDssModel"])
+        except Exception as e:
+            if self._generating is not None:
+                self._generating.release()
+            results.failed[spec] = f"Failed to request model: {e}"
+            return
+
+        self._record(ManifestEntry(spec, model_name, model_id, ModelJobState.CREATION.value))
+        self._specs[model_id] = spec
+        poller.track(model_id, model_name)
+
+    async def _track(self, poller: ModelJobPoller, spec: ExportSpec, model_id: str, model_name: str):
+        if self._generating is not None:
+            await self._generating.acquire()
+        self._specs[model_id] = spec
+        poller.track(model_id, model_name)
+
+    async def _wait_for_rate_limit(self):
+        async with self._submission_lock:
+            now = time.monotonic()
+            if self._next_submission_at > now:
+                await asyncio.sleep(self._next_submission_at - now)
+            self._next_submission_at = max(now, self._next_submission_at) + 1 / self.submissions_per_second
+
+    def _job_finished(self, job: ModelJob):
+        # The poller reports a job once it has stopped polling it, which is when EAS has finished with the model, so another one can be requested.
+        if self._generating is not None:
+            self._generating.release()
+
+        spec = self._specs[job.model_id]
+        entry = self.manifest.get(spec)
+        entry.state = job.state.value
+        entry.errors = job.errors
+        self._record(entry)
+
+    async def _download(self, downloader: ModelDownloader, job: ModelJob):
+        spec = self._specs[job.model_id]
+        entry = self.manifest.get(spec)
+        try:
+            result = await downloader.download(
+                lambda: opendss_model_download_url(self.eas_client, job.model_id, self.host, self.port, self.protocol),
+                self.output_dir / f"{job.name}.zip"
+            )
+        except Exception as e:
+            # Leave the entry COMPLETED, so the next run tries the download again.
+            entry.errors = [f"Download failed: {e}"]
+            self._record(entry)
+            raise
+
+        entry.state = DOWNLOADED
+        entry.path = str(result.path)
+        entry.sha256 = result.sha256
+        entry.errors = []
+        self._record(entry)
+
+    def _record(self, entry: ManifestEntry):
+        self.manifest.record(entry)
+        if self.on_progress is not None:
+            self.on_progress(entry)
+
+
+async def main():
+    from zepben.ewb import connect_with_token, NetworkConsumerClient
+
+    from zepben.examples.export_open_dss_model import open_dss_model_input
+
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    # Export every feeder in the network hierarchy. Filter this list to export a region or zone substation instead.
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+    feeder_mrids = list((await NetworkConsumerClient(channel).get_network_hierarchy()).throw_on_error().value.feeders)
+    specs = export_matrix(feeder_mrids, scenarios=["base", "high-pv"], years=[2025, 2030])
+
+    eas_client = EasClient(host=c["host"], port=c["rpc_port"], access_token=c["access_token"], asynchronous=True)
+
+    def report(entry: ManifestEntry):
+        print(f"{entry.model_name} ({entry.model_id}): {entry.state}{' - ' + '; '.join(entry.errors) if entry.errors else ''}")
+
+    with ExportManifest("open_dss_exports.sqlite") as manifest:
+        export = BatchOpenDssExport(
+            eas_client,
+            manifest,
+            lambda spec, model_name: open_dss_model_input(model_name, spec.feeder_mrid, spec.scenario, spec.year),
+            host=c["host"],
+            port=c["rpc_port"],
+            output_dir="open_dss_models",
+            on_progress=report
+        )
+        results = await export.run(specs)
+
+    print(f"Downloaded {len(results.downloaded)} models, skipped {len(results.skipped)} already downloaded, {len(results.failed)} failed.")
+    for spec, reason in results.failed.items():
+        print(f"    {spec.feeder_mrid} {spec.scenario} {spec.year}: {reason}")
+
+    await eas_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Compares the energy consumer device hierarchy strategies in energy_consumer_device_hierarchy.py on the IEEE 13 node test feeder and on synthetic feeders of
+increasing size. No EWB server is required.
+"""
+
+import asyncio
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Tuple, Union
+
+from zepben.ewb import ConductingEquipment, EnergyConsumer, Feeder, NetworkService
+
+from zepben.examples.energy_consumer_device_hierarchy import EnergyConsumerDeviceHierarchy, energy_consumers_from_upstream_traces, \
+    energy_consumers_from_equipment_tree, energy_consumers_from_step_context, energy_consumers_from_feeder_hierarchy
+from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+Strategy = Callable[[Feeder], Union[List[EnergyConsumerDeviceHierarchy], Awaitable[List[EnergyConsumerDeviceHierarchy]]]]
+
+STRATEGIES: Dict[str, Strategy] = {
+    "upstream traces": energy_consumers_from_upstream_traces,
+    "equipment tree": energy_consumers_from_equipment_tree,
+    "step context": energy_consumers_from_step_context,
+    "feeder hierarchy": energy_consumers_from_feeder_hierarchy,
+}
+
+# (backbone spans, LV circuits per transformer, spans per LV circuit) for each synthetic feeder.
+SYNTHETIC_FEEDERS = [
+    (10, 2, 5),
+    (50, 2, 5),
+    (100, 4, 10),
+]
+
+# The upstream trace strategy grows with consumers x depth, so skip it once a feeder has more consumers than this.
+MAX_CONSUMERS_FOR_UPSTREAM_TRACES = 1000
+
+
+async def time_strategy(strategy: Strategy, feeder: Feeder) -> Tuple[float, int]:
+    start = perf_counter()
+    rows = strategy(feeder)
+    if asyncio.iscoroutine(rows):
+        rows = await rows
+    return perf_counter() - start, len(rows)
+
+
+async def benchmark_feeder(description: str, network: NetworkService, feeder: Feeder):
+    consumers = network.len_of(EnergyConsumer)
+    print(f"{description}: {network.len_of(ConductingEquipment)} conducting equipment, {consumers} energy consumers")
+    for name, strategy in STRATEGIES.items():
+        if strategy is energy_consumers_from_upstream_traces and consumers > MAX_CONSUMERS_FOR_UPSTREAM_TRACES:
+            print(f"    {name:<18} skipped")
+            continue
+
+        seconds, rows = await time_strategy(strategy, feeder)
+        print(f"    {name:<18} {seconds * 1000:>10.1f} ms  {rows:>6} rows")
+    print()
+
+
+async def main():
+    from zepben.examples.ieee_13_node_test_feeder import network as ieee_network
+
+    await assign_directions_and_feeders(ieee_network)
+    await benchmark_feeder("IEEE 13 node test feeder", ieee_network, ieee_network.get("hv_fdr", Feeder))
+
+    for backbone_spans, lv_circuits, lv_spans in SYNTHETIC_FEEDERS:
+        network = build_synthetic_feeder(
+            backbone_spans=backbone_spans,
+            lv_circuits_per_transformer=lv_circuits,
+            spans_per_lv_circuit=lv_spans
+        )
+        await assign_directions_and_feeders(network)
+        await benchmark_feeder(f"Synthetic feeder {backbone_spans}x{lv_circuits}x{lv_spans}", network, network.get("synthetic_fdr", Feeder))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,358 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Times the tracing and extraction workloads of the examples on synthetic feeders, and stores the results as JSON so they can be compared between versions of
+the SDK. No EWB server is required.
+
+device_hierarchy.py compares the energy consumer device hierarchy strategies and prints the times. This suite covers the other workloads the examples run
+against each feeder as well: suspect_end_of_line.py's search for ends of line, `Tracing.set_direction`, `Tracing.assign_equipment_to_feeders`,
+`EquipmentTreeBuilder` and the CSV writers. Each workload is run several times on each size of feeder, and a `BenchmarkRun` holds the times along with
+the versions of Python and the SDK they were taken with. `compare` lists the workloads that got slower between two runs.
+
+Feeders are built by `build_synthetic_feeder`, following the layout of the IEEE 13 node test feeder: a breaker, an MV backbone with a voltage regulator,
+and distribution transformers supplying fused LV circuits of energy consumers. Their size is set by the number of backbone spans, and their branching by
+the number of LV circuits fanning out from each transformer and how many spans deep each circuit is.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import platform
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from importlib import metadata
+from statistics import median
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Sized, Union
+
+import pandas as pd
+from zepben.ewb import (
+    ConductingEquipment, EnergyConsumer, EquipmentTreeBuilder, Feeder, NetworkService, Tracing, downstream
+)
+
+from zepben.examples import all_ratings_csv, energy_consumer_device_hierarchy, tracing_conductor_type_by_lv_circuit
+from zepben.examples.benchmarks.device_hierarchy import MAX_CONSUMERS_FOR_UPSTREAM_TRACES, STRATEGIES
+from zepben.examples.studies.suspect_end_of_line import find_suspect_ends_of_line
+from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+__all__ = ["FeederSize", "Workload", "BenchmarkResult", "BenchmarkRun", "Regression", "SIZES", "WORKLOADS", "run_benchmarks", "compare"]
+
+# Set this to the path of the results of an earlier run, such as one with a previous version of the SDK, to have `main` report any regressions from it.
+BASELINE: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FeederSize:
+    """The size and branching of a synthetic feeder to run the workloads on."""
+
+    name: str
+    backbone_spans: int
+    lv_circuits_per_transformer: int
+    """The number of LV circuits fanning out from each distribution transformer."""
+
+    spans_per_lv_circuit: int
+    """How many spans deep each LV circuit is."""
+
+    def build(self) -> NetworkService:
+        """Build the feeder into a new `NetworkService`, without phases, direction or feeder assignment."""
+        return build_synthetic_feeder(
+            backbone_spans=self.backbone_spans,
+            lv_circuits_per_transformer=self.lv_circuits_per_transformer,
+            spans_per_lv_circuit=self.spans_per_lv_circuit
+        )
+
+
+SIZES: Dict[str, FeederSize] = {
+    it.name: it for it in [
+        FeederSize("small", 10, 2, 5),
+        FeederSize("medium", 50, 2, 5),
+        FeederSize("large", 200, 4, 10),
+        FeederSize("deep", 50, 1, 50),
+        FeederSize("wide", 50, 12, 2),
+    ]
+}
+
+Prepared = Any
+Timed = Callable[[Prepared], Union[int, Sized, Awaitable[Union[int, Sized]]]]
+
+
+@dataclass(frozen=True)
+class Workload:
+    """
+    Something done to each feeder by the examples.
+
+    :param name: The name the results are recorded under.
+    :param run: The timed part of the workload, called with the value returned by `prepare`. Returns the number of items it produced, or the items themselves.
+    :param prepare: Called before each run, untimed, with the network and its feeder. Returns the value to pass to `run`. Defaults to passing the feeder.
+    :param fresh_network: Whether each run needs a newly built network, because the workload changes it. If False, every run shares one network, which
+        has already had phases, direction and feeders assigned.
+    :param max_consumers: Skip the workload on feeders with more energy consumers than this, for workloads that grow too quickly to time on large feeders.
+    """
+
+    name: str
+    run: Timed
+    prepare: Callable[[NetworkService, Feeder], Union[Prepared, Awaitable[Prepared]]] = lambda network, feeder: feeder
+    fresh_network: bool = False
+    max_consumers: Optional[int] = None
+
+
+@dataclass
+class BenchmarkResult:
+    """The times taken by one workload on one size of feeder."""
+
+    workload: str
+    size: FeederSize
+    conducting_equipment: int
+    seconds: List[float] = field(default_factory=list)
+    """The time taken by each run."""
+
+    items: int = 0
+    """The number of items the workload produced, to check that runs being compared did the same work."""
+
+    @property
+    def min_seconds(self) -> float:
+        return min(self.seconds)
+
+    @property
+    def median_seconds(self) -> float:
+        return median(self.seconds)
+
+
+@dataclass
+class BenchmarkRun:
+    """The results of a run of the suite, and the environment it was run in."""
+
+    results: List[BenchmarkResult] = field(default_factory=list)
+    environment: Dict[str, str] = field(default_factory=lambda: _environment())
+
+    def result(self, workload: str, size: str) -> Optional[BenchmarkResult]:
+        return next((it for it in self.results if it.workload == workload and it.size.name == size), None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @staticmethod
+    def read_json(path: str) -> 'BenchmarkRun':
+        with open(path) as f:
+            run = json.load(f)
+        return BenchmarkRun(
+            results=[BenchmarkResult(**dict(it, size=FeederSize(**it["size"]))) for it in run["results"]],
+            environment=run["environment"]
+        )
+
+
+@dataclass
+class Regression:
+    """A workload that took longer in a run than in the baseline it was compared with."""
+
+    workload: str
+    size: str
+    baseline_seconds: float
+    seconds: float
+
+    @property
+    def ratio(self) -> float:
+        return self.seconds / self.baseline_seconds
+
+
+def _environment() -> Dict[str, str]:
+    def version(distribution: str) -> str:
+        try:
+            return metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            return "unknown"
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "zepben.ewb": version("zepben.ewb"),
+        "zepben.examples": version("zepben.examples"),
+    }
+
+
+async def _maybe_await(result):
+    return await result if inspect.isawaitable(result) else result
+
+
+@contextmanager
+def _in_temporary_directory():
+    # The CSV writers write to a "csvs" directory under the working directory.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
+
+async def _set_phases(network: NetworkService, feeder: Feeder) -> NetworkService:
+    await Tracing.set_phases().run(feeder.normal_head_terminal, phases=feeder.normal_head_terminal.phases)
+    return network
+
+
+async def _set_phases_and_direction(network: NetworkService, feeder: Feeder) -> NetworkService:
+    await _set_phases(network, feeder)
+    await Tracing.set_direction().run(network)
+    return network
+
+
+async def _set_direction(network: NetworkService) -> int:
+    await Tracing.set_direction().run(network)
+    return network.len_of(ConductingEquipment)
+
+
+async def _assign_equipment_to_feeders(network: NetworkService) -> int:
+    await Tracing.assign_equipment_to_feeders().run(network)
+    await Tracing.assign_equipment_to_lv_feeders().run(network)
+    return sum(len(list(it.equipment)) for it in network.objects(Feeder))
+
+
+async def _equipment_tree(feeder: Feeder) -> int:
+    builder = EquipmentTreeBuilder(calculate_leaves=True)
+    await Tracing.network_trace().add_condition(downstream()).add_step_action(builder).run(feeder.normal_head_terminal)
+    return len(list(builder.leaves))
+
+
+def _suspect_ends_of_line(feeder: Feeder) -> int:
+    return len(find_suspect_ends_of_line(feeder).ends)
+
+
+def _conductor_types(feeder: Feeder) -> int:
+    return len(tracing_conductor_type_by_lv_circuit.conductor_types_by_transformer(tracing_conductor_type_by_lv_circuit.lines_by_transformer(feeder)))
+
+
+def _write_energy_consumers_csv(rows: Sequence) -> int:
+    with _in_temporary_directory():
+        energy_consumer_device_hierarchy.write_csv(rows, "benchmark")
+    return len(rows)
+
+
+def _write_ratings_csv(ratings: Dict[str, List]) -> int:
+    with _in_temporary_directory():
+        all_ratings_csv.write_csv(ratings, "benchmark")
+    return len(ratings["mrid"])
+
+
+def _conductor_types_rows(feeder: Feeder) -> pd.DataFrame:
+    return tracing_conductor_type_by_lv_circuit.conductor_types_by_transformer(tracing_conductor_type_by_lv_circuit.lines_by_transformer(feeder))
+
+
+def _write_conductor_types_csv(rows: pd.DataFrame) -> int:
+    with _in_temporary_directory():
+        tracing_conductor_type_by_lv_circuit.write_csv(rows, "benchmark")
+    return len(rows)
+
+
+WORKLOADS: List[Workload] = [
+    *(
+        Workload(
+            f"energy consumer hierarchy: {name}",
+            strategy,
+            max_consumers=MAX_CONSUMERS_FOR_UPSTREAM_TRACES if strategy is energy_consumer_device_hierarchy.energy_consumers_from_upstream_traces else None
+        )
+        for name, strategy in STRATEGIES.items()
+    ),
+    Workload("suspect ends of line", _suspect_ends_of_line),
+    Workload("conductor types by transformer", _conductor_types),
+    Workload("set direction", _set_direction, prepare=_set_phases, fresh_network=True),
+    Workload("assign equipment to feeders", _assign_equipment_to_feeders, prepare=_set_phases_and_direction, fresh_network=True),
+    Workload("equipment tree builder", _equipment_tree),
+    Workload(
+        "write energy consumers csv",
+        _write_energy_consumers_csv,
+        prepare=lambda network, feeder: energy_consumer_device_hierarchy.energy_consumers_from_feeder_hierarchy(feeder)
+    ),
+    Workload("write ratings csv", _write_ratings_csv, prepare=lambda network, feeder: all_ratings_csv.ratings_from_network(network, feeder.mrid)),
+    Workload("write conductor types csv", _write_conductor_types_csv, prepare=lambda network, feeder: _conductor_types_rows(feeder)),
+]
+
+
+async def run_benchmarks(
+    sizes: Iterable[FeederSize] = (SIZES["small"], SIZES["medium"]),
+    workloads: Iterable[Workload] = None,
+    repeats: int = 3,
+    on_result: Callable[[BenchmarkResult], None] = None
+) -> BenchmarkRun:
+    """
+    Time each workload on each size of feeder.
+
+    :param sizes: The feeders to run the workloads on.
+    :param workloads: The workloads to time. Defaults to `WORKLOADS`.
+    :param repeats: How many times to run each workload on each feeder.
+    :param on_result: Optional callback, called with the result of each workload as it finishes.
+    """
+    workloads = list(WORKLOADS if workloads is None else workloads)
+    run = BenchmarkRun()
+
+    for size in sizes:
+        shared = size.build()
+        await assign_directions_and_feeders(shared)
+        consumers = shared.len_of(EnergyConsumer)
+
+        for workload in workloads:
+            if workload.max_consumers is not None and consumers > workload.max_consumers:
+                continue
+
+            result = BenchmarkResult(workload.name, size, shared.len_of(ConductingEquipment))
+            for _ in range(repeats):
+                network = size.build() if workload.fresh_network else shared
+                prepared = await _maybe_await(workload.prepare(network, network.get("synthetic_fdr", Feeder)))
+
+                start = perf_counter()
+                items = await _maybe_await(workload.run(prepared))
+                result.seconds.append(perf_counter() - start)
+                result.items = items if isinstance(items, int) else len(items)
+
+            run.results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    return run
+
+
+def compare(baseline: BenchmarkRun, current: BenchmarkRun, threshold: float = 1.2) -> List[Regression]:
+    """
+    Find the workloads whose median time in `current` is more than `threshold` times their median time in `baseline`, slowest first.
+
+    Workloads that only appear in one of the runs are ignored.
+    """
+    regressions = []
+    for result in current.results:
+        before = baseline.result(result.workload, result.size.name)
+        if before is not None and result.median_seconds > before.median_seconds * threshold:
+            regressions.append(Regression(result.workload, result.size.name, before.median_seconds, result.median_seconds))
+    return sorted(regressions, key=lambda it: it.ratio, reverse=True)
+
+
+async def main():
+    def print_result(result: BenchmarkResult):
+        print(f"{result.size.name:<8} {result.workload:<45} {result.median_seconds * 1000:>10.1f} ms  {result.items:>7} items")
+
+    run = await run_benchmarks(SIZES.values(), on_result=print_result)
+
+    path = f"benchmark-results-ewb-{run.environment['zepben.ewb']}.json"
+    run.write_json(path)
+    print(f"Results written to {path}")
+
+    if BASELINE is not None:
+        baseline = BenchmarkRun.read_json(BASELINE)
+        print(f"Compared with zepben.ewb {baseline.environment['zepben.ewb']} ({BASELINE}):")
+        for it in compare(baseline, run):
+            print(f"    {it.size:<8} {it.workload:<45} {it.baseline_seconds * 1000:.1f} ms -> {it.seconds * 1000:.1f} ms ({it.ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,16 +5,18 @@
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import asyncio
 import json
+from typing import Optional
 
 from zepben.ewb import connect_with_token, NetworkConsumerClient, HvCustomer
 
 from zepben.examples import CONFIG_DIR
+from zepben.examples.name_index import NameIndex
 
 with open(f"{CONFIG_DIR}/config.json") as f:
     c = json.loads(f.read())
 
 
-async def extract_hv_customers_for_feeder(feeder_mrid: str):
+async def extract_hv_customers_for_feeder(feeder_mrid: str, name_index: Optional[NameIndex] = None):
     channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"], ca_filename=c["ca_path"])
     network_client = NetworkConsumerClient(channel=channel)
     network = network_client.service
@@ -22,6 +24,10 @@ async def extract_hv_customers_for_feeder(feeder_mrid: str):
     # Fetch the feeder from the server - Note LV feeders are not required to find HV customers.
     (await network_client.get_equipment_container(feeder_mrid)).throw_on_error()
 
+    # Keep the names of this feeder's usage points, so customers can be looked up by NMI once every feeder has been extracted.
+    if name_index is not None:
+        name_index.add_feeder(feeder_mrid, network)
+
     # Print each HV customer and all its usage points
     for hv_customer in network.objects(HvCustomer):
         print(f"{hv_customer.name} - num equipment: {hv_customer.num_equipment()}")
@@ -32,5 +38,14 @@ async def extract_hv_customers_for_feeder(feeder_mrid: str):
                     print(f"  {equip} - {up} - {' | '.join([f'{name.type.name} {name.name}' for name in up.names])}")
 
 
+async def main():
+    name_index = NameIndex()
+    for feeder_mrid in ["YVE-014"]:
+        await extract_hv_customers_for_feeder(feeder_mrid, name_index)
+
+    print(f"Indexed {len(name_index)} names")
+    # named = name_index.get("NMI", "<NMI>")  # Uncomment to look up an HV customer's usage point by NMI.
+
+
 if __name__ == "__main__":
-    asyncio.run(extract_hv_customers_for_feeder("YVE-014"))
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,199 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Writes the rows produced for each feeder into a single partitioned Parquet dataset, rather than a CSV per feeder.
+
+Rows are appended as columns, either straight from lists of values or from a list of dataclasses, and converted to typed Arrow record batches. Batches are
+buffered per partition and written out as Parquet row groups once a partition has `row_group_rows` rows, so a network-wide run produces a handful of
+compressed, dictionary encoded files instead of thousands of CSVs.
+
+The dataset is laid out as `<root>/<column>=<value>/part-<n>.parquet` for each partition column, with each value URL-encoded, and can be read back, filtering
+on any column, with `pandas.read_parquet(root, filters=[...])` or `pyarrow.dataset.dataset(root, partitioning="hive")`.
+"""
+
+import dataclasses
+import shutil
+import types
+import typing
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple, Type, Union
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+__all__ = ["ColumnarDatasetWriter", "arrow_schema"]
+
+_ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+}
+
+
+def arrow_schema(record_type: Type, overrides: Mapping[str, pa.DataType] = None) -> pa.Schema:
+    """
+    The Arrow schema of a dataclass, with a column per field. Every column is nullable, `Optional[X]` maps to the type of `X`, and a union of `int` and
+    `float` maps to `float64`.
+
+    :param record_type: The dataclass to build the schema for.
+    :param overrides: The Arrow type to use for particular fields, by name.
+    """
+    overrides = overrides or {}
+    hints = typing.get_type_hints(record_type)
+    return pa.schema([
+        pa.field(f.name, overrides[f.name] if f.name in overrides else _arrow_type(hints[f.name]))
+        for f in dataclasses.fields(record_type)
+    ])
+
+
+def _arrow_type(hint: Any) -> pa.DataType:
+    if typing.get_origin(hint) in (Union, types.UnionType):
+        args = {arg for arg in typing.get_args(hint) if arg is not type(None)}
+        if args == {int, float}:
+            return pa.float64()
+        if len(args) == 1:
+            return _arrow_type(args.pop())
+    if hint in _ARROW_TYPES:
+        return _ARROW_TYPES[hint]
+    raise TypeError(f"No Arrow type for {hint}, pass one in `overrides`")
+
+
+class ColumnarDatasetWriter:
+    """
+    Appends rows to a Parquet dataset. Use as a context manager, which writes any buffered rows and closes every file on exit.
+
+    :param root: The directory to write the dataset to.
+    :param schema: The schema of the rows, including any partition columns.
+    :param partition_by: The columns to partition the dataset by. Each distinct combination of their values gets its own directory, and the columns are
+        not stored in the files. Pick columns with few distinct values, such as an equipment type, rather than a feeder mRID. Partition columns may not
+        contain nulls.
+    :param row_group_rows: The rows to buffer for each partition before writing them as a row group.
+    :param max_open_files: The most files to keep open at once. When there are more partitions than this, the least recently written one is closed, and
+        a new file is started if more rows arrive for it.
+    :param compression: The Parquet compression codec.
+    :param overwrite: Whether to delete an existing dataset at `root`. If False and `root` is not empty, a `FileExistsError` is raised.
+    """
+
+    def __init__(
+        self,
+        root: Union[Path, str],
+        schema: pa.Schema,
+        partition_by: Sequence[str] = (),
+        row_group_rows: int = 128 * 1024,
+        max_open_files: int = 64,
+        compression: str = "zstd",
+        overwrite: bool = False
+    ):
+        self.root = Path(root)
+        self.schema = schema
+        self.partition_by = list(partition_by)
+        self.row_group_rows = row_group_rows
+        self.max_open_files = max_open_files
+        self.compression = compression
+
+        if self.root.exists() and any(self.root.iterdir()):
+            if not overwrite:
+                raise FileExistsError(f"{self.root} already contains a dataset, pass overwrite=True to replace it")
+            shutil.rmtree(self.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self.rows_written = 0
+
+        self._file_schema = pa.schema([f for f in schema if f.name not in self.partition_by])
+        self._buffers: Dict[Tuple, List[pa.RecordBatch]] = {}
+        self._buffered_rows: Dict[Tuple, int] = {}
+        self._writers: 'OrderedDict[Tuple, pq.ParquetWriter]' = OrderedDict()
+        self._file_counts: Dict[Tuple, int] = {}
+
+    def __enter__(self) -> 'ColumnarDatasetWriter':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def write_columns(self, columns: Mapping[str, Union[Sequence, pa.Array]]):
+        """
+        Append rows given as a sequence of values per column. Every column in the schema must be present, and all columns must be the same length.
+
+        :param columns: The values of each column, by name, as lists, numpy arrays or Arrow arrays.
+        """
+        self.write_batch(pa.RecordBatch.from_arrays([pa.array(columns[f.name], type=f.type) for f in self.schema], schema=self.schema))
+
+    def write_records(self, records: Iterable[Any]):
+        """Append a row for each dataclass in `records`, whose fields are the columns of the schema."""
+        records = list(records)
+        self.write_columns({f.name: [getattr(record, f.name) for record in records] for f in self.schema})
+
+    def write_batch(self, batch: pa.RecordBatch):
+        """Append the rows of an Arrow record batch with this writer's schema."""
+        if batch.num_rows == 0:
+            return
+
+        for key, rows in self._split_partitions(batch):
+            self._buffers.setdefault(key, []).append(rows)
+            self._buffered_rows[key] = self._buffered_rows.get(key, 0) + rows.num_rows
+            if self._buffered_rows[key] >= self.row_group_rows:
+                self._flush(key)
+
+    def close(self):
+        for key in list(self._buffers):
+            self._flush(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def _split_partitions(self, batch: pa.RecordBatch) -> Iterable[Tuple[Tuple, pa.RecordBatch]]:
+        file_columns = batch.select(self._file_schema.names)
+        if not self.partition_by:
+            yield (), file_columns
+            return
+
+        if any(batch.column(name).null_count for name in self.partition_by):
+            raise ValueError(f"Partition columns {self.partition_by} may not contain nulls")
+
+        # Find each distinct combination of partition values in one pass, then take the rows of each with a vectorised filter.
+        partitions = pa.Table.from_batches([batch.select(self.partition_by)]).group_by(self.partition_by).aggregate([])
+        for key in zip(*(partitions.column(name).to_pylist() for name in self.partition_by)):
+            mask = None
+            for name, value in zip(self.partition_by, key):
+                matches = pc.equal(batch.column(name), value)
+                mask = matches if mask is None else pc.and_(mask, matches)
+            yield key, file_columns.filter(mask)
+
+    def _flush(self, key: Tuple):
+        batches = self._buffers.pop(key, None)
+        self._buffered_rows.pop(key, None)
+        if not batches:
+            return
+
+        table = pa.Table.from_batches(batches, schema=self._file_schema).combine_chunks()
+        self._writer(key).write_table(table, row_group_size=max(table.num_rows, 1))
+        self.rows_written += table.num_rows
+
+    def _writer(self, key: Tuple) -> pq.ParquetWriter:
+        writer = self._writers.get(key)
+        if writer is not None:
+            self._writers.move_to_end(key)
+            return writer
+
+        if len(self._writers) >= self.max_open_files:
+            _, oldest = self._writers.popitem(last=False)
+            oldest.close()
+
+        # Values are URL-encoded, which is how pyarrow's hive partitioning decodes them, so values containing '/' or '=' read back unchanged.
+        directory = self.root.joinpath(*(f"{name}={quote(str(value), safe='')}" for name, value in zip(self.partition_by, key)))
+        directory.mkdir(parents=True, exist_ok=True)
+
+        number = self._file_counts.get(key, 0)
+        self._file_counts[key] = number + 1
+        writer = pq.ParquetWriter(directory / f"part-{number}.parquet", self._file_schema, compression=self.compression)
+        self._writers[key] = writer
+        return writer
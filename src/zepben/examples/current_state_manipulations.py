@@ -14,6 +14,8 @@ from zepben.ewb import (
     IncludedEnergizedContainers, IncludedEnergizingContainers
 )
 
+from zepben.examples.feeder_reassignment import FeederReassignment, SwitchChange
+
 """
 Primary question to answer/example for:
 1. How to access the CIM model? Show examples of how the static/design and dynamic/current states
@@ -207,6 +209,21 @@ async def run_swap_feeder(client: NetworkConsumerClient):
     log_txs(f"swapped:", feeders)
 
 
+async def run_swap_feeder_incremental(client: NetworkConsumerClient):
+    # The same swap as run_swap_feeder, but only updating the part of the network moved between the feeders, rather than clearing and recalculating both
+    # feeders. The zone feeders must already have been fetched and traced, e.g. by run_swap_feeder.
+    open_point = client.service.get("13953031", Switch)
+    isolation_point = client.service.get("13952991", Switch)
+
+    reassignment = FeederReassignment(client.service)
+    delta = await reassignment.apply([SwitchChange(open_point, is_open=False), SwitchChange(isolation_point, is_open=True)])
+
+    print(f"swapped, checking {delta.equipment_checked} equipment:")
+    for feeder in open_point.normal_feeders:
+        print(f"   {feeder.mrid} gained txs: {sorted(tx.name for tx in delta.added_to(feeder) if isinstance(tx, PowerTransformer))}")
+        print(f"   {feeder.mrid} lost txs: {sorted(tx.name for tx in delta.removed_from(feeder) if isinstance(tx, PowerTransformer))}")
+
+
 def clear_feeders(feeders: Set[Feeder]):
     # remove the phases and feeders to show the difference in open/normal state
     for feeder in feeders:
@@ -223,7 +240,7 @@ def clear_feeders(feeders: Set[Feeder]):
 
 
 async def recalculate_feeders(feeders: Set[Feeder]):
-    # recalculate the phases and feeders with the new switch state.
+    # recalculate the phases and feeders with the new switch state. See run_swap_feeder_incremental for only updating what the switching changed.
     for feeder in feeders:
         print(f"assigning phases to {feeder.mrid}...")
         await Tracing.set_phases().run_with_terminal(feeder.normal_head_terminal)
@@ -11,12 +11,17 @@ occurrence of another specified `IdentifiedObject`
 
 import asyncio
 import json
+from typing import Dict, List, Optional
 
 from zepben.ewb import (
     NetworkStateOperators, NetworkTraceActionType, NetworkTraceStep, StepContext,
     NetworkConsumerClient, ConductingEquipment, connect_with_token
 )
-from zepben.ewb import PowerTransformer, UsagePoint, Tracing, Switch, IncludedEnergizedContainers
+from zepben.ewb import PowerTransformer, UsagePoint, Tracing, Switch, IncludedEnergizedContainers, EnergyConsumer, FeederDirection
+
+from zepben.examples.name_index import NameIndex
+from zepben.examples.network_graph import NetworkGraph
+from zepben.examples.upstream_index import UpstreamIndex
 
 
 with open("config.json") as f:
@@ -43,18 +48,31 @@ def _trace(start_item, results, stop_condition):
     )
 
 
+def dsubs_of(graph: NetworkGraph, equipment: List[ConductingEquipment]) -> Dict[str, Optional[PowerTransformer]]:
+    """The nearest `PowerTransformer` upstream of each piece of equipment, by mRID, found with one multi-source trace rather than a trace per equipment."""
+    traversal = graph.trace_from_sources(equipment, direction=FeederDirection.UPSTREAM, stop_at=(PowerTransformer,))
+    return {e.mrid: next(iter(traversal.stopped_at(i)), None) for i, e in enumerate(equipment)}
+
+
 async def main(mrid: str, feeder_mrid: str):
     channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
     client = NetworkConsumerClient(channel)
     await client.get_equipment_container(feeder_mrid, include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)
     network = client.service
 
-    try:
-        usage_point = network.get(mrid, UsagePoint)
-        # get the `ConductingEquipment` from the `UsagePoint`
-        start_item = next(filter(lambda ce: isinstance(ce, ConductingEquipment), usage_point.equipment))
-    except TypeError:
-        start_item = network.get(mrid, ConductingEquipment)
+    # `mrid` may be an NMI, so look it up in a `NameIndex` of the feeder first. The same index can be kept across many feeders, see name_index.py.
+    names = NameIndex(name_types=["NMI"])
+    names.add_feeder(feeder_mrid, network)
+    named = names.get("NMI", mrid)
+    if named is not None and named.equipment_mrids:
+        start_item = network.get(named.equipment_mrids[0], ConductingEquipment)
+    else:
+        try:
+            usage_point = network.get(mrid, UsagePoint)
+            # get the `ConductingEquipment` from the `UsagePoint`
+            start_item = next(filter(lambda ce: isinstance(ce, ConductingEquipment), usage_point.equipment))
+        except TypeError:
+            start_item = network.get(mrid, ConductingEquipment)
 
     results = []
 
@@ -76,6 +94,16 @@ async def main(mrid: str, feeder_mrid: str):
 
     print(results)
 
+    # When answering many of these questions for the same feeder, build an `UpstreamIndex` once and look each one up instead of tracing.
+    # Call `index.refresh(switches)` after operating switches to keep it up to date.
+    graph = NetworkGraph(network)
+    index = UpstreamIndex(graph)
+    print(index.transformer(start_item), index.switch(start_item), index.breaker(start_item), index.feeder(start_item))
+
+    # Or trace upstream from many pieces of equipment at once, e.g. every energy consumer on the feeder.
+    dsubs = dsubs_of(graph, list(network.objects(EnergyConsumer)))
+    print(f"Found the DSUB of {sum(dsub is not None for dsub in dsubs.values())} of {len(dsubs)} energy consumers")
+
 
 if __name__ == "__main__":
     # EnergyConsumer: 50763684
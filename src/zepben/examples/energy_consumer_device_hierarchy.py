@@ -13,7 +13,11 @@ from typing import Dict, Callable, List
 from dataclasses import dataclass
 from zepben.ewb import connect_with_token, NetworkConsumerClient, Feeder, Tracing, downstream, StepActionWithContextValue, \
     NetworkTraceStep, EnergyConsumer, StepContext, IdentifiedObject, Breaker, Fuse, PowerTransformer, TransformerFunctionKind, TreeNode, EquipmentTreeBuilder, \
-    ConductingEquipment, NetworkTrace, upstream, IncludedEnergizedContainers
+    ConductingEquipment, NetworkTrace, upstream, IncludedEnergizedContainers, NetworkService
+
+from zepben.examples.columnar_dataset import ColumnarDatasetWriter, arrow_schema
+from zepben.examples.feeder_device_hierarchy import FeederDeviceHierarchy
+from zepben.examples.feeder_fetch_pool import FeederFetchPool
 
 
 @dataclass
@@ -30,13 +34,16 @@ class EnergyConsumerDeviceHierarchy:
     feeder_mrid: str
 
 
-def _get_client():
+def _get_channel():
     with open('config.json') as f:
         config = json.load(f)
 
         # Connect to server
-    channel = connect_with_token(**config)
-    return NetworkConsumerClient(channel)
+    return connect_with_token(**config)
+
+
+def _get_client():
+    return NetworkConsumerClient(_get_channel())
 
 
 async def get_feeders(_client=None) -> Dict[str, Feeder]:
@@ -61,6 +68,11 @@ async def trace_from_energy_consumers(feeder_mrid: str, client=None):
     client = client or _get_client()
     await get_feeder_equipment(client, feeder_mrid)
 
+    feeder = client.service.get(feeder_mrid, Feeder)
+    write_csv(await energy_consumers_from_upstream_traces(feeder), feeder.mrid)
+
+
+async def energy_consumers_from_upstream_traces(feeder: Feeder) -> List[EnergyConsumerDeviceHierarchy]:
     def _get_equipment_tree_trace(up_data: dict) -> NetworkTrace:
         def step_action(step: NetworkTraceStep, _: StepContext):
             to_equip: ConductingEquipment = step.path.to_equipment
@@ -83,19 +95,17 @@ async def trace_from_energy_consumers(feeder_mrid: str, client=None):
             .add_step_action(step_action)
         )
 
-    feeder = client.service.get(feeder_mrid, Feeder)
-
     energy_consumers = []
     for lvf in feeder.normal_energized_lv_feeders:
         for ce in lvf.equipment:
             if isinstance(ce, EnergyConsumer):
-                up_data = {'feeder': feeder_mrid, 'energy_consumer_mrid': ce.mrid}
+                up_data = {'feeder': feeder.mrid, 'energy_consumer_mrid': ce.mrid}
 
                 # Trace upstream from EnergyConsumer.
                 await _get_equipment_tree_trace(up_data).run(ce)
                 energy_consumers.append(_build_row(up_data))
 
-    write_csv(energy_consumers, feeder.mrid)
+    return energy_consumers
 
 
 async def trace_from_feeder_downstream(feeder_mrid: str, client=None):
@@ -104,7 +114,14 @@ async def trace_from_feeder_downstream(feeder_mrid: str, client=None):
     Build an equipment tree of everything downstream of the feeder.
     Use the Equipment tree to recurse through parent equipment of all EC's and get the equipment we are interested in.
     """
+    client = client or _get_client()
+    await get_feeder_equipment(client, feeder_mrid)
+
+    feeder = client.service.get(feeder_mrid, Feeder)
+    write_csv(await energy_consumers_from_equipment_tree(feeder), feeder.mrid)
 
+
+async def energy_consumers_from_equipment_tree(feeder: Feeder) -> List[EnergyConsumerDeviceHierarchy]:
     def process_leaf(up_data: dict, leaf: TreeNode):
         to_equip: IdentifiedObject = leaf.identified_object
 
@@ -120,12 +137,8 @@ async def trace_from_feeder_downstream(feeder_mrid: str, client=None):
             elif not up_data.get('regulator') and to_equip.function == TransformerFunctionKind.voltageRegulator:
                 up_data['regulator'] = to_equip
 
-    client = client or _get_client()
-    await get_feeder_equipment(client, feeder_mrid)
-
-    builder = EquipmentTreeBuilder()
+    builder = EquipmentTreeBuilder(calculate_leaves=True)
 
-    feeder = client.service.get(feeder_mrid, Feeder)
     await (
         Tracing.network_trace()
         .add_condition(downstream())
@@ -147,21 +160,24 @@ async def trace_from_feeder_downstream(feeder_mrid: str, client=None):
         row = _build_row(ec_data)
         energy_consumers.append(row)
 
-    write_csv(energy_consumers, feeder.mrid)
+    return energy_consumers
 
 
 async def trace_from_feeder_context(feeder_mrid: str, client=None):
     """
-    Most efficient/fastest.
+    More efficient/faster than `trace_from_feeder_downstream`.
     trace downstream from the feeder recording relevant information using `NetworkTrace` `StepContext`.
     """
     client = client or _get_client()
     # Get all objects under the feeder, including Substations and LV Feeders
     await get_feeder_equipment(client, feeder_mrid)
 
-    energy_consumers = []
-
     feeder = client.service.get(feeder_mrid, Feeder)
+    write_csv(await energy_consumers_from_step_context(feeder), feeder.mrid)
+
+
+async def energy_consumers_from_step_context(feeder: Feeder) -> List[EnergyConsumerDeviceHierarchy]:
+    energy_consumers = []
 
     class StepActionWithContext(StepActionWithContextValue):
         def _apply(self, item: NetworkTraceStep, context: StepContext):
@@ -196,7 +212,36 @@ async def trace_from_feeder_context(feeder_mrid: str, client=None):
         .add_step_action(StepActionWithContext('key'))
     ).run(getattr(feeder, 'normal_head_terminal'))
 
-    write_csv(energy_consumers, feeder.mrid)
+    return energy_consumers
+
+
+async def trace_from_feeder_hierarchy(feeder_mrid: str, client=None):
+    """
+    Most efficient/fastest.
+    Walk the feeder once using a `FeederDeviceHierarchy`, then look up the hierarchy of each EnergyConsumer.
+    Unlike `trace_from_feeder_context`, no per-step copies of the upstream equipment are made, so this scales to large feeders.
+    """
+    client = client or _get_client()
+    await get_feeder_equipment(client, feeder_mrid)
+
+    feeder = client.service.get(feeder_mrid, Feeder)
+    write_csv(energy_consumers_from_feeder_hierarchy(feeder), feeder.mrid)
+
+
+def energy_consumers_from_feeder_hierarchy(feeder: Feeder) -> List[EnergyConsumerDeviceHierarchy]:
+    hierarchy = FeederDeviceHierarchy(feeder)
+
+    return [
+        _build_row({
+            'feeder': feeder.mrid,
+            'energy_consumer_mrid': ec.mrid,
+            'breaker': hierarchy.breaker(ec),
+            'upstream_switch': hierarchy.fuse(ec),
+            'distribution_power_transformer': hierarchy.distribution_transformer(ec),
+            'regulator': hierarchy.regulator(ec),
+        })
+        for ec in hierarchy.equipment if isinstance(ec, EnergyConsumer)
+    ]
 
 
 def write_csv(energy_consumers: List[EnergyConsumerDeviceHierarchy], feeder_mrid: str):
@@ -233,8 +278,9 @@ def process_feeders_sequentially():
 
         `trace_type` must be one of the following:
             - `trace_from_energy_consumers`
-            - `trace_from_energy_consumers_with_context`
+            - `trace_from_feeder_context`
             - `trace_from_feeder_downstream`
+            - `trace_from_feeder_hierarchy`
 
         """
         from tqdm import tqdm
@@ -245,25 +291,41 @@ def process_feeders_sequentially():
             await trace_type(_feeder, client)
 
     # Uncomment to run other trace functions
-    asyncio.run(main_async(trace_from_feeder_context))
+    asyncio.run(main_async(trace_from_feeder_hierarchy))
+    # asyncio.run(main_async(trace_from_feeder_context))
     # asyncio.run(main_async(trace_from_feeder_downstream))
     # asyncio.run(main_async(trace_from_energy_consumers))
 
 
 def process_feeders_concurrently():
-    def multi_proc(_feeder):
-        # Uncomment to run other trace functions
-        asyncio.run(trace_from_feeder_context(_feeder))
-        # asyncio.run(trace_from_feeder_downstream(_feeder))
-        # asyncio.run(trace_from_energy_consumers(_feeder))
+    async def main_async():
+        """
+        Fetch up to 4 feeders at a time over a single channel, appending the energy consumers of each one to a single Parquet dataset in
+        ./energy_consumers as it arrives. Read it back with e.g. `pd.read_parquet("energy_consumers", filters=[("feeder_mrid", "=", "<FEEDER_ID>")])`.
+        """
+        from tqdm import tqdm
+        channel = _get_channel()
+        # Get a list of feeders before entering main compute section of script.
+        feeders = list(await get_feeders(NetworkConsumerClient(channel)))
+
+        with ColumnarDatasetWriter("energy_consumers", arrow_schema(EnergyConsumerDeviceHierarchy), overwrite=True) as writer, \
+                tqdm(total=len(feeders)) as progress:
+            async def write_feeder(feeder_mrid: str, network: NetworkService):
+                feeder = network.get(feeder_mrid, Feeder)
+                # Uncomment to run other trace functions
+                writer.write_records(energy_consumers_from_feeder_hierarchy(feeder))
+                # writer.write_records(await energy_consumers_from_step_context(feeder))
+                # writer.write_records(await energy_consumers_from_equipment_tree(feeder))
+                # writer.write_records(await energy_consumers_from_upstream_traces(feeder))
+
+            results = await FeederFetchPool(channel, max_in_flight=4).run(feeders, write_feeder, on_progress=lambda _: progress.update())
 
-    # Get a list of feeders before entering main compute section of script.
-    feeders = list(asyncio.run(get_feeders()))
+        for feeder_mrid, error in results.failed.items():
+            print(f"Failed to process {feeder_mrid}: {error}")
 
-    from tqdm.contrib.concurrent import process_map
-    process_map(multi_proc, feeders, max_workers=int(os.cpu_count() / 2))
+    asyncio.run(main_async())
 
 
 if __name__ == "__main__":
     process_feeders_sequentially()
-    # process_feeders_concurrently()  # Uncomment and comment sequentially above to multi-process, note this is resource intensive and may cause issues.
+    # process_feeders_concurrently()  # Uncomment and comment sequentially above to fetch and process several feeders at once.
@@ -6,66 +6,111 @@
 import asyncio
 import json
 from datetime import datetime
+from typing import List
 
 from zepben.eas import EasClient, OpenDssModelInput, OpenDssModulesConfigInput, OpenDssModelGenerationSpecInput, OpenDssModelOptionsInput, \
     OpenDssCommonConfigInput, HcGeneratorConfigInput, TimePeriodInput, HcModelConfigInput, HcSolveConfigInput, \
-    HcRawResultsConfigInput, HcMeterPlacementConfigInput, HcSwitchMeterPlacementConfigInput, HcSwitchClass, HcFeederScenarioAllocationStrategy, Mutation, Query
-from time import sleep
-import requests
+    HcRawResultsConfigInput, HcMeterPlacementConfigInput, HcSwitchMeterPlacementConfigInput, HcSwitchClass, HcFeederScenarioAllocationStrategy, Mutation
+
+from zepben.examples.model_download import ModelDownloader
+from zepben.examples.model_job_poller import ModelJobPoller, ModelJob, ModelJobState, opendss_model_statuses, opendss_model_download_url
 
 
 with open("config.json") as f:
     c = json.loads(f.read())
 
 
-def wait_for_export(eas_client: EasClient, model_id: int):
-    # Wait for OpenDss model export to complete
-    wait_limit_seconds = 3000
-    step_seconds = 2
-    total = 0
-    print(f"Waiting for model generation ({wait_limit_seconds} seconds) ", end='', flush=True)
-    # Retrieve the model information for the model we just requested
-    model = eas_client.get_opendss_model(model_id)
-    while model["state"] == "CREATION":
-        try:
-            model = eas_client.get_opendss_model(model_id)
-            print(".", end='', flush=True)
-            sleep(step_seconds)
-            total += step_seconds
-            if total > wait_limit_seconds:
-                raise TimeoutError("Timed out waiting for model export to complete.")
-        except Exception as e:
-            if isinstance(e, TimeoutError):
-                raise e
-            else:
-                print(f"Failed retrieving model export status: {e}")
-                print(f"Retrying in {step_seconds} secondds...")
-                sleep(step_seconds)
-
-
-def download_generated_model(eas_client: EasClient, output_file_name: str, model_id: int):
-    try:
-        url = eas_client.get_opendss_model_download_url(model_id)
-    except Exception as e:
-        print()
-        print(f"Download failed, model failed to generate: {e}")
-        return
-
-    print(f"\nURL (30 second expiry): {url}", )
-
+async def download_generated_model(eas_client: EasClient, downloader: ModelDownloader, output_file_name: str, model_id: int):
     file_name = f"{output_file_name}-{model_id}.zip"
     print(f"Downloading model zip to: {file_name}")
 
+    async def download_url() -> str:
+        # Download URLs expire after 30 seconds, so a fresh one is requested each time the download is resumed.
+        url = await opendss_model_download_url(eas_client, model_id, c["host"], c["rpc_port"])
+        print(f"URL (30 second expiry): {url}", )
+        return url
+
     try:
-        with open(file_name, mode="wb") as file:
-            file.write(requests.get(url).content)
-        print("Download complete.")
+        result = await downloader.download(download_url, file_name)
+        print(f"Download complete: {result.size_bytes} bytes, SHA-256 {result.sha256}")
     except Exception as error:
         print(error)
         print("Download failed. Model may have failed to generate.")
 
 
-def open_dss_export(export_file_name: str):
+def open_dss_model_input(model_name: str, feeder_mrid: str, scenario: str = "base", year: int = 2025) -> OpenDssModelInput:
+    return OpenDssModelInput(
+        generationSpec=OpenDssModelGenerationSpecInput(
+            modelOptions=OpenDssModelOptionsInput(
+                scenario=scenario,
+                year=year,
+                feeder=feeder_mrid,
+            ),
+            modulesConfiguration=OpenDssModulesConfigInput(
+                common=OpenDssCommonConfigInput(
+                    timePeriod=TimePeriodInput(
+                        startTime=datetime.fromisoformat("2024-04-01T00:00"),
+                        endTime=datetime.fromisoformat("2025-04-01T00:00")
+                    ),
+                    # For fixed time export example, pass load_time a FixedTimeInput object
+                    # fixedTime=FixedTimeInput(
+                    #     loadTime=datetime.fromisoformat("2024-04-01T00:00")
+                    # )
+                ),
+                generator=HcGeneratorConfigInput(
+                    model=HcModelConfigInput(
+                        meterPlacementConfig=HcMeterPlacementConfigInput(
+                            feederHead=True,
+                            distTransformers=True,
+                            # Include meters for any switch that has a name that starts with 'LV Circuit Head' and is a Fuse or Disconnector
+                            switchMeterPlacementConfigs=[
+                                HcSwitchMeterPlacementConfigInput(
+                                    meterSwitchClass=HcSwitchClass.DISCONNECTOR,
+                                    namePattern="LV Circuit Head.*"
+                                ), HcSwitchMeterPlacementConfigInput(
+                                    meterSwitchClass=HcSwitchClass.FUSE,
+                                    namePattern="LV Circuit Head.*"
+                                )
+                            ]
+                        ),
+                        loadVMaxPu=1.2,
+                        loadVMinPu=0.8,
+                        pFactorBaseExports=-1,
+                        pFactorBaseImports=1,
+                        pFactorForecastPv=0.98,
+                        fixSinglePhaseLoads=True,
+                        maxSinglePhaseLoad=15000.0,
+                        maxLoadServiceLineRatio=1.0,
+                        maxLoadLvLineRatio=2.0,
+                        maxLoadTxRatio=2.0,
+                        maxGenTxRatio=4.0,
+                        fixOverloadingConsumers=True,
+                        fixUndersizedServiceLines=True,
+                        feederScenarioAllocationStrategy=HcFeederScenarioAllocationStrategy.ADDITIVE,
+                        closedLoopVRegEnabled=True,
+                        closedLoopVRegSetPoint=0.9825,
+                        seed=123,
+
+                    ),
+                    solve=HcSolveConfigInput(
+                        stepSizeMinutes=30
+                    ),
+                    rawResults=HcRawResultsConfigInput(
+                        energyMetersRaw=True,
+                        energyMeterVoltagesRaw=True,
+                        overloadsRaw=True,
+                        resultsPerMeter=True,
+                        voltageExceptionsRaw=True,
+                    ),
+                ),
+            )
+        ),
+        isPublic=True,
+        modelName=model_name,
+    )
+
+
+async def open_dss_export(export_file_name: str, feeder_mrids: List[str]):
     eas_client = EasClient(
         host=c["host"],
         port=c["rpc_port"],
@@ -73,100 +118,37 @@ def open_dss_export(export_file_name: str):
         asynchronous=True
     )
 
-    # Run an opendss export
-    print("Sending OpenDss model export request to EAS")
-
-    response = asyncio.run(
-        eas_client.mutation(
-            Mutation.create_open_dss_model(
-                OpenDssModelInput(
-                    generationSpec=OpenDssModelGenerationSpecInput(
-                        modelOptions=OpenDssModelOptionsInput(
-                            scenario="base",
-                            year=2025,
-                            feeder="<FEEDER_MRID>",
-                        ),
-                        modulesConfiguration=OpenDssModulesConfigInput(
-                            common=OpenDssCommonConfigInput(
-                                timePeriod=TimePeriodInput(
-                                    startTime=datetime.fromisoformat("2024-04-01T00:00"),
-                                    endTime=datetime.fromisoformat("2025-04-01T00:00")
-                                ),
-                                # For fixed time export example, pass load_time a FixedTimeInput object
-                                # fixedTime=FixedTimeInput(
-                                #     loadTime=datetime.fromisoformat("2024-04-01T00:00")
-                                # )
-                            ),
-                            generator=HcGeneratorConfigInput(
-                                model=HcModelConfigInput(
-                                    meterPlacementConfig=HcMeterPlacementConfigInput(
-                                        feederHead=True,
-                                        distTransformers=True,
-                                        # Include meters for any switch that has a name that starts with 'LV Circuit Head' and is a Fuse or Disconnector
-                                        switchMeterPlacementConfigs=[
-                                            HcSwitchMeterPlacementConfigInput(
-                                                meterSwitchClass=HcSwitchClass.DISCONNECTOR,
-                                                namePattern="LV Circuit Head.*"
-                                            ), HcSwitchMeterPlacementConfigInput(
-                                                meterSwitchClass=HcSwitchClass.FUSE,
-                                                namePattern="LV Circuit Head.*"
-                                            )
-                                        ]
-                                    ),
-                                    loadVMaxPu=1.2,
-                                    loadVMinPu=0.8,
-                                    pFactorBaseExports=-1,
-                                    pFactorBaseImports=1,
-                                    pFactorForecastPv=0.98,
-                                    fixSinglePhaseLoads=True,
-                                    maxSinglePhaseLoad=15000.0,
-                                    maxLoadServiceLineRatio=1.0,
-                                    maxLoadLvLineRatio=2.0,
-                                    maxLoadTxRatio=2.0,
-                                    maxGenTxRatio=4.0,
-                                    fixOverloadingConsumers=True,
-                                    fixUndersizedServiceLines=True,
-                                    feederScenarioAllocationStrategy=HcFeederScenarioAllocationStrategy.ADDITIVE,
-                                    closedLoopVRegEnabled=True,
-                                    closedLoopVRegSetPoint=0.9825,
-                                    seed=123,
-
-                                ),
-                                solve=HcSolveConfigInput(
-                                    stepSizeMinutes=30
-                                ),
-                                rawResults=HcRawResultsConfigInput(
-                                    energyMetersRaw=True,
-                                    energyMeterVoltagesRaw=True,
-                                    overloadsRaw=True,
-                                    resultsPerMeter=True,
-                                    voltageExceptionsRaw=True,
-                                ),
-                            ),
-                        )
-                    ),
-                    isPublic=True,
-                    modelName=export_file_name,
-                )
-            )
-        )
-    )
+    def report(job: ModelJob):
+        print(f"Model {job.name} ({job.model_id}): {job.state.value} after {job.elapsed:.0f} seconds")
+        for error in job.errors:
+            print(f"    {error}")
 
-    print(f"Raw 'run_opendss_export' response: '{response}'")
-    model_id = response["data"]["createOpenDssModel"]
-    print(f"New OpenDss model export id: {model_id}")
+    # Each model is downloaded as soon as it has been generated, while the models for the other feeders are still being polled. Every download shares
+    # the downloader's connection pool.
+    async with ModelDownloader() as downloader, ModelJobPoller(
+        opendss_model_statuses(eas_client),
+        on_completed=lambda job: download_generated_model(eas_client, downloader, job.name, int(job.model_id)),
+        timeout=3000,
+        on_progress=report
+    ) as poller:
+        for feeder_mrid in feeder_mrids:
+            model_name = f"{export_file_name}-{feeder_mrid}" if len(feeder_mrids) > 1 else export_file_name
 
-    try:
-        wait_for_export(eas_client, int(model_id))
+            # Run an opendss export
+            print(f"Sending OpenDss model export request for {feeder_mrid} to EAS")
+            response = await eas_client.mutation(Mutation.create_open_dss_model(open_dss_model_input(model_name, feeder_mrid)))
 
-        # Request a download URL from EAS and download to a local file
-        download_generated_model(eas_client, export_file_name, int(model_id))
+            print(f"Raw 'run_opendss_export' response: '{response}'")
+            model_id = response["data"]["createOpenDssModel"]
+            print(f"New OpenDss model export id: {model_id}")
+            poller.track(model_id, model_name)
 
-    except TimeoutError:
-        print("\nERROR: Timed out waiting for model export to complete.")
+    for job in poller.jobs.values():
+        if job.state == ModelJobState.TIMED_OUT:
+            print(f"ERROR: Timed out waiting for model export {job.name} ({job.model_id}) to complete.")
 
-    eas_client.close()
+    await eas_client.close()
 
 
 if __name__ == "__main__":
-    open_dss_export(f"test_export_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    asyncio.run(open_dss_export(f"test_export_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}", ["<FEEDER_MRID>"]))
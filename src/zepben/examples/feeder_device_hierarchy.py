@@ -0,0 +1,193 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+A device hierarchy for a whole feeder, built by walking the feeder once downstream from its head terminal.
+
+Rather than tracing upstream from every piece of equipment you are interested in, the walk records a parent pointer for every piece of equipment it reaches,
+along with the index of the nearest breaker, transformer, voltage regulator, distribution transformer and fuse at or above it. Each of these is stored in a flat integer
+array, so the walk only appends a few integers per step, and the hierarchy for any equipment on the feeder is then a constant time lookup.
+"""
+
+from array import array
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from zepben.ewb import (
+    Breaker, ConductingEquipment, Feeder, FeederDirection, Fuse, NetworkStateOperators, PowerTransformer, TransformerFunctionKind
+)
+
+__all__ = ["FeederDeviceHierarchy"]
+
+_NONE = -1
+
+
+class FeederDeviceHierarchy:
+    """
+    The equipment hierarchy of a single feeder.
+
+    The feeder must have its feeder direction set, which is the case for any feeder fetched from the EWB server. Where the feeder contains loops, each
+    piece of equipment is given the parent it is first reached from, and the connections that close each loop are available from `loops`.
+    """
+
+    def __init__(self, feeder: Feeder, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL):
+        self.feeder = feeder
+        self._state_operators = network_state_operators
+
+        self._equipment: List[ConductingEquipment] = []
+        self._index: Dict[str, int] = {}
+
+        self._parent = array("l")
+        self._breaker = array("l")
+        self._transformer = array("l")
+        self._regulator = array("l")
+        self._distribution_transformer = array("l")
+        self._fuse = array("l")
+        self._loops: List[Tuple[int, int]] = []
+        # The mRID of the connectivity node each piece of equipment was reached through, which is None for the feeder head.
+        self._reached_through: List[Optional[str]] = []
+
+        if feeder.normal_head_terminal is not None and feeder.normal_head_terminal.conducting_equipment is not None:
+            self._walk(feeder.normal_head_terminal.conducting_equipment)
+
+    def __len__(self) -> int:
+        return len(self._equipment)
+
+    def __contains__(self, equipment: ConductingEquipment) -> bool:
+        return equipment.mrid in self._index
+
+    @property
+    def equipment(self) -> Iterator[ConductingEquipment]:
+        """All equipment reached from the feeder head, in the order they were reached."""
+        return iter(self._equipment)
+
+    @property
+    def loops(self) -> Iterator[Tuple[ConductingEquipment, ConductingEquipment]]:
+        """
+        Each loop in the feeder, as a pair of equipment meeting at the connectivity node that closes it, where neither was reached from the other, closing
+        a loop through their common ancestor. Equipment reached through that node is counted as the equipment that reached it, so siblings at a junction
+        do not close a loop, and each loop is reported once.
+        """
+        return ((self._equipment[a], self._equipment[b]) for a, b in self._loops)
+
+    def parent(self, equipment: ConductingEquipment) -> Optional[ConductingEquipment]:
+        """The equipment `equipment` was reached from, or None for the feeder head."""
+        return self._lookup(self._parent, equipment)
+
+    def breaker(self, equipment: ConductingEquipment) -> Optional[Breaker]:
+        """The nearest `Breaker` at or above `equipment`."""
+        return self._lookup(self._breaker, equipment)
+
+    def transformer(self, equipment: ConductingEquipment) -> Optional[PowerTransformer]:
+        """The nearest `PowerTransformer` of any function at or above `equipment`."""
+        return self._lookup(self._transformer, equipment)
+
+    def regulator(self, equipment: ConductingEquipment) -> Optional[PowerTransformer]:
+        """The nearest voltage regulating `PowerTransformer` at or above `equipment`."""
+        return self._lookup(self._regulator, equipment)
+
+    def distribution_transformer(self, equipment: ConductingEquipment) -> Optional[PowerTransformer]:
+        """The nearest distribution `PowerTransformer` at or above `equipment`."""
+        return self._lookup(self._distribution_transformer, equipment)
+
+    def fuse(self, equipment: ConductingEquipment) -> Optional[Fuse]:
+        """The nearest `Fuse` at or above `equipment`."""
+        return self._lookup(self._fuse, equipment)
+
+    def path_to_head(self, equipment: ConductingEquipment) -> Iterator[ConductingEquipment]:
+        """Iterate from `equipment` up through its parents to the feeder head. Yields nothing if `equipment` is not on the feeder."""
+        index = self._index.get(equipment.mrid, _NONE)
+        while index != _NONE:
+            yield self._equipment[index]
+            index = self._parent[index]
+
+    def _lookup(self, pointers: array, equipment: ConductingEquipment) -> Optional[ConductingEquipment]:
+        index = self._index.get(equipment.mrid)
+        if index is None:
+            return None
+
+        pointer = pointers[index]
+        return self._equipment[pointer] if pointer != _NONE else None
+
+    def _walk(self, head: ConductingEquipment):
+        get_direction = self._state_operators.get_direction
+        is_in_service = self._state_operators.is_in_service
+
+        loops = set()
+        self._visit(head, _NONE, None)
+        to_process = deque([head])
+        while to_process:
+            equipment = to_process.popleft()
+            parent_index = self._index[equipment.mrid]
+            for terminal in equipment.terminals:
+                if FeederDirection.DOWNSTREAM not in get_direction(terminal):
+                    continue
+
+                node = terminal.connectivity_node_id
+                for connected in terminal.connected_terminals():
+                    if FeederDirection.UPSTREAM not in get_direction(connected):
+                        continue
+
+                    next_equipment = connected.conducting_equipment
+                    if next_equipment is None or not is_in_service(next_equipment):
+                        continue
+
+                    next_index = self._index.get(next_equipment.mrid)
+                    if next_index is not None:
+                        # Equipment on a loop has terminals in both directions, so its parent, its children and the other children of its parent are
+                        # also reached back from it, at the node they were reached through. Everything at a node is counted as the equipment that first
+                        # reached the node, so anything else already reached closes a loop there. Each loop is seen from both of its ends, and from
+                        # everything else at the node that closes it, but is recorded once.
+                        a = self._first_at(parent_index, node)
+                        b = self._first_at(next_index, node)
+                        if a != b:
+                            loop = (min(a, b), max(a, b))
+                            if loop not in loops:
+                                loops.add(loop)
+                                self._loops.append(loop)
+                        continue
+
+                    self._visit(next_equipment, parent_index, node)
+                    to_process.append(next_equipment)
+
+    def _first_at(self, index: int, node: Optional[str]) -> int:
+        # The equipment that reached `index` through `node`, or `index` itself if it was not reached through `node`.
+        while self._reached_through[index] == node:
+            index = self._parent[index]
+        return index
+
+    def _visit(self, equipment: ConductingEquipment, parent_index: int, reached_through: Optional[str]):
+        index = len(self._equipment)
+        self._equipment.append(equipment)
+        self._index[equipment.mrid] = index
+        self._parent.append(parent_index)
+        self._reached_through.append(reached_through)
+
+        if parent_index == _NONE:
+            breaker = transformer = regulator = distribution_transformer = fuse = _NONE
+        else:
+            breaker = self._breaker[parent_index]
+            transformer = self._transformer[parent_index]
+            regulator = self._regulator[parent_index]
+            distribution_transformer = self._distribution_transformer[parent_index]
+            fuse = self._fuse[parent_index]
+
+        if isinstance(equipment, Breaker):
+            breaker = index
+        elif isinstance(equipment, Fuse):
+            fuse = index
+        elif isinstance(equipment, PowerTransformer):
+            transformer = index
+            if equipment.function == TransformerFunctionKind.distributionTransformer:
+                distribution_transformer = index
+            elif equipment.function == TransformerFunctionKind.voltageRegulator:
+                regulator = index
+
+        self._breaker.append(breaker)
+        self._transformer.append(transformer)
+        self._regulator.append(regulator)
+        self._distribution_transformer.append(distribution_transformer)
+        self._fuse.append(fuse)
@@ -0,0 +1,205 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Fetches many feeders from the EWB server concurrently over a single gRPC channel, handing each one to a consumer as soon as it arrives.
+
+Every feeder is fetched into its own `NetworkService`, which is dropped as soon as the consumer has finished with it. Fetches are pipelined so the server is
+streaming the next feeders while the current one is being processed, and two limits keep the memory use of a whole network run bounded:
+
+* `max_in_flight` caps the number of feeders being fetched at once, and the number of fetched feeders waiting for the consumer.
+* `max_objects_in_memory` stops new fetches from starting while the feeders that have been fetched but not yet consumed hold more objects than this. The
+  size of a feeder is only known once it has been fetched, so the feeders still being fetched are not counted, and memory use can exceed the ceiling by up
+  to `max_in_flight` feeders.
+
+This replaces running one process per feeder, each with its own channel and its own copy of the network.
+"""
+
+import asyncio
+import inspect
+import json
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from grpc import Channel
+from zepben.ewb import NetworkConsumerClient, NetworkService, IdentifiedObject, IncludedEnergizedContainers, IncludedEnergizingContainers, Feeder, \
+    connect_with_token
+
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache
+
+__all__ = ["FeederFetchPool", "FeederFetchResults", "FeederConsumer"]
+
+FeederConsumer = Callable[[str, NetworkService], Union[Awaitable[None], None]]
+"""Called with the mRID of each fetched feeder and the `NetworkService` it was fetched into. May be a plain function or a coroutine function."""
+
+
+@dataclass
+class FeederFetchResults:
+    """The outcome of a `FeederFetchPool.run`."""
+
+    succeeded: List[str] = field(default_factory=list)
+    """The mRIDs of the feeders that were fetched and consumed without error, in the order they were consumed."""
+
+    failed: Dict[str, Exception] = field(default_factory=dict)
+    """The error raised while fetching or consuming each feeder that failed, by feeder mRID."""
+
+
+class FeederFetchPool:
+    """
+    A bounded pool of `get_equipment_container` calls sharing one gRPC channel.
+
+    :param channel: The channel to fetch every feeder over.
+    :param max_in_flight: The maximum number of feeders being fetched at the same time.
+    :param max_objects_in_memory: New fetches wait while fetched feeders that have not been consumed yet hold more than this many objects. At least one
+        feeder is always allowed through, so a single feeder larger than the ceiling is still processed. Feeders that are still being fetched are not
+        counted. None for no ceiling.
+    :param include_energizing_containers: The energizing containers to fetch with each feeder.
+    :param include_energized_containers: The energized containers to fetch with each feeder.
+    :param snapshot_cache: An optional `FeederSnapshotCache` to load feeders from, and store them in, instead of always fetching them from the server.
+    """
+
+    def __init__(
+        self,
+        channel: Channel,
+        max_in_flight: int = 4,
+        max_objects_in_memory: Optional[int] = 2_000_000,
+        include_energizing_containers: IncludedEnergizingContainers = IncludedEnergizingContainers.NONE,
+        include_energized_containers: IncludedEnergizedContainers = IncludedEnergizedContainers.LV_FEEDERS,
+        snapshot_cache: Optional[FeederSnapshotCache] = None
+    ):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+
+        self.channel = channel
+        self.max_in_flight = max_in_flight
+        self.max_objects_in_memory = max_objects_in_memory
+        self.include_energizing_containers = include_energizing_containers
+        self.include_energized_containers = include_energized_containers
+        self.snapshot_cache = snapshot_cache
+
+        self._objects_in_memory = 0
+        self._memory_available: Optional[asyncio.Condition] = None
+
+    async def run(self, feeder_mrids: Iterable[str], consumer: FeederConsumer, on_progress: Callable[[str], None] = None) -> FeederFetchResults:
+        """
+        Fetch every feeder in `feeder_mrids` and pass each one to `consumer`.
+
+        Consumers are called one at a time, in the order the fetches complete. A failed fetch, or an exception raised by `consumer`, is recorded against the
+        feeder in the returned results and does not stop the other feeders being processed.
+
+        :param feeder_mrids: The mRIDs of the feeders to fetch.
+        :param consumer: Called with each fetched feeder. The `NetworkService` is released once it returns, so do not keep references to its objects.
+        :param on_progress: Optional callback, called with the mRID of each feeder once it has been consumed or has failed, e.g. `tqdm.update`.
+        """
+        results = FeederFetchResults()
+        remaining = iter(feeder_mrids)
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+
+        self._objects_in_memory = 0
+        self._memory_available = asyncio.Condition()
+
+        async def fetch_remaining():
+            # Each worker pulls the next mRID from the shared iterator, so at most `max_in_flight` fetches are running at once.
+            for feeder_mrid in remaining:
+                await self._wait_for_memory()
+                try:
+                    network = await self._fetch(feeder_mrid)
+                except Exception as e:
+                    results.failed[feeder_mrid] = e
+                    if on_progress is not None:
+                        on_progress(feeder_mrid)
+                    continue
+
+                size = network.len_of(IdentifiedObject)
+                async with self._memory_available:
+                    self._objects_in_memory += size
+                await fetched.put((feeder_mrid, network, size))
+                # Drop this worker's reference, so the feeder is freed as soon as the consumer is done with it rather than when the next fetch completes.
+                del network
+
+        async def consume_fetched():
+            while True:
+                item = await fetched.get()
+                if item is None:
+                    return
+
+                feeder_mrid, network, size = item
+                try:
+                    outcome = consumer(feeder_mrid, network)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                    results.succeeded.append(feeder_mrid)
+                except Exception as e:
+                    results.failed[feeder_mrid] = e
+                finally:
+                    del item, network
+                    async with self._memory_available:
+                        self._objects_in_memory -= size
+                        self._memory_available.notify_all()
+                    if on_progress is not None:
+                        on_progress(feeder_mrid)
+
+        consumer_task = asyncio.create_task(consume_fetched())
+        try:
+            await asyncio.gather(*(fetch_remaining() for _ in range(self.max_in_flight)))
+            await fetched.put(None)
+            await consumer_task
+        finally:
+            consumer_task.cancel()
+
+        return results
+
+    async def _wait_for_memory(self):
+        if self.max_objects_in_memory is None:
+            return
+
+        async with self._memory_available:
+            await self._memory_available.wait_for(lambda: self._objects_in_memory == 0 or self._objects_in_memory < self.max_objects_in_memory)
+
+    async def _fetch(self, feeder_mrid: str) -> NetworkService:
+        client = NetworkConsumerClient(self.channel)
+        if self.snapshot_cache is not None:
+            result = await self.snapshot_cache.get_equipment_container(
+                client,
+                feeder_mrid,
+                expected_class=Feeder,
+                include_energizing_containers=self.include_energizing_containers,
+                include_energized_containers=self.include_energized_containers
+            )
+        else:
+            result = await client.get_equipment_container(
+                feeder_mrid,
+                expected_class=Feeder,
+                include_energizing_containers=self.include_energizing_containers,
+                include_energized_containers=self.include_energized_containers
+            )
+
+        result.throw_on_error()
+        return client.service
+
+
+async def main():
+    from tqdm import tqdm
+
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+    feeder_mrids = list((await NetworkConsumerClient(channel).get_network_hierarchy()).throw_on_error().value.feeders)
+
+    def print_size(feeder_mrid: str, network: NetworkService):
+        tqdm.write(f"{feeder_mrid}: {network.len_of(IdentifiedObject)} objects")
+
+    with tqdm(total=len(feeder_mrids)) as progress:
+        results = await FeederFetchPool(channel, max_in_flight=4).run(feeder_mrids, print_size, on_progress=lambda _: progress.update())
+
+    print(f"Processed {len(results.succeeded)} feeders, {len(results.failed)} failed.")
+    for feeder_mrid, error in results.failed.items():
+        print(f"    {feeder_mrid}: {error}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,431 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Updates the current phases, feeder direction and feeder assignment of a network after switches are operated, only in the parts of the network the
+switching affects.
+
+current_state_manipulations.py does this by clearing whole feeders and tracing them again from their heads, which costs the same however small the
+change. `FeederReassignment` instead finds, before operating the switches, what is supplied through each switch that is about to open. After operating
+them it:
+
+* clears the phases, direction and feeders of everything that was supplied through each opened switch, then flows back in any phases that are still
+  closed through it,
+* flows phases and direction out through each closed switch that has supply on one side, and assigns the feeders of the switch to what is beyond it. When
+  a closed switch joins two feeders, phases also flow out through the head of each feeder from the other, as they do when the network is traced from its
+  feeder heads. A full trace only does this for the feeders traced after the first one to reach the loop, so heads are the one place the result can
+  differ from it.
+
+The traces that flow phases and direction stop as soon as they stop changing anything, so only the far side of each operated switch is traced. When an
+opened switch was part of a loop, so that its far side is still connected to a feeder head, the feeders of that head are traced again from it.
+
+Each update returns a `FeederStateDelta` with the equipment that changed feeders, and the equipment that was energised or de-energised.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Type
+
+from zepben.ewb import (
+    AuxiliaryEquipment, ConductingEquipment, Equipment, EquipmentContainer, Feeder, FeederDirection, LvFeeder, NetworkService, NetworkStateOperators,
+    NetworkTraceActionType, PowerElectronicsConnection, PowerTransformer, SinglePhaseKind, Switch, Terminal, Tracing, stop_at_open
+)
+
+__all__ = ["FeederReassignment", "FeederStateDelta", "ContainerChange", "SwitchChange"]
+
+# A piece of equipment, the mRIDs of its current containers, and whether it is energised.
+_Snapshot = Tuple[ConductingEquipment, FrozenSet[str], bool]
+
+
+@dataclass(frozen=True)
+class SwitchChange:
+    """A switch to be opened or closed."""
+
+    switch: Switch
+    is_open: bool
+    phase: Optional[SinglePhaseKind] = None
+    """The phase to operate, or None to operate every phase."""
+
+
+@dataclass(frozen=True)
+class ContainerChange:
+    """A piece of equipment whose current feeders or LV feeders changed."""
+
+    equipment: ConductingEquipment
+    before: FrozenSet[str]
+    """The mRIDs of the current containers of the equipment before the switching."""
+
+    after: FrozenSet[str]
+    """The mRIDs of the current containers of the equipment after the switching."""
+
+    @property
+    def added(self) -> FrozenSet[str]:
+        return self.after - self.before
+
+    @property
+    def removed(self) -> FrozenSet[str]:
+        return self.before - self.after
+
+
+@dataclass
+class FeederStateDelta:
+    """What changed in the current state of the network when a set of switches was operated."""
+
+    switches: List[Switch] = field(default_factory=list)
+    """The switches whose open state changed. Changes that left a switch as it was are not included."""
+
+    equipment_checked: int = 0
+    """How many pieces of conducting equipment were in the parts of the network that were updated."""
+
+    containers: List[ContainerChange] = field(default_factory=list)
+    """The conducting equipment whose current feeders or LV feeders changed."""
+
+    energised: List[ConductingEquipment] = field(default_factory=list)
+    """The conducting equipment that had no current phases before the switching, and does now."""
+
+    de_energised: List[ConductingEquipment] = field(default_factory=list)
+    """The conducting equipment that had current phases before the switching, and now has none."""
+
+    def of_type(self, equipment_type: Type[ConductingEquipment]) -> List[ContainerChange]:
+        """The container changes of equipment of `equipment_type`, e.g. `PowerTransformer` for the distribution transformers that changed feeder."""
+        return [change for change in self.containers if isinstance(change.equipment, equipment_type)]
+
+    def added_to(self, container: EquipmentContainer) -> List[ConductingEquipment]:
+        """The equipment that is now in `container` and was not before."""
+        return [change.equipment for change in self.containers if container.mrid in change.added]
+
+    def removed_from(self, container: EquipmentContainer) -> List[ConductingEquipment]:
+        """The equipment that was in `container` and is not any more."""
+        return [change.equipment for change in self.containers if container.mrid in change.removed]
+
+
+class FeederReassignment:
+    """
+    Operates switches in the current state of a network, keeping the current phases, feeder direction and feeder and LV feeder assignment up to date.
+
+    The network must already have current phases, direction and feeders, e.g. from `assign_directions_and_feeders(network, NetworkStateOperators.CURRENT)`
+    or the SDK phase and feeder traces run with the current state. Phases are flowed per phase, so a switch can be operated on one phase, but as with the
+    SDK's own traces a switch that is open on any phase stops feeder direction and feeder assignment. Protection systems stay in the feeders they were
+    assigned to.
+
+    :param network: The network to update.
+    """
+
+    _state_operators = NetworkStateOperators.CURRENT
+
+    def __init__(self, network: NetworkService):
+        self.network = network
+
+        # Network objects all hash the same as others of their type, so everything is looked up by mRID.
+        self._feeder_heads: Dict[str, List[Feeder]] = {}
+        for feeder in network.objects(Feeder):
+            if feeder.normal_head_terminal is not None and feeder.normal_head_terminal.conducting_equipment is not None:
+                self._feeder_heads.setdefault(feeder.normal_head_terminal.conducting_equipment.mrid, []).append(feeder)
+        self._head_terminals = {feeder.normal_head_terminal.mrid for feeders in self._feeder_heads.values() for feeder in feeders}
+        self._lv_feeder_heads: Dict[str, List[LvFeeder]] = {}
+        for lv_feeder in network.objects(LvFeeder):
+            if lv_feeder.normal_head_terminal is not None and lv_feeder.normal_head_terminal.conducting_equipment is not None:
+                self._lv_feeder_heads.setdefault(lv_feeder.normal_head_terminal.conducting_equipment.mrid, []).append(lv_feeder)
+        self._aux_equipment: Dict[str, List[AuxiliaryEquipment]] = {}
+        for aux in network.objects(AuxiliaryEquipment):
+            if aux.terminal is not None:
+                self._aux_equipment.setdefault(aux.terminal.mrid, []).append(aux)
+
+    async def apply(self, changes: Iterable[SwitchChange]) -> FeederStateDelta:
+        """
+        Operate switches and update everything they supply.
+
+        :param changes: The switches to operate. They are applied in order, so a later change to the same switch overrides an earlier one.
+        :return: What the switching changed.
+        """
+        ops = self._state_operators
+        changes = list(changes)
+        switches = list({change.switch.mrid: change.switch for change in changes}.values())
+        before = {switch.mrid: self._open_phases(switch) for switch in switches}
+
+        # Find what is supplied through each switch that is opening before opening it, along with the feeders supplying it.
+        snapshots: Dict[str, _Snapshot] = {}
+        supplied_through: Dict[str, Tuple[List[EquipmentContainer], Dict[str, ConductingEquipment], List[Terminal]]] = {}
+        for switch in switches:
+            if not all(before[switch.mrid]) and any(change.is_open for change in changes if change.switch is switch):
+                equipment, terminals = {}, []
+                for terminal in self._far_terminals(switch):
+                    region_equipment, region_terminals = await self._region(terminal)
+                    equipment.update(region_equipment)
+                    terminals.extend(region_terminals)
+                if equipment:
+                    self._snapshot(equipment.values(), snapshots)
+                    supplied_through[switch.mrid] = (list(ops.get_containers(switch)), equipment, terminals)
+
+        for change in changes:
+            ops.set_open(change.switch, change.is_open, change.phase)
+
+        delta = FeederStateDelta(switches=[switch for switch in switches if self._open_phases(switch) != before[switch.mrid]])
+
+        for switch in delta.switches:
+            if switch.mrid in supplied_through:
+                await self._clear(switch, *supplied_through[switch.mrid])
+
+        for switch in delta.switches:
+            await self._supply_through(switch, snapshots)
+
+        for mrid, (head, _, _) in snapshots.items():
+            for lv_feeder in self._lv_feeder_heads.get(mrid, ()):
+                self._update_energizing(head, lv_feeder)
+
+        delta.equipment_checked = len(snapshots)
+        for equipment, containers, energised in snapshots.values():
+            _, containers_after, energised_after = self._state_of(equipment)
+            if containers_after != containers:
+                delta.containers.append(ContainerChange(equipment, containers, containers_after))
+            if energised_after and not energised:
+                delta.energised.append(equipment)
+            elif energised and not energised_after:
+                delta.de_energised.append(equipment)
+
+        return delta
+
+    async def _clear(self, switch: Switch, containers: List[EquipmentContainer], equipment: Dict[str, ConductingEquipment], terminals: List[Terminal]):
+        ops = self._state_operators
+        heads = [head for mrid, head in equipment.items() if mrid in self._feeder_heads and not ops.is_open(head)]
+        head_terminals = {feeder.normal_head_terminal.mrid for head in heads for feeder in self._feeder_heads[head.mrid]}
+
+        for terminal in terminals:
+            ops.set_direction(terminal, FeederDirection.NONE)
+            if terminal.mrid not in head_terminals:
+                phases = ops.phase_status(terminal)
+                for phase in terminal.phases.single_phases:
+                    phases[phase] = SinglePhaseKind.NONE
+
+        # Direction flowing into a feeder head from a neighbouring feeder carries on through the head, so clear the rest of each head reached as well. So
+        # do phases, which are only left on the far side of the head if something beyond it supplies them.
+        for mrid, head in equipment.items():
+            if mrid in self._feeder_heads:
+                for terminal in head.terminals:
+                    ops.set_direction(terminal, FeederDirection.NONE)
+                    if terminal.mrid not in self._head_terminals and not any(self._is_energised(it) for it in terminal.connected_terminals()):
+                        phases = ops.phase_status(terminal)
+                        for phase in terminal.phases.single_phases:
+                            phases[phase] = SinglePhaseKind.NONE
+
+        for container in containers:
+            for piece in equipment.values():
+                if piece is not switch:
+                    self._remove(piece, container)
+
+            if isinstance(container, Feeder):
+                self._remove_energized_lv_substations(container, equipment)
+
+        # The far side of the switch reached a feeder head, so it was part of a loop and may still be supplied around it. Trace those feeders again from
+        # their heads, and any LV feeders that were cleared from theirs.
+        for head in heads:
+            for feeder in self._feeder_heads[head.mrid]:
+                ops.associate_equipment_and_container(head, feeder)
+                await Tracing.set_phases().run(feeder.normal_head_terminal, network_state_operators=ops)
+                await Tracing.set_direction().run(feeder.normal_head_terminal, network_state_operators=ops)
+                await Tracing.assign_equipment_to_feeders().run(self.network, ops, start_terminal=feeder.normal_head_terminal)
+
+        for lv_feeder in containers:
+            if isinstance(lv_feeder, LvFeeder) and lv_feeder.normal_head_terminal is not None:
+                head = lv_feeder.normal_head_terminal.conducting_equipment
+                if head.mrid in equipment and head is not switch:
+                    ops.associate_equipment_and_container(head, lv_feeder)
+                    await Tracing.assign_equipment_to_lv_feeders().run(self.network, ops, start_terminal=lv_feeder.normal_head_terminal)
+
+    async def _supply_through(self, switch: Switch, snapshots: Dict[str, _Snapshot]):
+        # Flow phases out of each terminal of the switch that has supply on another terminal, counting the head terminal of a feeder as supplied by the
+        # feeder. If the switch is closed, also flow direction out of terminals with a feeder coming in on another, and assign the switch's feeders to
+        # what is beyond it. Feeders are assigned whether or not they are energised, as they are when traced from their heads.
+        ops = self._state_operators
+        if all(self._open_phases(switch)):
+            return
+
+        is_closed = not ops.is_open(switch)
+        containers = {container.mrid for container in ops.get_containers(switch)}
+        # The feeders on each side of the switch before anything is flowed through it.
+        feeders_beyond = {
+            terminal.mrid: {feeder.mrid for connected in terminal.connected_terminals() for feeder in connected.conducting_equipment.feeders(ops)}
+            for terminal in switch.terminals
+        }
+        for terminal in switch.terminals:
+            others = [other for other in switch.terminals if other is not terminal]
+            is_head = terminal.mrid in self._head_terminals
+            is_supplied = is_head or any(self._is_energised(other) for other in others)
+            has_direction = is_head or any(FeederDirection.UPSTREAM in ops.get_direction(other) for other in others)
+
+            # Only assign the switch's feeders beyond it if they are missing there, to avoid tracing the far side of a switch closed into its own feeder.
+            beyond = [connected.conducting_equipment for connected in terminal.connected_terminals()]
+            is_missing_feeders = any(not containers <= {container.mrid for container in ops.get_containers(piece)} for piece in beyond)
+
+            if not is_supplied and not (is_closed and (has_direction or is_missing_feeders)):
+                continue
+
+            equipment, _ = await self._region(terminal)
+            self._snapshot(equipment.values(), snapshots)
+
+            if is_supplied:
+                for other in others:
+                    await Tracing.set_phases().run(terminal, phases=other.phases.single_phases, network_state_operators=ops, seed_terminal=other)
+                supplying_feeders = set().union(*(feeders_beyond[other.mrid] for other in others))
+                if supplying_feeders:
+                    await self._supply_back_through_heads(equipment, supplying_feeders)
+
+            if not is_closed:
+                continue
+
+            if has_direction:
+                await Tracing.set_direction().run(terminal, network_state_operators=ops)
+
+            if is_missing_feeders:
+                if any(isinstance(container, Feeder) for container in ops.get_containers(switch)):
+                    await Tracing.assign_equipment_to_feeders().run(self.network, ops, start_terminal=terminal)
+                if any(isinstance(container, LvFeeder) for container in ops.get_containers(switch)):
+                    await Tracing.assign_equipment_to_lv_feeders().run(self.network, ops, start_terminal=terminal)
+
+    async def _supply_back_through_heads(self, equipment: Dict[str, ConductingEquipment], supplying_feeders: Set[str]):
+        # Phases flowing into a feeder from a neighbouring one carry on out through the feeder's head, as they do when the whole network is traced. The
+        # trace that reached the head stops there, as the feeder side of the head is already supplied, so flow them on from the head terminal.
+        ops = self._state_operators
+        for mrid, head in equipment.items():
+            if mrid not in self._feeder_heads or ops.is_open(head):
+                continue
+
+            for feeder in self._feeder_heads[mrid]:
+                if feeder.mrid in supplying_feeders:
+                    continue
+
+                head_terminal = feeder.normal_head_terminal
+                for terminal in head.terminals:
+                    if terminal is not head_terminal:
+                        await Tracing.set_phases().run(
+                            terminal,
+                            phases=head_terminal.phases.single_phases,
+                            network_state_operators=ops,
+                            seed_terminal=head_terminal
+                        )
+
+    async def _region(self, terminal: Terminal) -> Tuple[Dict[str, ConductingEquipment], List[Terminal]]:
+        # Everything connected to `terminal` away from its own equipment, up to open switches, feeder heads and zone substation transformers.
+        equipment = {}
+        terminals = []
+
+        def collect(step, _):
+            equipment[step.path.to_equipment.mrid] = step.path.to_equipment
+            terminals.append(step.path.to_terminal)
+
+        await (
+            Tracing.network_trace(network_state_operators=self._state_operators, action_step_type=NetworkTraceActionType.ALL_STEPS)
+            .add_condition(stop_at_open())
+            .add_stop_condition(lambda step, _: step.path.to_equipment.mrid in self._feeder_heads)
+            .add_queue_condition(lambda step, *_: not _is_substation_transformer(step.path.to_equipment))
+            .add_step_action(collect)
+        ).run(terminal, can_stop_on_start_item=False)
+
+        return equipment, terminals
+
+    def _far_terminals(self, switch: Switch) -> List[Terminal]:
+        # The terminals of the switch that are supplied through it: the head terminal of a feeder, and terminals with supply coming in on another
+        # terminal that either lead downstream or are not supplied from elsewhere. A switch without any direction is not supplied by a feeder, but can
+        # still be in an LV feeder from either side, so all of its terminals are used.
+        ops = self._state_operators
+        if all(ops.get_direction(terminal) == FeederDirection.NONE for terminal in switch.terminals):
+            return list(switch.terminals)
+
+        far = []
+        for terminal in switch.terminals:
+            direction = ops.get_direction(terminal)
+            if terminal.mrid in self._head_terminals:
+                if FeederDirection.DOWNSTREAM in direction:
+                    far.append(terminal)
+            elif any(FeederDirection.UPSTREAM in ops.get_direction(other) for other in switch.terminals if other is not terminal) and \
+                    (FeederDirection.DOWNSTREAM in direction or FeederDirection.UPSTREAM not in direction):
+                far.append(terminal)
+        return far
+
+    def _remove(self, equipment: ConductingEquipment, container: EquipmentContainer):
+        ops = self._state_operators
+        related: List[Equipment] = [equipment]
+        related.extend(aux for terminal in equipment.terminals for aux in self._aux_equipment.get(terminal.mrid, ()))
+        if isinstance(equipment, PowerElectronicsConnection):
+            related.extend(equipment.units)
+
+        for piece in related:
+            if any(it is container for it in ops.get_containers(piece)):
+                ops.disassociate_equipment_and_container(piece, container)
+
+    def _update_energizing(self, head: ConductingEquipment, lv_feeder: LvFeeder):
+        # An LV feeder is energised by the feeders its head equipment is in.
+        ops = self._state_operators
+        feeders = list(head.feeders(ops))
+        for feeder in list(ops.get_energizing_feeders(lv_feeder)):
+            if not any(it is feeder for it in feeders):
+                feeder.remove_current_energized_lv_feeder(lv_feeder)
+                lv_feeder.remove_current_energizing_feeder(feeder)
+        for feeder in feeders:
+            ops.associate_energizing_feeder(feeder, lv_feeder)
+
+    def _remove_energized_lv_substations(self, feeder: Feeder, equipment: Dict[str, ConductingEquipment]):
+        # An LV substation stays energised by the feeder while any of its transformers are still in it.
+        for lv_substation in list(feeder.current_energized_lv_substations):
+            transformers = [it for it in lv_substation.equipment if isinstance(it, PowerTransformer)]
+            if any(it.mrid in equipment for it in transformers) and not any(container is feeder for it in transformers for container in it.current_containers):
+                feeder.remove_current_energized_lv_substation(lv_substation)
+                lv_substation.remove_current_energizing_feeder(feeder)
+
+    def _snapshot(self, equipment: Iterable[ConductingEquipment], snapshots: Dict[str, _Snapshot]):
+        for piece in equipment:
+            if piece.mrid not in snapshots:
+                snapshots[piece.mrid] = self._state_of(piece)
+
+    def _state_of(self, equipment: ConductingEquipment) -> _Snapshot:
+        containers = frozenset(container.mrid for container in self._state_operators.get_containers(equipment))
+        return equipment, containers, any(self._is_energised(terminal) for terminal in equipment.terminals)
+
+    def _is_energised(self, terminal: Terminal) -> bool:
+        phases = self._state_operators.phase_status(terminal)
+        return any(phases[phase] != SinglePhaseKind.NONE for phase in terminal.phases.single_phases)
+
+    def _open_phases(self, switch: Switch) -> Tuple[bool, ...]:
+        return tuple(self._state_operators.is_open(switch, phase) for phase in (SinglePhaseKind.A, SinglePhaseKind.B, SinglePhaseKind.C, SinglePhaseKind.N))
+
+
+def _is_substation_transformer(equipment: ConductingEquipment) -> bool:
+    return isinstance(equipment, PowerTransformer) and equipment.num_substations() > 0
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.examples.synthetic_feeder import build_synthetic_zone, assign_directions_and_feeders
+
+    network = build_synthetic_zone(feeder_count=2, backbone_spans=100, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network, NetworkStateOperators.CURRENT)
+    reassignment = FeederReassignment(network)
+
+    # Move the second half of fdr_0 onto fdr_1, as run_swap_feeder in current_state_manipulations.py does: close the tie between the feeders, then open
+    # the sectionaliser in the middle of fdr_0.
+    tie = network.get("fdr_0_tie", Switch)
+    sectionaliser = network.get("fdr_0_sect_50", Switch)
+    fdr_0 = network.get("fdr_0", Feeder)
+    fdr_1 = network.get("fdr_1", Feeder)
+
+    start = perf_counter()
+    delta = await reassignment.apply([SwitchChange(tie, is_open=False), SwitchChange(sectionaliser, is_open=True)])
+    print(f"Swapped {len(delta.switches)} switches in {(perf_counter() - start) * 1000:.1f} ms, checking {delta.equipment_checked} equipment")
+    print(f"    {len([tx for tx in delta.added_to(fdr_1) if isinstance(tx, PowerTransformer)])} transformers moved from {fdr_0.mrid} to {fdr_1.mrid}")
+
+    start = perf_counter()
+    delta = await reassignment.apply([SwitchChange(sectionaliser, is_open=False), SwitchChange(tie, is_open=True)])
+    print(f"Swapped back in {(perf_counter() - start) * 1000:.1f} ms, {len(delta.of_type(PowerTransformer))} transformers changed feeder")
+
+    fuse = network.get("fdr_1_fuse_10_0", Switch)
+    delta = await reassignment.apply([SwitchChange(fuse, is_open=True)])
+    print(f"Opening {fuse.mrid} de-energised {len(delta.de_energised)} equipment")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
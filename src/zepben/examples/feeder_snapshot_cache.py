@@ -0,0 +1,320 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+A local, on-disk cache of fetched feeders, so scripts that are run repeatedly only download each feeder from the EWB server once per network model.
+
+Each snapshot is stored in a SQLite file as the zlib compressed protobuf of every object that was fetched, which is the same form the server streams them
+in. Loading a snapshot replays those objects into a `NetworkService` the same way `NetworkConsumerClient` does, so feeder directions and phases are as they
+were when the feeder was fetched.
+
+Snapshots are keyed by the feeder mRID, the containers included with it and the date of the network model they were fetched from. Use
+`FeederSnapshotCache.for_ewb_data` to take the network model date from the EWB data directory (see list_ewb_network_models.py), which also removes
+snapshots of any older network model.
+
+The network hierarchy can be cached the same way, with one snapshot per network model, so scripts that start by fetching the hierarchy of a large utility
+do not wait for it on every run.
+"""
+
+import asyncio
+import json
+import sqlite3
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from grpc import Channel
+from zepben.ewb import NetworkService, NetworkConsumerClient, IdentifiedObject, IncludedEnergizedContainers, IncludedEnergizingContainers, \
+    DatabaseType, EquipmentContainer, GrpcResult, connect_with_token, NetworkHierarchy, GeographicalRegion, SubGeographicalRegion, Substation, Feeder, \
+    Circuit, Loop, LvSubstation, LvFeeder, ConnectivityNode
+from zepben.ewb.streaming.get.consumer import MultiObjectResult
+from zepben.protobuf.nc.nc_data_pb2 import NetworkIdentifiable
+from zepben.protobuf.nc.nc_pb2_grpc import NetworkConsumerStub
+from zepben.protobuf.nc.nc_responses_pb2 import GetEquipmentForContainersResponse, GetNetworkHierarchyResponse
+
+from zepben.examples.utils import get_available_dates
+
+__all__ = ["FeederSnapshotCache", "network_hierarchy_response"]
+
+# Maps the name of each protobuf message type to the field it is stored in on `NetworkIdentifiable`.
+_PB_FIELDS = {field.message_type.name: field.name for field in NetworkIdentifiable.DESCRIPTOR.fields}
+
+
+class FeederSnapshotCache:
+    """
+    A SQLite backed cache of `NetworkService` snapshots fetched from the EWB server.
+
+    :param cache_file: The SQLite file to store the snapshots in. It is created if it does not exist.
+    :param network_model_date: The date of the network model the EWB server is serving. Snapshots for other dates are never returned.
+    """
+
+    def __init__(self, cache_file: Union[Path, str], network_model_date: date):
+        self.cache_file = Path(cache_file)
+        self.network_model_date = network_model_date
+
+        self._connection = sqlite3.connect(self.cache_file)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feeder_snapshots (
+                feeder_mrid TEXT NOT NULL,
+                included_containers TEXT NOT NULL,
+                network_model_date TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (feeder_mrid, included_containers, network_model_date)
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hierarchy_snapshots (
+                network_model_date TEXT NOT NULL PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    @classmethod
+    def for_ewb_data(cls, cache_file: Union[Path, str], ewb_data_dir: Union[Path, str]) -> 'FeederSnapshotCache':
+        """
+        Create a cache for the latest network model database in an EWB data directory, removing any snapshots of older network models.
+
+        :param cache_file: The SQLite file to store the snapshots in.
+        :param ewb_data_dir: The EWB data directory the server loads its network models from.
+        """
+        dates = get_available_dates(ewb_data_dir, DatabaseType.NETWORK_MODEL)
+        if not dates:
+            raise ValueError(f"No network model databases found in {ewb_data_dir}")
+
+        cache = cls(cache_file, dates[-1])
+        cache.evict_other_dates()
+        return cache
+
+    def __enter__(self) -> 'FeederSnapshotCache':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    async def get_equipment_container(
+        self,
+        client: NetworkConsumerClient,
+        mrid: str,
+        expected_class: type = EquipmentContainer,
+        include_energizing_containers: IncludedEnergizingContainers = IncludedEnergizingContainers.NONE,
+        include_energized_containers: IncludedEnergizedContainers = IncludedEnergizedContainers.NONE,
+        channel: Optional[Channel] = None,
+        stub: Optional[NetworkConsumerStub] = None
+    ) -> GrpcResult[MultiObjectResult]:
+        """
+        A drop-in replacement for `NetworkConsumerClient.get_equipment_container`. If the container has already been fetched for this network model its
+        snapshot is loaded into `client.service`, otherwise it is fetched from the EWB server and, if that succeeds, a snapshot is stored in the cache.
+
+        A snapshot holds every object a new client has after fetching the container, including the network hierarchy and the objects the container
+        references, so loading it gives the same network as fetching it. When `client` already holds other objects, the container is fetched with a new
+        client on `channel` or `stub` and its snapshot loaded into `client.service`, as objects it already held would otherwise be left out of the snapshot.
+        If neither is given, the container is fetched with `client` and no snapshot is stored.
+
+        :param client: The client to fetch the container with, and whose service the container is loaded into.
+        :param mrid: The mRID of the equipment container to fetch.
+        :param expected_class: The expected type of the equipment container.
+        :param include_energizing_containers: The energizing containers to fetch with the container.
+        :param include_energized_containers: The energized containers to fetch with the container.
+        :param channel: The channel `client` was created with, to fetch the container over when `client` already holds other objects.
+        :param stub: The stub `client` was created with, to use instead of `channel`.
+        """
+        included_containers = _included_containers_key(include_energizing_containers, include_energized_containers)
+
+        objects = self.load_into(client.service, mrid, included_containers)
+        if objects is not None:
+            return _loaded(objects)
+
+        # `get_equipment_container` only returns the objects it added, so the snapshot is taken from a service that held nothing else beforehand.
+        fetching_client = client
+        held_other_objects = client.service.len_of(IdentifiedObject) != 0
+        if held_other_objects and (channel is not None or stub is not None):
+            fetching_client = NetworkConsumerClient(channel=channel, stub=stub, timeout=client.timeout)
+            held_other_objects = False
+
+        result = await fetching_client.get_equipment_container(
+            mrid,
+            expected_class=expected_class,
+            include_energizing_containers=include_energizing_containers,
+            include_energized_containers=include_energized_containers
+        )
+        if result.was_failure or held_other_objects:
+            return result
+
+        self.save(mrid, included_containers, fetching_client.service.objects())
+        if fetching_client is client:
+            return result
+        return _loaded(self.load_into(client.service, mrid, included_containers))
+
+    def load_into(self, service: NetworkService, mrid: str, included_containers: str) -> Optional[Dict[str, IdentifiedObject]]:
+        """
+        Load the snapshot stored for `mrid` and `included_containers` against this network model date into `service`. Objects already in `service` are kept.
+
+        :return: The objects in the snapshot by mRID, or None if there was no snapshot to load.
+        """
+        row = self._connection.execute(
+            "SELECT payload FROM feeder_snapshots WHERE feeder_mrid = ? AND included_containers = ? AND network_model_date = ?",
+            (mrid, included_containers, self.network_model_date.isoformat())
+        ).fetchone()
+        if row is None:
+            return None
+
+        objects = {}
+        snapshot = GetEquipmentForContainersResponse.FromString(zlib.decompress(row[0]))
+        for nio in snapshot.identifiables:
+            pb = getattr(nio, nio.WhichOneof("identifiable"))
+            io = service.get(pb.mrid(), default=None) or service.add_from_pb(pb)
+            objects[io.mrid] = io
+        return objects
+
+    def save(self, mrid: str, included_containers: str, objects: Iterable[IdentifiedObject]):
+        """Store `objects` as the snapshot for `mrid` and `included_containers` against this network model date."""
+        # Connectivity nodes go last, as each terminal creates its node when it is loaded, and a node loaded before its terminals leaves their references
+        # to it unresolved.
+        snapshot = GetEquipmentForContainersResponse(identifiables=[
+            NetworkIdentifiable(**{_PB_FIELDS[type(pb).__name__]: pb})
+            for pb in (io.to_pb() for io in sorted(objects, key=lambda it: isinstance(it, ConnectivityNode)))
+        ])
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO feeder_snapshots VALUES (?, ?, ?, ?, ?)",
+            (mrid, included_containers, self.network_model_date.isoformat(), datetime.now().isoformat(), zlib.compress(snapshot.SerializeToString(), 1))
+        )
+        self._connection.commit()
+
+    async def get_network_hierarchy(self, client: NetworkConsumerClient) -> GrpcResult[NetworkHierarchy]:
+        """
+        A drop-in replacement for `NetworkConsumerClient.get_network_hierarchy`. If the hierarchy has already been fetched for this network model its
+        snapshot is loaded into `client.service`, otherwise it is fetched from the EWB server and, if that succeeds, a snapshot is stored in the cache.
+
+        :param client: The client to fetch the hierarchy with, and whose service the hierarchy is loaded into.
+        """
+        hierarchy = self.load_hierarchy_into(client.service)
+        if hierarchy is not None:
+            # noinspection PyArgumentList
+            return GrpcResult(hierarchy)
+
+        result = await client.get_network_hierarchy()
+        if result.was_successful:
+            self.save_hierarchy(result.value)
+
+        return result
+
+    def load_hierarchy_into(self, service: NetworkService) -> Optional[NetworkHierarchy]:
+        """
+        Load the hierarchy snapshot stored against this network model date into `service`. Objects already in `service` are kept.
+
+        :return: The loaded hierarchy, or None if there was no snapshot to load.
+        """
+        row = self._connection.execute(
+            "SELECT payload FROM hierarchy_snapshots WHERE network_model_date = ?",
+            (self.network_model_date.isoformat(),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        snapshot = GetNetworkHierarchyResponse.FromString(zlib.decompress(row[0]))
+
+        def to_map(pbs, cls) -> Dict[str, IdentifiedObject]:
+            # In the order the server sends them, so the references between them resolve the same way.
+            return {io.mrid: io for io in (service.get(pb.mrid(), cls, default=None) or service.add_from_pb(pb) for pb in pbs)}
+
+        # noinspection PyArgumentList
+        return NetworkHierarchy(
+            to_map(snapshot.geographicalRegions, GeographicalRegion),
+            to_map(snapshot.subGeographicalRegions, SubGeographicalRegion),
+            to_map(snapshot.substations, Substation),
+            to_map(snapshot.feeders, Feeder),
+            to_map(snapshot.circuits, Circuit),
+            to_map(snapshot.loops, Loop),
+            to_map(snapshot.lvSubstations, LvSubstation),
+            to_map(snapshot.lvFeeders, LvFeeder),
+        )
+
+    def save_hierarchy(self, hierarchy: NetworkHierarchy):
+        """Store `hierarchy` as the hierarchy snapshot for this network model date."""
+        snapshot = network_hierarchy_response(hierarchy)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO hierarchy_snapshots VALUES (?, ?, ?)",
+            (self.network_model_date.isoformat(), datetime.now().isoformat(), zlib.compress(snapshot.SerializeToString(), 1))
+        )
+        self._connection.commit()
+
+    def invalidate(self, mrid: str = None):
+        """
+        Remove the snapshots for `mrid` against all network model dates, or every snapshot, including those of the network hierarchy, if `mrid` is None.
+        """
+        if mrid is None:
+            self._connection.execute("DELETE FROM feeder_snapshots")
+            self._connection.execute("DELETE FROM hierarchy_snapshots")
+        else:
+            self._connection.execute("DELETE FROM feeder_snapshots WHERE feeder_mrid = ?", (mrid,))
+        self._connection.commit()
+
+    def evict_other_dates(self):
+        """Remove all snapshots that were not fetched from this network model date."""
+        self._connection.execute("DELETE FROM feeder_snapshots WHERE network_model_date != ?", (self.network_model_date.isoformat(),))
+        self._connection.execute("DELETE FROM hierarchy_snapshots WHERE network_model_date != ?", (self.network_model_date.isoformat(),))
+        self._connection.commit()
+        self._connection.execute("VACUUM")
+
+
+def network_hierarchy_response(hierarchy: NetworkHierarchy) -> GetNetworkHierarchyResponse:
+    """The `getNetworkHierarchy` response the EWB server sends for `hierarchy`."""
+    return GetNetworkHierarchyResponse(
+        geographicalRegions=[it.to_pb() for it in hierarchy.geographical_regions.values()],
+        subGeographicalRegions=[it.to_pb() for it in hierarchy.sub_geographical_regions.values()],
+        substations=[it.to_pb() for it in hierarchy.substations.values()],
+        feeders=[it.to_pb() for it in hierarchy.feeders.values()],
+        circuits=[it.to_pb() for it in hierarchy.circuits.values()],
+        loops=[it.to_pb() for it in hierarchy.loops.values()],
+        lvSubstations=[it.to_pb() for it in (hierarchy.lv_substations or {}).values()],
+        lvFeeders=[it.to_pb() for it in (hierarchy.lv_feeders or {}).values()],
+    )
+
+
+def _loaded(objects: Dict[str, IdentifiedObject]) -> GrpcResult[MultiObjectResult]:
+    mor = MultiObjectResult()
+    mor.objects = objects
+    # noinspection PyArgumentList
+    return GrpcResult(mor)
+
+
+def _included_containers_key(include_energizing_containers: IncludedEnergizingContainers, include_energized_containers: IncludedEnergizedContainers) -> str:
+    return f"{include_energizing_containers.name}/{include_energized_containers.name}"
+
+
+async def main():
+    from time import perf_counter
+
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+    feeder_mrid = "<FEEDER_MRID>"
+
+    # If you have access to the data directory of the EWB server, use `FeederSnapshotCache.for_ewb_data` instead so snapshots are invalidated when
+    # a new network model is loaded.
+    with FeederSnapshotCache("feeder_snapshots.sqlite", network_model_date=date.today()) as cache:
+        for run in ("Cold", "Warm"):
+            start = perf_counter()
+            client = NetworkConsumerClient(channel)
+            (await cache.get_equipment_container(client, feeder_mrid, include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)).throw_on_error()
+            print(f"{run} start: loaded {client.service.len_of(IdentifiedObject)} objects for {feeder_mrid} in {perf_counter() - start:.3f} seconds")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
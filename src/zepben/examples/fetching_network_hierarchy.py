@@ -6,7 +6,9 @@
 import asyncio
 import json
 
-from zepben.ewb import connect_with_token, NetworkConsumerClient
+from zepben.ewb import connect_with_token
+
+from zepben.examples.network_hierarchy_browser import NetworkHierarchyBrowser
 
 with open("config.json") as f:
     c = json.loads(f.read())
@@ -16,19 +18,18 @@ async def main():
     # See connecting_to_grpc_service.py for examples of each connect function
     print("Connecting to EWB..")
     channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
-    client = NetworkConsumerClient(channel)
     print("Connection established..")
-    # Fetch network hierarchy
-    network_hierarchy = await client.get_network_hierarchy()
+    # Fetch network hierarchy. Pass a `FeederSnapshotCache` as `snapshot_cache` to only fetch it once per network model, see network_hierarchy_browser.py.
+    browser = NetworkHierarchyBrowser(channel)
 
     print("Network hierarchy:")
-    for gr in network_hierarchy.result.geographical_regions.values():
+    for gr in await browser.children():
         print(f"- GeographicalRegion mRID: {gr.mrid} name: {gr.name}")
-        for sgr in gr.sub_geographical_regions:
+        for sgr in await browser.children(gr):
             print(f"  - SubgeographicalRegion mRID: {sgr.mrid} name: {sgr.name}")
-            for sub in sgr.substations:
+            for sub in await browser.children(sgr):
                 print(f"    - Substation mRID: {sub.mrid} name: {sub.name}")
-                for fdr in sub.feeders:
+                for fdr in await browser.children(sub):
                     print(f"      - Feeder mRID: {fdr.mrid} name: {fdr.name}")
 
 
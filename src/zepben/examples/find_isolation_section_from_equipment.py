@@ -18,6 +18,9 @@ from zepben.ewb import (
 )
 from zepben.ewb import Tracing, Switch
 
+from zepben.examples.isolation_sections import IsolationSections
+from zepben.examples.network_graph import NetworkGraph
+
 
 async def main(conductor_mrid: str, feeder_mrid: str):
     with open("config.json") as f:
@@ -59,6 +62,12 @@ async def main(conductor_mrid: str, feeder_mrid: str):
     # print a list of all mRID's for all equipment in the isolation area.
     print(found_equip)
 
+    # To find the isolation section of many pieces of equipment, split the whole feeder into sections once and look each one up.
+    sections = IsolationSections(NetworkGraph(network))
+    section = sections.section_of(hv_acls)
+    print({equipment.mrid for equipment in sections.equipment(section)})
+    print(f"Isolated by {', '.join(switch.mrid for switch in sections.boundary_switches(section))}")
+
 
 if __name__ == "__main__":
     asyncio.run(main(conductor_mrid='50434998', feeder_mrid='RW1292'))
@@ -9,37 +9,40 @@
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import asyncio
 import json
-import os
 from dataclasses import dataclass
 from typing import Optional
-import pandas as pd
 
-from zepben.ewb import NetworkConsumerClient, connect_with_token, ConductingEquipment, Feeder, IncludedEnergizedContainers
+from zepben.ewb import connect_with_token, ConductingEquipment, Feeder, NetworkService
+
+from zepben.examples.columnar_dataset import ColumnarDatasetWriter, arrow_schema
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache
+from zepben.examples.network_hierarchy_browser import NetworkHierarchyBrowser
 
 with open("./config.json") as f:
     c = json.loads(f.read())
 
 """
-This is a basic example that shows how to export a CSV of all the conducting equipment in a feeder.
-It will output one CSV per feeder in the network.
+This is a basic example that shows how to export all the conducting equipment in a feeder.
+It will output a single Parquet dataset in ./network_objects covering every feeder in the network, partitioned by equipment type. Read it back with e.g.
+`pd.read_parquet("network_objects", filters=[("feeder", "=", "<FEEDER_ID>")])`.
 """
 
+# Set this to a `FeederSnapshotCache` to only download the hierarchy and each feeder from the EWB server once per network model.
+# See feeder_snapshot_cache.py.
+snapshot_cache: Optional[FeederSnapshotCache] = None
+
 
 async def connect():
     channel = connect_with_token(host=c["host"], rpc_port=c["rpc_port"], access_token=c["access_token"], ca_filename=c["ca_path"])
-    network_client = NetworkConsumerClient(channel=channel)
+    # Fetches the next two feeders while the current one is processed. See network_hierarchy_browser.py.
+    browser = NetworkHierarchyBrowser(channel, prefetch=2, snapshot_cache=snapshot_cache)
 
-    network_hierarchy = (await network_client.get_network_hierarchy()).throw_on_error().value
-    print("Network hierarchy:")
-    for gr in network_hierarchy.geographical_regions.values():
-        print(f"- Geographical region: {gr.name}")
-        for sgr in gr.sub_geographical_regions:
-            print(f"  - Subgeographical region: {sgr.name}")
-            for sub in sgr.substations:
-                print(f"    - Zone Substation: {sub.name}")
-                for fdr in sub.feeders:
-                    print(f"      - Processing Feeder: {fdr.name}")
-                    await process_nodes(fdr.mrid, channel)
+    feeders = {feeder.mrid: feeder for feeder in await browser.feeders()}
+    print(f"Processing {len(feeders)} feeders")
+    with ColumnarDatasetWriter("network_objects", arrow_schema(NetworkObject), partition_by=["type"], overwrite=True) as writer:
+        async for feeder_mrid, network_service in browser.walk(feeders.values()):
+            print(f"- Processing Feeder: {feeders[feeder_mrid].name}")
+            process_nodes(feeder_mrid, network_service, writer)
 
 
 @dataclass
@@ -52,15 +55,7 @@ class NetworkObject(object):
     dist_tx_name: Optional[str] = None
 
 
-async def process_nodes(feeder_mrid: str, channel):
-    print("Fetching from server ...")
-    network_client = NetworkConsumerClient(channel=channel)
-    network_service = network_client.service
-    (await network_client.get_equipment_container(
-        feeder_mrid,
-        include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)
-     ).throw_on_error()
-
+def process_nodes(feeder_mrid: str, network_service: NetworkService, writer: ColumnarDatasetWriter):
     print("Processing equipment ...")
     feeder = network_service.get(feeder_mrid, Feeder)
     network_objects = []
@@ -78,10 +73,7 @@ async def process_nodes(feeder_mrid: str, channel):
                 no = NetworkObject(equip.mrid, type(equip).__name__, feeder_mrid, equip.base_voltage_value, head.mrid, head.name)
                 network_objects.append(no)
 
-    print(f"Writing csvs/{feeder_mrid}_network_objects.csv")
-    network_objects = pd.DataFrame(network_objects)
-    os.makedirs("csvs", exist_ok=True)
-    network_objects.to_csv(f"csvs/{feeder_mrid}_network_objects.csv", index=False)
+    writer.write_records(network_objects)
     print(f"Finished processing {feeder_mrid}")
 
 
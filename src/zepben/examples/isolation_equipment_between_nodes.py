@@ -11,14 +11,27 @@ of `ProtectedSwitch` objects found, if any
 
 import asyncio
 import json
-from typing import Tuple, Type
+from typing import List, Tuple, Type
 
 from zepben.ewb import (
     NetworkStateOperators, NetworkTraceActionType, NetworkTraceStep, StepContext, Tracing,
     NetworkConsumerClient, ProtectedSwitch, Recloser, LoadBreakSwitch, connect_with_token,
-    IncludedEnergizedContainers
+    IncludedEnergizedContainers, ConductingEquipment
 )
 
+from zepben.examples.network_graph import NetworkGraph
+
+
+def protected_switches_between(
+    graph: NetworkGraph,
+    from_equipment: ConductingEquipment,
+    to_equipment: ConductingEquipment,
+    io_type: Type[ProtectedSwitch] = ProtectedSwitch,
+    state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL
+) -> List[ProtectedSwitch]:
+    """The switches of type `io_type` on the shortest path between two pieces of equipment, in order from `from_equipment`."""
+    return [equipment for equipment in graph.path(from_equipment, to_equipment, state_operators) if isinstance(equipment, io_type)]
+
 
 async def main(mrids: Tuple[str, str], io_type: Type[ProtectedSwitch], feeder_mrid):
     with open("config.json") as f:
@@ -70,6 +83,11 @@ async def main(mrids: Tuple[str, str], io_type: Type[ProtectedSwitch], feeder_mr
     all(map(print, found_switch))  # print the list of switches
     print(bool(found_switch))  # print whether we found what we were looking for
 
+    # The upstream traces above only find the switches when one node is upstream of the other. Searching a compiled `NetworkGraph` from both nodes at
+    # once finds the shortest path between any two nodes, including nodes on sibling branches, and only reaches the equipment between them.
+    graph = NetworkGraph(network)
+    print(protected_switches_between(graph, nodes[0], nodes[1], io_type, state_operators))
+
 
 if __name__ == "__main__":
     asyncio.run(main(mrids=('50735858', '66598892'), io_type=LoadBreakSwitch, feeder_mrid='RW1292'))
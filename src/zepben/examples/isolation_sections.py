@@ -0,0 +1,196 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Splits a whole network into isolation sections in one pass, rather than tracing out from each fault location to the switches around it.
+
+An isolation section is the equipment that can be reached from a piece of equipment without passing through a `Switch`, which is what
+find_isolation_section_from_equipment.py traces for a single conductor. Here every section is found at once as the connected components of a
+`NetworkGraph` with its switches removed, so the section of any piece of equipment is an array lookup. Each section also knows the switches on its boundary,
+and the sections are joined into an adjacency graph by the switches between them, for working out which sections can be restored from where.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+import numpy as np
+from zepben.ewb import ConductingEquipment, NetworkStateOperators, Switch
+
+from zepben.examples.network_graph import NetworkGraph
+
+__all__ = ["IsolationSections", "SectionConnection"]
+
+
+@dataclass(frozen=True)
+class SectionConnection:
+    """Two isolation sections joined by one or more switches, with no other equipment between them."""
+
+    section_a: int
+    section_b: int
+    switches: Tuple[Switch, ...]
+    """The switches between the sections, in order from `section_a` to `section_b`. There is more than one when switches are connected in series."""
+
+    def is_open(self, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL) -> bool:
+        """Whether any of the switches between the sections is open, so that supply does not flow between them."""
+        return any(network_state_operators.is_open(switch) for switch in self.switches)
+
+
+class IsolationSections:
+    """
+    Every isolation section of the network a `NetworkGraph` was compiled from.
+
+    Sections are numbered from 0. Switches are not in any section, and nor is equipment that is not in service, as it cannot be energised.
+
+    :param graph: The compiled network.
+    :param network_state_operators: The state used to decide whether equipment is in service. The open state of switches does not affect the sections,
+        as every switch is on a section boundary.
+    """
+
+    def __init__(self, graph: NetworkGraph, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL):
+        self.graph = graph
+
+        self.labels = graph.connected_components(network_state_operators, separated_by=(Switch,))
+        """The section of each piece of equipment, by equipment index, or -1 for switches and equipment that is not in service."""
+
+        self.section_count = int(self.labels.max()) + 1 if len(self.labels) else 0
+
+        in_sections = np.flatnonzero(self.labels >= 0)
+        self._section_indptr = np.zeros(self.section_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.labels[in_sections], minlength=self.section_count), out=self._section_indptr[1:])
+        self._section_equipment = in_sections[np.argsort(self.labels[in_sections], kind="stable")]
+
+        sections_at, switches_at = self._switch_terminal_neighbourhoods()
+
+        self._boundary: Dict[int, List[Switch]] = {}
+        for section, switch in sorted({(section, graph.terminal_equipment[t]) for t, sections in sections_at.items() for section in sections}):
+            self._boundary.setdefault(section, []).append(graph.equipment[switch])
+
+        self.connections: List[SectionConnection] = self._connect(sections_at, switches_at)
+        """Every pair of sections joined by switches."""
+
+        self._adjacent: Dict[int, List[SectionConnection]] = {}
+        for connection in self.connections:
+            self._adjacent.setdefault(connection.section_a, []).append(connection)
+            self._adjacent.setdefault(connection.section_b, []).append(connection)
+
+    def __len__(self) -> int:
+        return self.section_count
+
+    def section_of(self, equipment: ConductingEquipment) -> Optional[int]:
+        """The section `equipment` is in, or None for switches and equipment that is not in any section."""
+        index = self.graph.index.get(equipment.mrid)
+        if index is None or self.labels[index] < 0:
+            return None
+        return int(self.labels[index])
+
+    def equipment(self, section: int) -> List[ConductingEquipment]:
+        """The equipment in `section`."""
+        return self.graph.equipment_at(self._section_equipment[self._section_indptr[section]:self._section_indptr[section + 1]])
+
+    def boundary_switches(self, section: int) -> List[Switch]:
+        """The switches directly connected to `section`, which are operated to isolate it."""
+        return list(self._boundary.get(section, ()))
+
+    def adjacent(self, section: int) -> List[SectionConnection]:
+        """The connections from `section` to the sections on the other side of its boundary switches."""
+        return list(self._adjacent.get(section, ()))
+
+    def _switch_terminal_neighbourhoods(self) -> Tuple[Dict[int, Set[int]], Dict[int, List[int]]]:
+        # Gather the connections out of every switch in one go, then split them, by the switch terminal they are on, into the sections and the terminals of
+        # other switches that terminal is connected to.
+        graph = self.graph
+        is_switch = graph.type_mask((Switch,))
+        switches = np.flatnonzero(is_switch)
+        degrees = graph.indptr[switches + 1] - graph.indptr[switches]
+        edges = np.repeat(graph.indptr[switches], degrees) + np.arange(degrees.sum()) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+        edges = edges[graph.edge_phases[edges] != 0]
+        neighbours = graph.indices[edges]
+
+        sections_at: Dict[int, Set[int]] = {t: set() for s in switches for t in range(graph.equipment_terminals[s], graph.equipment_terminals[s + 1])}
+        for terminal, section in zip(graph.edge_from_terminal[edges].tolist(), self.labels[neighbours].tolist()):
+            if section >= 0:
+                sections_at[terminal].add(section)
+
+        switches_at: Dict[int, List[int]] = {}
+        to_switch = is_switch[neighbours]
+        for terminal, other in zip(graph.edge_from_terminal[edges[to_switch]].tolist(), graph.edge_to_terminal[edges[to_switch]].tolist()):
+            switches_at.setdefault(terminal, []).append(other)
+
+        return sections_at, switches_at
+
+    def _connect(self, sections_at: Dict[int, Set[int]], switches_at: Dict[int, List[int]]) -> List[SectionConnection]:
+        # Pass through each switch from each of its terminals that a section is connected to, continuing through any switches connected directly to the
+        # far side, which is usually none, and join the section to every section found on the far side of a switch along the way.
+        graph = self.graph
+        connections = set()
+        for entry, start_sections in sections_at.items():
+            if not start_sections:
+                continue
+
+            parents = {entry: None}
+            to_process = deque([entry])
+            while to_process:
+                terminal = to_process.popleft()
+                switch = graph.terminal_equipment[terminal]
+                for exit_terminal in range(graph.equipment_terminals[switch], graph.equipment_terminals[switch + 1]):
+                    if exit_terminal == terminal:
+                        continue
+
+                    path = self._switch_path(parents, terminal)
+                    for section_b in sections_at[exit_terminal]:
+                        for section_a in start_sections:
+                            if section_a < section_b:
+                                connections.add((section_a, section_b, path))
+                            elif section_b < section_a:
+                                connections.add((section_b, section_a, path[::-1]))
+
+                    for other in switches_at.get(exit_terminal, ()):
+                        if other not in parents:
+                            parents[other] = terminal
+                            to_process.append(other)
+
+        return [
+            SectionConnection(section_a, section_b, tuple(graph.equipment[switch] for switch in path))
+            for section_a, section_b, path in sorted(connections, key=lambda key: (key[0], key[1], len(key[2]), key[2]))
+        ]
+
+    def _switch_path(self, parents: Dict[int, Optional[int]], terminal: int) -> Tuple[int, ...]:
+        path = []
+        while terminal is not None:
+            path.append(int(self.graph.terminal_equipment[terminal]))
+            terminal = parents[terminal]
+        return tuple(reversed(path))
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.ewb import AcLineSegment
+
+    from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+    network = build_synthetic_feeder(backbone_spans=100, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network)
+    graph = NetworkGraph(network)
+
+    start = perf_counter()
+    sections = IsolationSections(graph)
+    print(f"Found {len(sections)} isolation sections and {len(sections.connections)} connections between them in {(perf_counter() - start) * 1000:.1f} ms")
+
+    line = next(network.objects(AcLineSegment))
+    section = sections.section_of(line)
+    print(f"{line.mrid} is in section {section} of {len(sections.equipment(section))} equipment, isolated by "
+          f"{', '.join(switch.mrid for switch in sections.boundary_switches(section))}")
+    for connection in sections.adjacent(section):
+        other = connection.section_b if connection.section_a == section else connection.section_a
+        print(f"    section {other} is through {', '.join(switch.mrid for switch in connection.switches)}, open: {connection.is_open()}")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
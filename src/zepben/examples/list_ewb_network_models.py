@@ -5,10 +5,12 @@
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import tempfile
 
-from zepben.ewb import EwbDataFilePaths, DatabaseType
+from zepben.ewb import DatabaseType
 from pathlib import Path
 from datetime import date
 
+from zepben.examples.utils import get_available_dates
+
 # This example can either create its own temporary directories or be use an existing EWB data path.
 create_temp_files = True
 
@@ -30,18 +32,15 @@ else:
     network_list = []
     customer_list = []
 
-# Initialize EwbDataFilePaths with the EWB data directory
-ewb_data = EwbDataFilePaths(data_path)
-
 # List all the dates for which exist network databases in the data path
-list_of_available_dates = ewb_data.get_network_model_databases()
-print(f"\nAll network databases in data directory ({ewb_data.base_dir}):")
+list_of_available_dates = get_available_dates(data_path, DatabaseType.NETWORK_MODEL)
+print(f"\nAll network databases in data directory ({data_path}):")
 for available_date in list_of_available_dates:
     print(f"{available_date.isoformat()}")
 
 # Find the first date for which exists a customer database before 2011-09-10
-closest_date_before = ewb_data.find_closest(DatabaseType.CUSTOMER, target_date=date(2011, 9, 10))
-print(f"\nThe last customer database before 2011-09-10: {closest_date_before.isoformat() or closest_date_before}")
+closest_date_before = max((it for it in get_available_dates(data_path, DatabaseType.CUSTOMER) if it <= date(2011, 9, 10)), default=None)
+print(f"\nThe last customer database before 2011-09-10: {closest_date_before.isoformat() if closest_date_before else closest_date_before}")
 
 if create_temp_files:
     if network_list and customer_list:
@@ -0,0 +1,274 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Serves a `NetworkService` over gRPC from the current process, standing in for an EWB server.
+
+Every script that fetches production scale networks needs a live EWB server and a config.json to reach it, and ieee_13_node_test_feeder.py is too small
+to show how they scale. A `LocalNetworkServer` serves any `NetworkService`, such as one built by `build_synthetic_network`, through the same network
+consumer gRPC service as an EWB server, so `NetworkConsumerClient`, `FeederFetchPool` and the other fetching examples can be run, profiled and tuned
+against it without a server or a connection to one.
+
+It implements the hierarchy, identifiable, container, restriction and connectivity node requests that `NetworkConsumerClient` makes, answering them from
+the network in memory. An optional `latency` delays each response message, to stand in for the round trip to a remote server.
+"""
+
+import asyncio
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import grpc
+from google.protobuf.empty_pb2 import Empty
+from zepben.ewb import Circuit, ConnectivityNode, EquipmentContainer, Feeder, GeographicalRegion, IdentifiedObject, Loop, LvFeeder, LvSubstation, \
+    NetworkService, OperationalRestriction, SubGeographicalRegion, Substation, GrpcChannelBuilder
+from zepben.protobuf.metadata.metadata_data_pb2 import ServiceInfo
+from zepben.protobuf.metadata.metadata_responses_pb2 import GetMetadataResponse
+from zepben.protobuf.nc import nc_requests_pb2
+from zepben.protobuf.nc.nc_data_pb2 import NetworkIdentifiable
+from zepben.protobuf.nc.nc_pb2_grpc import NetworkConsumerServicer, add_NetworkConsumerServicer_to_server
+from zepben.protobuf.nc.nc_responses_pb2 import GetEquipmentForContainersResponse, GetEquipmentForRestrictionResponse, GetIdentifiablesResponse, \
+    GetNetworkHierarchyResponse, GetTerminalsForNodeResponse
+
+__all__ = ["LocalNetworkServer"]
+
+# The field of a NetworkIdentifiable that holds each type of object, by the name of the protobuf message for it, which matches the name of the CIM class.
+_IDENTIFIABLE_FIELDS: Dict[str, str] = {it.message_type.name: it.name for it in NetworkIdentifiable.DESCRIPTOR.fields}
+
+
+class LocalNetworkServer:
+    """
+    A network consumer gRPC service for a `NetworkService`, run on the current event loop.
+
+    Use it as an async context manager, or call `start` and `stop`, and connect to it with `connect`::
+
+        async with LocalNetworkServer(build_synthetic_network()) as server:
+            client = NetworkConsumerClient(server.connect())
+
+    The network must already have its equipment assigned to feeders, e.g. by `assign_directions_and_feeders`, for feeders to be fetched with their
+    equipment.
+
+    :param network: The network to serve. It is read as requests arrive, not copied, so it should not be changed while it is being served.
+    :param host: The address to listen on.
+    :param port: The port to listen on, or 0 to use any free port. The port being used is available from `port` once started.
+    :param latency: Seconds to wait before sending each response message.
+    :param batch_size: The most objects to send in each response message.
+    """
+
+    def __init__(self, network: NetworkService, host: str = "localhost", port: int = 0, latency: float = 0.0, batch_size: int = 1000):
+        self.network = network
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.batch_size = batch_size
+
+        self.calls: Counter = Counter()
+        """The number of calls to each RPC, by RPC name."""
+
+        self.objects_sent = 0
+        """The number of objects sent in responses."""
+
+        self._server: Optional[grpc.aio.Server] = None
+
+    async def start(self) -> 'LocalNetworkServer':
+        """Start serving the network."""
+        self._server = grpc.aio.server()
+        add_NetworkConsumerServicer_to_server(_NetworkConsumerServicer(self), self._server)
+        self.port = self._server.add_insecure_port(f"{self.host}:{self.port}")
+        await self._server.start()
+        return self
+
+    async def stop(self, grace: Optional[float] = None):
+        """Stop serving the network, waiting up to `grace` seconds for calls in progress to finish, or cancelling them if `grace` is None."""
+        if self._server is not None:
+            await self._server.stop(grace)
+            self._server = None
+
+    def connect(self) -> grpc.aio.Channel:
+        """A new channel to the server, for a `NetworkConsumerClient` or anything else that takes a channel to an EWB server."""
+        # The connection test blocks the event loop this server runs on, so it would never be answered.
+        return GrpcChannelBuilder().for_address(self.host, self.port).build(skip_connection_test=True)
+
+    async def __aenter__(self) -> 'LocalNetworkServer':
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+
+class _NetworkConsumerServicer(NetworkConsumerServicer):
+
+    def __init__(self, server: LocalNetworkServer):
+        self._server = server
+        self._network = server.network
+
+    async def getIdentifiables(self, request_iterator, context) -> AsyncIterator[GetIdentifiablesResponse]:
+        self._server.calls["getIdentifiables"] += 1
+        async for request in request_iterator:
+            # Objects that are not in the network are left out, which the client reports as failed, as it does for an EWB server.
+            found = (self._network.get(mrid, default=None) for mrid in request.mrids)
+            async for identifiables in self._batches(it for it in found if it is not None):
+                yield GetIdentifiablesResponse(messageId=request.messageId, identifiables=identifiables)
+
+    async def getNetworkHierarchy(self, request, context) -> GetNetworkHierarchyResponse:
+        self._server.calls["getNetworkHierarchy"] += 1
+        await self._delay()
+
+        def to_pb(include: bool, cls) -> List:
+            return [it.to_pb() for it in self._network.objects(cls)] if include else []
+
+        response = GetNetworkHierarchyResponse(
+            messageId=request.messageId,
+            geographicalRegions=to_pb(request.includeGeographicalRegions, GeographicalRegion),
+            subGeographicalRegions=to_pb(request.includeSubgeographicalRegions, SubGeographicalRegion),
+            substations=to_pb(request.includeSubstations, Substation),
+            feeders=to_pb(request.includeFeeders, Feeder),
+            circuits=to_pb(request.includeCircuits, Circuit),
+            loops=to_pb(request.includeLoops, Loop),
+            lvSubstations=to_pb(request.includeLvSubstations, LvSubstation),
+            lvFeeders=to_pb(request.includeLvFeeders, LvFeeder),
+        )
+        self._server.objects_sent += sum(len(it) for it in (
+            response.geographicalRegions, response.subGeographicalRegions, response.substations, response.feeders, response.circuits, response.loops,
+            response.lvSubstations, response.lvFeeders
+        ))
+        return response
+
+    async def getEquipmentForContainers(self, request_iterator, context) -> AsyncIterator[GetEquipmentForContainersResponse]:
+        self._server.calls["getEquipmentForContainers"] += 1
+        async for request in request_iterator:
+            containers = [it for it in (self._network.get(mrid, default=None) for mrid in request.mrids) if isinstance(it, EquipmentContainer)]
+            containers = _with_related_containers(containers, request.includeEnergizingContainers, request.includeEnergizedContainers, request.networkState)
+
+            sent: Set[str] = set()
+            equipment = (
+                it
+                for container in containers
+                for it in _container_equipment(container, request.networkState)
+                if it.mrid not in sent and not sent.add(it.mrid)
+            )
+            async for identifiables in self._batches(equipment):
+                yield GetEquipmentForContainersResponse(messageId=request.messageId, identifiables=identifiables)
+
+    async def getEquipmentForRestriction(self, request, context) -> AsyncIterator[GetEquipmentForRestrictionResponse]:
+        self._server.calls["getEquipmentForRestriction"] += 1
+        restriction = self._network.get(request.mrid, OperationalRestriction, default=None)
+        if restriction is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"No OperationalRestriction with mRID {request.mrid}")
+
+        async for identifiables in self._batches(restriction.equipment):
+            yield GetEquipmentForRestrictionResponse(messageId=request.messageId, identifiables=identifiables)
+
+    async def getTerminalsForNode(self, request, context) -> AsyncIterator[GetTerminalsForNodeResponse]:
+        self._server.calls["getTerminalsForNode"] += 1
+        node = self._network.get(request.mrid, ConnectivityNode, default=None)
+        if node is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"No ConnectivityNode with mRID {request.mrid}")
+
+        for terminal in node.terminals:
+            await self._delay()
+            self._server.objects_sent += 1
+            yield GetTerminalsForNodeResponse(messageId=request.messageId, terminal=terminal.to_pb())
+
+    async def getMetadata(self, request, context) -> GetMetadataResponse:
+        self._server.calls["getMetadata"] += 1
+        await self._delay()
+        return GetMetadataResponse(messageId=request.messageId, serviceInfo=ServiceInfo(title="Local network server", version="local"))
+
+    async def checkConnection(self, request, context) -> Empty:
+        self._server.calls["checkConnection"] += 1
+        return Empty()
+
+    async def _batches(self, objects: Iterable[IdentifiedObject]) -> AsyncIterator[List[NetworkIdentifiable]]:
+        batch = []
+        for it in objects:
+            batch.append(NetworkIdentifiable(**{_IDENTIFIABLE_FIELDS[type(it).__name__]: it.to_pb()}))
+            if len(batch) == self._server.batch_size:
+                await self._delay()
+                self._server.objects_sent += len(batch)
+                yield batch
+                batch = []
+        if batch:
+            await self._delay()
+            self._server.objects_sent += len(batch)
+            yield batch
+
+    async def _delay(self):
+        # Always yield to the event loop, so a large response does not hold up the client running on the same loop.
+        await asyncio.sleep(self._server.latency)
+
+
+def _with_related_containers(containers: List[EquipmentContainer], energizing: int, energized: int, network_state: int) -> List[EquipmentContainer]:
+    # Adds the containers a request asks to be included, each level including those of the levels below it.
+    current = network_state == nc_requests_pb2.NETWORK_STATE_CURRENT
+    related = list(containers)
+
+    def feeders_of(substation: Substation) -> Iterable[Feeder]:
+        return substation.current_feeders if current else substation.feeders
+
+    def lv_feeders_of(feeder: Feeder) -> Iterable[LvFeeder]:
+        return feeder.current_energized_lv_feeders if current else feeder.normal_energized_lv_feeders
+
+    def energizing_feeders_of(lv_feeder: LvFeeder) -> Iterable[Feeder]:
+        return lv_feeder.current_energizing_feeders if current else lv_feeder.normal_energizing_feeders
+
+    if energized >= nc_requests_pb2.INCLUDED_ENERGIZED_CONTAINERS_FEEDERS:
+        related.extend(feeder for it in containers if isinstance(it, Substation) for feeder in feeders_of(it))
+    if energized >= nc_requests_pb2.INCLUDED_ENERGIZED_CONTAINERS_LV_FEEDERS:
+        related.extend(lv_feeder for it in list(related) if isinstance(it, Feeder) for lv_feeder in lv_feeders_of(it))
+    if energized >= nc_requests_pb2.INCLUDED_ENERGIZED_CONTAINERS_LV_SUBSTATIONS:
+        related.extend(lv_substation for it in list(related) if isinstance(it, Feeder) for lv_substation in it.normal_energized_lv_substations)
+
+    if energizing >= nc_requests_pb2.INCLUDED_ENERGIZING_CONTAINERS_FEEDERS:
+        related.extend(feeder for it in containers if isinstance(it, LvFeeder) for feeder in energizing_feeders_of(it))
+    if energizing >= nc_requests_pb2.INCLUDED_ENERGIZING_CONTAINERS_SUBSTATIONS:
+        related.extend(it.normal_energizing_substation for it in list(related) if isinstance(it, Feeder) and it.normal_energizing_substation is not None)
+    if energizing >= nc_requests_pb2.INCLUDED_ENERGIZING_CONTAINERS_LV_SUBSTATIONS:
+        related.extend(it.normal_energizing_lv_substation for it in containers if isinstance(it, LvFeeder) and it.normal_energizing_lv_substation is not None)
+
+    unique = {}
+    for it in related:
+        unique.setdefault(it.mrid, it)
+    return list(unique.values())
+
+
+def _container_equipment(container: EquipmentContainer, network_state: int) -> Iterable[IdentifiedObject]:
+    if network_state == nc_requests_pb2.NETWORK_STATE_CURRENT and isinstance(container, (Feeder, LvFeeder)):
+        return container.current_equipment
+    if network_state == nc_requests_pb2.NETWORK_STATE_ALL and isinstance(container, (Feeder, LvFeeder)):
+        return [*container.equipment, *container.current_equipment]
+    return container.equipment
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.ewb import ConductingEquipment, NetworkConsumerClient
+
+    from zepben.examples.feeder_fetch_pool import FeederFetchPool
+    from zepben.examples.synthetic_feeder import build_synthetic_network, assign_directions_and_feeders
+
+    start = perf_counter()
+    network = build_synthetic_network(regions=2, substations_per_region=3, feeders_per_substation=4)
+    await assign_directions_and_feeders(network)
+    print(f"Built {len(list(network.objects()))} objects in {perf_counter() - start:.1f} s")
+
+    async with LocalNetworkServer(network, latency=0.005) as server:
+        client = NetworkConsumerClient(server.connect())
+        hierarchy = (await client.get_network_hierarchy()).throw_on_error().value
+        print(f"Serving on port {server.port}: {len(hierarchy.substations)} substations, {len(hierarchy.feeders)} feeders")
+
+        def print_feeder(feeder_mrid: str, fetched: NetworkService):
+            print(f"    {feeder_mrid}: {fetched.len_of(ConductingEquipment)} conducting equipment")
+
+        start = perf_counter()
+        results = await FeederFetchPool(server.connect(), max_in_flight=4).run(hierarchy.feeders, print_feeder)
+        seconds = perf_counter() - start
+        print(f"Fetched {len(results.succeeded)} feeders ({len(results.failed)} failed) in {seconds:.1f} s, "
+              f"{server.objects_sent / seconds:.0f} objects/s over {sum(server.calls.values())} calls")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
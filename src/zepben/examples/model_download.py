@@ -0,0 +1,259 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Downloads generated models (OpenDSS zips, PowerFactory .pfd files) straight to disk, however large they are.
+
+Each download is streamed to a `.part` file next to the destination in fixed-size chunks, so memory use does not depend on the size of the model. If the
+connection drops, the download is resumed from the end of the `.part` file with an HTTP Range request, including when the script is run again after being
+interrupted. The size of the finished file is checked against what the server said it would be, and its checksum against either a SHA-256 you supply or the
+MD5 ETag that S3 gives single part uploads, before it is moved into place.
+
+All downloads made with one `ModelDownloader` share a pooled HTTP client, so connections are reused between them.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+import httpx
+
+__all__ = ["ModelDownloader", "DownloadResult", "DownloadIntegrityError"]
+
+_MD5_ETAG = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+DownloadUrl = Union[str, Callable[[], Awaitable[str]]]
+"""Either the URL to download, or a coroutine function returning a fresh one, for URLs that expire before a download can be resumed."""
+
+
+class DownloadIntegrityError(ValueError):
+    """A downloaded file did not have the size or checksum it was expected to have."""
+
+
+@dataclass
+class DownloadResult:
+    """A finished download."""
+
+    path: Path
+    size_bytes: int
+    sha256: str
+    """The hex SHA-256 of the downloaded file."""
+
+    resumed_bytes: int = 0
+    """The bytes already on disk, from an interrupted attempt or run, when the final attempt started. These were not downloaded again."""
+
+    attempts: int = 1
+
+
+class ModelDownloader:
+    """
+    Streams files to disk over a shared, pooled HTTP client. Use as an async context manager, which closes the client on exit if the downloader created it.
+
+    :param http_client: The client to download with. If None, one is created with a pool of `max_connections` connections.
+    :param chunk_size: The bytes read from the network and written to disk at a time.
+    :param max_attempts: The number of times to try each download, resuming from where the previous attempt stopped, before giving up.
+    :param retry_delay: The seconds to wait before the first retry of a download. The delay doubles on each retry.
+    :param max_connections: The size of the connection pool of the client created when `http_client` is None.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient = None,
+        chunk_size: int = 1024 * 1024,
+        max_attempts: int = 5,
+        retry_delay: float = 1.0,
+        max_connections: int = 8
+    ):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(30.0, read=120.0),
+            follow_redirects=True
+        )
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    async def __aenter__(self) -> 'ModelDownloader':
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        if self._owns_client:
+            await self.http_client.aclose()
+
+    async def download(
+        self,
+        url: DownloadUrl,
+        path: Union[Path, str],
+        headers: Dict[str, str] = None,
+        expected_size: Optional[int] = None,
+        expected_sha256: Optional[str] = None,
+        on_progress: Callable[[int, Optional[int]], None] = None
+    ) -> DownloadResult:
+        """
+        Download `url` to `path`, resuming any partial download of it left by an earlier attempt.
+
+        :param url: The URL to download, or a coroutine function returning a fresh URL, which is called again before each retry.
+        :param path: Where to write the file. It is only created once the download has been verified.
+        :param headers: Extra headers to send, e.g. the `Authorization` header for URLs that are not pre-signed.
+        :param expected_size: The size the file must be. If None, the size the server reports is checked instead.
+        :param expected_sha256: The hex SHA-256 the file must have. If None, the file is checked against the ETag if it is an MD5.
+        :param on_progress: Called after each chunk with the bytes on disk so far and the expected total, if known.
+        :raises DownloadIntegrityError: If the finished download has the wrong size or checksum. The partial file is removed, so the next attempt starts
+            from scratch.
+        """
+        path = Path(path)
+        part = path.with_name(path.name + ".part")
+        meta = path.with_name(path.name + ".part.json")
+
+        error = None
+        attempt = 0
+        while attempt < self.max_attempts:
+            attempt += 1
+            try:
+                total, etag, resumed_bytes = await self._fetch(await _resolve(url), part, meta, headers or {}, on_progress)
+                break
+            except httpx.HTTPStatusError as e:
+                error = e
+                # Anything other than a server error or rate limit will not be fixed by trying again. Pre-signed URLs that have expired return 403, which
+                # is worth retrying when a fresh URL can be fetched.
+                if e.response.status_code < 500 and e.response.status_code != 429 and not (callable(url) and e.response.status_code == 403):
+                    raise
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        else:
+            raise error
+
+        size = part.stat().st_size
+        expected_size = expected_size if expected_size is not None else total
+        sha256, md5 = _file_digests(part, self.chunk_size, md5=expected_sha256 is None and etag is not None and _MD5_ETAG.match(etag) is not None)
+
+        problem = None
+        if expected_size is not None and size != expected_size:
+            problem = f"expected {expected_size} bytes, got {size}"
+        elif expected_sha256 is not None and sha256 != expected_sha256.lower():
+            problem = f"expected SHA-256 {expected_sha256}, got {sha256}"
+        elif md5 is not None and md5 != _MD5_ETAG.match(etag).group(1).lower():
+            problem = f"expected MD5 {_MD5_ETAG.match(etag).group(1)} from the ETag, got {md5}"
+
+        if problem is not None:
+            part.unlink(missing_ok=True)
+            meta.unlink(missing_ok=True)
+            raise DownloadIntegrityError(f"Download of {path.name} is corrupt: {problem}")
+
+        os.replace(part, path)
+        meta.unlink(missing_ok=True)
+        return DownloadResult(path=path, size_bytes=size, sha256=sha256, resumed_bytes=resumed_bytes, attempts=attempt)
+
+    async def _fetch(
+        self,
+        url: str,
+        part: Path,
+        meta: Path,
+        headers: Dict[str, str],
+        on_progress: Optional[Callable[[int, Optional[int]], None]]
+    ):
+        offset = part.stat().st_size if part.exists() else 0
+        previous = json.loads(meta.read_text()) if offset and meta.exists() else {}
+
+        # Ask for the file as it is stored, so byte ranges and sizes refer to the bytes written to disk.
+        request_headers = {"Accept-Encoding": "identity", **headers}
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            # Only resume if the file has not changed since the partial download was started, otherwise the server sends the whole file again.
+            if previous.get("etag"):
+                request_headers["If-Range"] = previous["etag"]
+
+        async with self.http_client.stream("GET", url, headers=request_headers) as response:
+            if response.status_code == 416 and offset:
+                # The partial file already holds everything the server has, so just check it.
+                total = _content_range_total(response.headers.get("Content-Range")) or previous.get("total")
+                return total, previous.get("etag"), offset
+            response.raise_for_status()
+
+            etag = response.headers.get("ETag")
+            if response.status_code == 206:
+                match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+                if match is None or int(match.group(1)) != offset:
+                    raise httpx.RemoteProtocolError(f"Server resumed {part.name} from the wrong place: {response.headers.get('Content-Range')}")
+                total = int(match.group(3)) if match.group(3) != "*" else None
+                mode = "ab"
+            else:
+                # The server ignored the range, or the file has changed, so start again from the beginning.
+                offset = 0
+                total = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
+                mode = "wb"
+
+            resumed = offset
+            meta.write_text(json.dumps({"etag": etag, "total": total}))
+            with open(part, mode) as file:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    file.write(chunk)
+                    offset += len(chunk)
+                    if on_progress is not None:
+                        on_progress(offset, total)
+
+        return total, etag, resumed
+
+
+async def _resolve(url: DownloadUrl) -> str:
+    return await url() if callable(url) else url
+
+
+def _content_range_total(content_range: Optional[str]) -> Optional[int]:
+    if content_range is None or not content_range.startswith("bytes */"):
+        return None
+    return int(content_range[len("bytes */"):])
+
+
+def _file_digests(path: Path, chunk_size: int, md5: bool):
+    # Hashing the finished file, rather than the chunks as they arrive, gives the same answer for resumed and uninterrupted downloads.
+    sha256_hash = hashlib.sha256()
+    md5_hash = hashlib.md5() if md5 else None
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            sha256_hash.update(chunk)
+            if md5_hash is not None:
+                md5_hash.update(chunk)
+    return sha256_hash.hexdigest(), md5_hash.hexdigest() if md5_hash is not None else None
+
+
+async def main():
+    from tqdm import tqdm
+
+    # Replace these with a model download URL, e.g. from `opendss_model_download_url` in model_job_poller.py, and where to save it.
+    url = "<DOWNLOAD_URL>"
+    path = Path("model.zip")
+
+    with tqdm(unit="B", unit_scale=True) as progress:
+        def update(done: int, total: Optional[int]):
+            progress.total = total
+            progress.n = done
+            progress.refresh()
+
+        async with ModelDownloader() as downloader:
+            result = await downloader.download(url, path, on_progress=update)
+
+    print(f"Downloaded {result.size_bytes} bytes to {result.path} ({result.resumed_bytes} resumed), SHA-256 {result.sha256}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,332 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Waits for many EAS model generation jobs (OpenDSS, PowerFactory) at once without blocking the event loop, acting on each one as soon as it completes.
+
+Each tracked job is polled on its own schedule, starting at `initial_delay` and backing off by `backoff` after every poll that finds it still being created,
+up to `max_delay`. The delays are jittered so jobs submitted together spread their polls out, and every job that is due is checked with a single status
+request, so tracking a hundred jobs costs the same number of requests as tracking one. As soon as a job is seen COMPLETED its `on_completed` callback is
+started, e.g. to download the model, while the other jobs carry on being polled.
+
+Status requests are made through a `ModelStatusFetcher`. `opendss_model_statuses` builds one that uses an `EasClient`.
+"""
+
+import asyncio
+import inspect
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from zepben.eas import EasClient, Query, OpenDssModelFields, OpenDssModelPageFields, GetOpenDssModelsSortCriteriaInput, \
+    SortOrder
+
+__all__ = [
+    "ModelJobPoller", "ModelJob", "ModelJobState", "ModelStatus", "ModelStatusFetcher", "opendss_model_statuses", "opendss_model_download_url"
+]
+
+
+class ModelJobState(Enum):
+    CREATION = "CREATION"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    COULD_NOT_START = "COULD_NOT_START"
+    TIMED_OUT = "TIMED_OUT"
+    """The job was still being created when the poller's timeout was reached. Not an EAS state."""
+
+
+@dataclass
+class ModelStatus:
+    """The state of a model as reported by EAS."""
+
+    state: ModelJobState
+    errors: List[str] = field(default_factory=list)
+
+
+ModelStatusFetcher = Callable[[List[str]], Awaitable[Dict[str, ModelStatus]]]
+"""
+Fetches the status of each of the given model ids in as few requests as possible. Models EAS does not know about yet are left out of the result, and are
+polled again later.
+"""
+
+
+@dataclass
+class ModelJob:
+    """A model generation job being tracked by a `ModelJobPoller`."""
+
+    model_id: str
+    name: str
+    state: ModelJobState = ModelJobState.CREATION
+    errors: List[str] = field(default_factory=list)
+    """The errors EAS reported for the model."""
+
+    polls: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    """When the job stopped being polled, in `time.monotonic` seconds."""
+
+    result: Any = None
+    """The value returned by the poller's `on_completed` callback."""
+
+    error: Optional[Exception] = None
+    """The exception raised by `on_completed`, or the last error raised fetching the status of the job."""
+
+    next_poll_at: float = 0.0
+    delay: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class ModelJobPoller:
+    """
+    Tracks model generation jobs until each one has finished. Use as an async context manager, which waits for every tracked job, and every `on_completed`
+    callback, to finish on exit.
+
+    :param fetch_statuses: Fetches the status of a batch of models.
+    :param on_completed: Called with each job as soon as it is seen COMPLETED. May be a plain function or a coroutine function. Its return value is stored
+        in `ModelJob.result`, and any exception it raises in `ModelJob.error`.
+    :param initial_delay: The seconds to wait before first polling a job.
+    :param max_delay: The most seconds to wait between polls of a job.
+    :param backoff: The factor the delay between polls of a job grows by each time it is found still being created.
+    :param jitter: The fraction each delay is randomly varied by, so jobs submitted together do not stay in lockstep.
+    :param timeout: The seconds after which a job that is still being created is given up on and marked TIMED_OUT. None to wait forever.
+    :param max_concurrent_completions: The number of `on_completed` callbacks that may be running at once.
+    :param on_progress: Called with a job every time its state changes.
+    """
+
+    def __init__(
+        self,
+        fetch_statuses: ModelStatusFetcher,
+        on_completed: Callable[[ModelJob], Union[Awaitable[Any], Any]] = None,
+        initial_delay: float = 2.0,
+        max_delay: float = 60.0,
+        backoff: float = 1.5,
+        jitter: float = 0.2,
+        timeout: Optional[float] = 3000.0,
+        max_concurrent_completions: int = 4,
+        on_progress: Callable[[ModelJob], None] = None
+    ):
+        self.fetch_statuses = fetch_statuses
+        self.on_completed = on_completed
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_concurrent_completions = max_concurrent_completions
+        self.on_progress = on_progress
+
+        self.jobs: Dict[str, ModelJob] = {}
+
+        self._active: Dict[str, ModelJob] = {}
+        self._completing: Set[asyncio.Task] = set()
+        self._completion_slots: Optional[asyncio.Semaphore] = None
+        self._tracked: Optional[asyncio.Event] = None
+        self._polling: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'ModelJobPoller':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.wait()
+        else:
+            self._cancel()
+
+    def track(self, model_id: Union[int, str], name: str = None) -> ModelJob:
+        """
+        Start polling the model with id `model_id`. Must be called from a running event loop. Tracking a model that is already tracked returns its job.
+
+        :param model_id: The id EAS returned when the model was requested.
+        :param name: A name to report the job by. Defaults to the model id.
+        """
+        model_id = str(model_id)
+        if model_id in self.jobs:
+            return self.jobs[model_id]
+
+        job = ModelJob(model_id=model_id, name=name or model_id)
+        job.delay = self.initial_delay
+        job.next_poll_at = job.started_at + self._jittered(job.delay)
+        self.jobs[model_id] = job
+        self._active[model_id] = job
+
+        if self._tracked is None:
+            self._tracked = asyncio.Event()
+            self._completion_slots = asyncio.Semaphore(self.max_concurrent_completions)
+        self._tracked.set()
+
+        if self._polling is None or self._polling.done():
+            self._polling = asyncio.create_task(self._poll())
+        return job
+
+    async def wait(self) -> List[ModelJob]:
+        """Wait for every tracked job, and its `on_completed` callback, to finish. Returns every job in the order it was tracked."""
+        while (self._polling is not None and not self._polling.done()) or self._completing:
+            if self._polling is not None and not self._polling.done():
+                await self._polling
+            if self._completing:
+                await asyncio.wait(self._completing)
+
+        if self._polling is not None:
+            # Surface any bug in the polling loop rather than leaving jobs silently unfinished.
+            self._polling.result()
+        return list(self.jobs.values())
+
+    async def _poll(self):
+        while self._active:
+            now = time.monotonic()
+            # Poll every job that is due now, or will be soon, in one request.
+            due = [job for job in self._active.values() if job.next_poll_at <= now + self.initial_delay / 4]
+            if not due:
+                self._tracked.clear()
+                next_poll_at = min(job.next_poll_at for job in self._active.values())
+                try:
+                    await asyncio.wait_for(self._tracked.wait(), timeout=next_poll_at - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                statuses = await self.fetch_statuses([job.model_id for job in due])
+                fetch_error = None
+            except Exception as e:
+                statuses, fetch_error = {}, e
+
+            now = time.monotonic()
+            for job in due:
+                job.polls += 1
+                status = statuses.get(job.model_id)
+                if fetch_error is not None:
+                    job.error = fetch_error
+                elif status is not None:
+                    job.error = None
+                    job.errors = status.errors
+
+                if status is not None and status.state != ModelJobState.CREATION:
+                    self._finish(job, status.state, now)
+                elif self.timeout is not None and now - job.started_at >= self.timeout:
+                    self._finish(job, ModelJobState.TIMED_OUT, now)
+                else:
+                    job.delay = min(job.delay * self.backoff, self.max_delay)
+                    job.next_poll_at = now + self._jittered(job.delay)
+
+    def _finish(self, job: ModelJob, state: ModelJobState, now: float):
+        del self._active[job.model_id]
+        job.state = state
+        job.finished_at = now
+        self._report(job)
+
+        if state == ModelJobState.COMPLETED and self.on_completed is not None:
+            task = asyncio.create_task(self._complete(job))
+            self._completing.add(task)
+            task.add_done_callback(self._completing.discard)
+
+    async def _complete(self, job: ModelJob):
+        async with self._completion_slots:
+            try:
+                outcome = self.on_completed(job)
+                if inspect.isawaitable(outcome):
+                    outcome = await outcome
+                job.result = outcome
+            except Exception as e:
+                job.error = e
+
+    def _report(self, job: ModelJob):
+        if self.on_progress is not None:
+            self.on_progress(job)
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _cancel(self):
+        if self._polling is not None:
+            self._polling.cancel()
+        for task in self._completing:
+            task.cancel()
+
+
+def opendss_model_statuses(eas_client: EasClient, page_size: int = 50) -> ModelStatusFetcher:
+    """
+    A `ModelStatusFetcher` for OpenDSS models. EAS can only list OpenDSS models a page at a time, so pages are read newest first until every requested
+    model has been found, which for recently requested models is usually the first page.
+
+    :param eas_client: The client to query with. It must have been created with `asynchronous=True`.
+    :param page_size: The number of models to read per request.
+    """
+
+    async def fetch(model_ids: List[str]) -> Dict[str, ModelStatus]:
+        remaining = set(model_ids)
+        statuses = {}
+        offset = 0
+        while remaining:
+            response = await eas_client.query(
+                Query.paged_open_dss_models(limit=page_size, offset=offset, sort=GetOpenDssModelsSortCriteriaInput(createdAt=SortOrder.DESC)),
+                OpenDssModelPageFields.total_count,
+                OpenDssModelPageFields.models().fields(OpenDssModelFields.id, OpenDssModelFields.state, OpenDssModelFields.errors)
+            )
+            page = response["data"]["pagedOpenDssModels"]
+            statuses.update(_statuses(page["models"], remaining))
+            remaining.difference_update(statuses)
+
+            offset += len(page["models"])
+            if not page["models"] or offset >= int(page["totalCount"]):
+                break
+
+        return statuses
+
+    return fetch
+
+
+async def opendss_model_download_url(eas_client: EasClient, model_id: Union[int, str], host: str, port: int, protocol: str = "https") -> str:
+    """
+    The short-lived URL to download a completed OpenDSS model from. This is what `EasClient.get_opendss_model_download_url` does, using the client's own
+    authorisation headers.
+
+    :param eas_client: The client to request the URL with. It must have been created with `asynchronous=True`.
+    :param model_id: The id of the OpenDSS model.
+    :param host: The host of EAS, as passed to the `EasClient`.
+    :param port: The port of EAS, as passed to the `EasClient`.
+    :param protocol: The protocol of EAS, as passed to the `EasClient`.
+    """
+    response = await eas_client.http_client.get(f"{protocol}://{host}:{port}/api/opendss-model/{model_id}", follow_redirects=False)
+    if response.status_code != 302:
+        response.raise_for_status()
+        raise ValueError(f"Expected a redirect to the download URL for OpenDSS model {model_id}, got HTTP {response.status_code}")
+    return response.headers["Location"]
+
+
+def _statuses(models: Iterable[Dict[str, Any]], model_ids: Set[str]) -> Dict[str, ModelStatus]:
+    return {
+        str(model["id"]): ModelStatus(ModelJobState(model["state"]), list(model.get("errors") or []))
+        for model in models
+        if str(model["id"]) in model_ids
+    }
+
+
+async def main():
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    eas_client = EasClient(host=c["host"], port=c["rpc_port"], access_token=c["access_token"], asynchronous=True)
+
+    def report(job: ModelJob):
+        print(f"{job.name}: {job.state.value} after {job.elapsed:.0f} seconds and {job.polls} polls")
+
+    # Replace these with the ids returned when requesting your OpenDSS models.
+    async with ModelJobPoller(opendss_model_statuses(eas_client), on_progress=report) as poller:
+        for model_id in ("<MODEL_ID_1>", "<MODEL_ID_2>"):
+            poller.track(model_id)
+
+    await eas_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
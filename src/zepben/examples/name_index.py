@@ -0,0 +1,139 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Looks up usage points and their equipment by name, such as an NMI, across every feeder that has been fetched.
+
+Each `NameType` in a `NetworkService` only knows the names in that service, and is dropped with it, so finding the customer with a given NMI otherwise
+means scanning the names of every usage point on every feeder. A `NameIndex` is filled from each feeder as it is fetched, and maps each
+(name type, name) pair to the mRIDs of the named object, its conducting equipment and its feeder. Only mRIDs are kept, so the index does not hold on to the
+feeders it was built from, and resolving a batch of names is a dictionary lookup per name.
+
+`NameIndex.add_feeder` has the signature of a `FeederConsumer`, so the index can be built by a `FeederFetchPool` run, or called from inside another consumer.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from zepben.ewb import ConductingEquipment, IdentifiedObject, NetworkService, UsagePoint
+
+__all__ = ["NameIndex", "NamedObject"]
+
+
+@dataclass(frozen=True)
+class NamedObject:
+    """An object found by name in a `NameIndex`."""
+
+    name_type: str
+    name: str
+    mrid: str
+    """The mRID of the object with the name, e.g. a `UsagePoint`."""
+
+    type_name: str
+    """The class of the object with the name, e.g. "UsagePoint"."""
+
+    equipment_mrids: Tuple[str, ...]
+    """
+    The mRIDs of the conducting equipment of the named object when it is a `UsagePoint`, or the mRID of the named object itself when it is a piece of
+    `ConductingEquipment`.
+    """
+
+    feeder_mrid: Optional[str]
+    """The mRID of the feeder the object was indexed from."""
+
+
+class NameIndex:
+    """
+    A map from (name type, name) to the objects with that name, across any number of feeders.
+
+    :param name_types: The names of the name types to index, e.g. `["NMI"]`. If None, every name type is indexed.
+    """
+
+    def __init__(self, name_types: Collection[str] = None):
+        self.name_types = set(name_types) if name_types is not None else None
+        self._objects: Dict[Tuple[str, str], List[NamedObject]] = {}
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._objects
+
+    def add_feeder(self, feeder_mrid: Optional[str], network: NetworkService):
+        """
+        Index the names in `network`, which was fetched for the feeder `feeder_mrid`. An object that was already indexed from another feeder, such as a usage
+        point on the boundary of two feeders, is indexed again with the feeder it was seen on most recently.
+        """
+        for name_type in network.name_types:
+            if self.name_types is not None and name_type.name not in self.name_types:
+                continue
+
+            for name in name_type.names:
+                self._add(self._named_object(name_type.name, name.name, name.identified_object, feeder_mrid))
+
+    def get(self, name_type: str, name: str) -> Optional[NamedObject]:
+        """The object with `name` of type `name_type`, or None if there isn't one. If several objects have the name, the first one indexed is returned."""
+        objects = self._objects.get((name_type, name))
+        return objects[0] if objects else None
+
+    def get_all(self, name_type: str, name: str) -> List[NamedObject]:
+        """Every object with `name` of type `name_type`."""
+        return list(self._objects.get((name_type, name), ()))
+
+    def resolve(self, name_type: str, names: Iterable[str]) -> Dict[str, Optional[NamedObject]]:
+        """Look up a batch of names of type `name_type`, e.g. a list of NMIs. Names that are not in the index map to None."""
+        objects = self._objects
+        return {name: objects[(name_type, name)][0] if (name_type, name) in objects else None for name in names}
+
+    def _add(self, named: NamedObject):
+        objects = self._objects.setdefault((named.name_type, named.name), [])
+        for i, existing in enumerate(objects):
+            if existing.mrid == named.mrid:
+                objects[i] = named
+                return
+        objects.append(named)
+
+    @staticmethod
+    def _named_object(name_type: str, name: str, io: IdentifiedObject, feeder_mrid: Optional[str]) -> NamedObject:
+        if isinstance(io, UsagePoint):
+            equipment_mrids = tuple(e.mrid for e in io.equipment if isinstance(e, ConductingEquipment))
+        elif isinstance(io, ConductingEquipment):
+            equipment_mrids = (io.mrid,)
+        else:
+            equipment_mrids = ()
+
+        return NamedObject(name_type=name_type, name=name, mrid=io.mrid, type_name=type(io).__name__, equipment_mrids=equipment_mrids, feeder_mrid=feeder_mrid)
+
+
+async def main():
+    from zepben.ewb import NetworkConsumerClient, connect_with_token
+
+    from zepben.examples.feeder_fetch_pool import FeederFetchPool
+
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+    feeders = list((await NetworkConsumerClient(channel).get_network_hierarchy()).throw_on_error().result.feeders)
+    # feeders = ["<FEEDER_ID>"] # Uncomment to index just one (or configured) feeder(s).
+
+    index = NameIndex(name_types=["NMI"])
+    results = await FeederFetchPool(channel, max_in_flight=4).run(feeders, index.add_feeder)
+    print(f"Indexed {len(index)} NMIs from {len(results.succeeded)} feeders, {len(results.failed)} feeders failed")
+
+    # Replace these with the NMIs to look up, e.g. read from a file.
+    nmis = ["<NMI>"]
+    for nmi, named in index.resolve("NMI", nmis).items():
+        if named is None:
+            print(f"{nmi}: not found")
+        else:
+            print(f"{nmi}: {named.type_name} {named.mrid} on feeder {named.feeder_mrid}, equipment {', '.join(named.equipment_mrids)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
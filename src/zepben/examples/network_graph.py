@@ -0,0 +1,772 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Compiles a `NetworkService` into flat NumPy arrays once, so traces over it run as numba kernels rather than stepping through `Terminal` and
+`ConnectivityNode` objects.
+
+Every piece of conducting equipment and every terminal is given an integer index. Equipment that share a connectivity node are joined by an edge in a
+compressed sparse row (CSR) adjacency, where the edges out of equipment `i` are `indptr[i]:indptr[i + 1]`. Each edge records the terminals it joins and the
+phases they share, as a bitmask of `SinglePhaseKind.bit_mask`. The open phases and in service flag of each piece of equipment, and the feeder direction of
+each terminal, are held in separate arrays for each set of `NetworkStateOperators`, so normal and current state can be traced over the same graph.
+
+Traces carry the phases they have reached from equipment to equipment, so a phase that is open on a switch does not get past it, while the switch itself is
+still reached. Equipment whose terminals have different phases, such as a transformer supplying a single phase, passes on every phase of its other terminals.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+import numba
+import numpy as np
+from zepben.ewb import ConductingEquipment, FeederDirection, NetworkService, NetworkStateOperators, PhaseCode, Switch, Terminal
+
+__all__ = ["NetworkGraph", "GraphState", "GraphTraversal", "MultiSourceTraversal"]
+
+_NONE = -1
+_ALL_PHASES = 0xFF
+
+_MODE_ANY = 0
+_MODE_DOWNSTREAM = 1
+_MODE_UPSTREAM = 2
+
+_UPSTREAM_BIT = np.uint8(FeederDirection.UPSTREAM.value)
+_DOWNSTREAM_BIT = np.uint8(FeederDirection.DOWNSTREAM.value)
+
+
+@dataclass
+class GraphState:
+    """The state of the network a `NetworkGraph` is traced with, as seen through one set of `NetworkStateOperators`."""
+
+    open_phases: np.ndarray
+    """The phases each piece of equipment is open on, as a bitmask. Zero for anything that is not a switch."""
+
+    in_service: np.ndarray
+    """Whether each piece of equipment is in service. Equipment that is not in service is never reached."""
+
+    direction: np.ndarray
+    """The `FeederDirection` of each terminal, as its integer value. `CONNECTOR` is stored as `BOTH`, as it can be traced in either direction."""
+
+
+@dataclass
+class GraphTraversal:
+    """The equipment reached by a trace over a `NetworkGraph`, as arrays of equipment indexes."""
+
+    graph: 'NetworkGraph'
+    order: np.ndarray
+    """The index of each piece of equipment reached, in the order it was first reached."""
+
+    parent: np.ndarray
+    """The index of the equipment each piece of equipment was first reached from, or -1 for start equipment and equipment that was not reached."""
+
+    phases: np.ndarray
+    """The phases that reached each piece of equipment, as a bitmask. Zero for equipment that was not reached."""
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __contains__(self, equipment: ConductingEquipment) -> bool:
+        index = self.graph.index.get(equipment.mrid)
+        return index is not None and self.phases[index] != 0
+
+    @property
+    def equipment(self) -> List[ConductingEquipment]:
+        """The equipment reached, in the order it was first reached."""
+        return self.graph.equipment_at(self.order)
+
+    def path_to(self, equipment: ConductingEquipment) -> List[ConductingEquipment]:
+        """The equipment between the start of the trace and `equipment`, inclusive, starting from the start. Empty if `equipment` was not reached."""
+        index = self.graph.index.get(equipment.mrid, _NONE)
+        if index == _NONE or self.phases[index] == 0:
+            return []
+
+        path = []
+        while index != _NONE:
+            path.append(index)
+            index = self.parent[index]
+        return self.graph.equipment_at(path[::-1])
+
+
+@dataclass
+class MultiSourceTraversal:
+    """
+    The equipment reached from each source of `NetworkGraph.trace_from_sources`, and the sources reaching each piece of equipment.
+
+    Sources are numbered in the order they were given. The equipment reached from source `i` is `source_equipment[source_indptr[i]:source_indptr[i + 1]]`,
+    nearest first, and the sources reaching equipment `j` are `equipment_sources[equipment_indptr[j]:equipment_indptr[j + 1]]`.
+    """
+
+    graph: 'NetworkGraph'
+    sources: np.ndarray
+    """The equipment index of each source."""
+
+    source_indptr: np.ndarray
+    source_equipment: np.ndarray
+    equipment_indptr: np.ndarray
+    equipment_sources: np.ndarray
+    stop: np.ndarray
+    """Whether each piece of equipment is of a type the trace stopped at."""
+
+    def reached_from(self, source: int) -> List[ConductingEquipment]:
+        """The equipment reached from source number `source`, nearest first."""
+        return self.graph.equipment_at(self.source_equipment[self.source_indptr[source]:self.source_indptr[source + 1]])
+
+    def stopped_at(self, source: int) -> List[ConductingEquipment]:
+        """The equipment of a `stop_at` type reached from source number `source`, nearest first, e.g. its distribution substation."""
+        reached = self.source_equipment[self.source_indptr[source]:self.source_indptr[source + 1]]
+        return self.graph.equipment_at(reached[self.stop[reached]])
+
+    def sources_of(self, equipment: ConductingEquipment) -> List[ConductingEquipment]:
+        """The sources that reach `equipment`."""
+        index = self.graph.index.get(equipment.mrid)
+        if index is None:
+            return []
+        return self.graph.equipment_at(self.sources[self.equipment_sources[self.equipment_indptr[index]:self.equipment_indptr[index + 1]]])
+
+
+class NetworkGraph:
+    """
+    The connectivity of every piece of `ConductingEquipment` in a network, as CSR arrays.
+
+    The graph is a snapshot: equipment or connections added to the network afterwards are not in it, and switch, in service and direction changes are only
+    picked up after `refresh` is called.
+
+    :param network: The network to compile.
+    """
+
+    def __init__(self, network: NetworkService):
+        self.network = network
+        self.equipment: List[ConductingEquipment] = list(network.objects(ConductingEquipment))
+        self.index: Dict[str, int] = {equipment.mrid: i for i, equipment in enumerate(self.equipment)}
+
+        self.terminals: List[Terminal] = []
+        equipment_terminals = [0]
+        terminal_equipment = []
+        terminal_phases = []
+        terminal_node = []
+        nodes: Dict[str, int] = {}
+        for i, equipment in enumerate(self.equipment):
+            for terminal in equipment.terminals:
+                self.terminals.append(terminal)
+                terminal_equipment.append(i)
+                terminal_phases.append(_phase_mask(terminal.phases))
+                node = terminal.connectivity_node
+                terminal_node.append(nodes.setdefault(node.mrid, len(nodes)) if node is not None else _NONE)
+            equipment_terminals.append(len(self.terminals))
+
+        self.equipment_terminals = np.array(equipment_terminals, dtype=np.int64)
+        """The terminals of equipment `i` are `equipment_terminals[i]:equipment_terminals[i + 1]`."""
+
+        self.terminal_equipment = np.array(terminal_equipment, dtype=np.int32)
+        self.terminal_phases = np.array(terminal_phases, dtype=np.uint8)
+        self.terminal_node = np.array(terminal_node, dtype=np.int32)
+        """The connectivity node index of each terminal, or -1 if it is not connected."""
+
+        self.indptr, self.indices, self.edge_from_terminal, self.edge_to_terminal, self.edge_phases = _compile_edges(
+            self.terminal_node, self.terminal_equipment, self.terminal_phases, len(nodes), len(self.equipment)
+        )
+
+        # Equipment whose terminals do not all have the same phases, whose phases cannot be followed from one terminal to the next.
+        self.remaps_phases = _remaps_phases(self.equipment_terminals, self.terminal_phases)
+
+        self._states: Dict[Type[NetworkStateOperators], GraphState] = {}
+        self._passable: Dict[Type[NetworkStateOperators], np.ndarray] = {}
+        self._type_masks: Dict[Tuple[Type[ConductingEquipment], ...], np.ndarray] = {}
+
+        # Scratch arrays for `path`, allocated on its first call. An entry only counts as visited by a search when its stamp matches the search's, so the
+        # arrays never need clearing between searches.
+        self._path_stamp = 0
+        self._path_visited: Optional[np.ndarray] = None
+        self._path_parents: Optional[np.ndarray] = None
+        self._path_depths: Optional[np.ndarray] = None
+        self._path_frontiers: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.equipment)
+
+    def __contains__(self, equipment: ConductingEquipment) -> bool:
+        return equipment.mrid in self.index
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def index_of(self, equipment: Union[ConductingEquipment, Iterable[ConductingEquipment]]) -> np.ndarray:
+        """The indexes of `equipment`. Raises a `KeyError` for equipment that is not in the graph."""
+        if isinstance(equipment, ConductingEquipment):
+            equipment = [equipment]
+        return np.array([self.index[e.mrid] for e in equipment], dtype=np.int32)
+
+    def equipment_at(self, indexes: Iterable[int]) -> List[ConductingEquipment]:
+        return [self.equipment[i] for i in indexes]
+
+    def state(self, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL) -> GraphState:
+        """The state arrays for `network_state_operators`, read from the network the first time they are needed."""
+        state = self._states.get(network_state_operators)
+        if state is None:
+            state = GraphState(
+                open_phases=np.zeros(len(self.equipment), dtype=np.uint8),
+                in_service=np.ones(len(self.equipment), dtype=np.bool_),
+                direction=np.zeros(len(self.terminals), dtype=np.uint8)
+            )
+            self._states[network_state_operators] = state
+            self._read_state(state, network_state_operators, range(len(self.equipment)))
+        return state
+
+    def refresh(
+        self,
+        equipment: Iterable[ConductingEquipment] = None,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL
+    ):
+        """
+        Re-read the open phases, in service flag and terminal directions of `equipment` from the network, e.g. after operating a switch.
+
+        :param equipment: The equipment whose state has changed. If None, the state of every piece of equipment is re-read.
+        :param network_state_operators: The state to refresh.
+        """
+        if network_state_operators not in self._states:
+            return
+
+        indexes = range(len(self.equipment)) if equipment is None else self.index_of(equipment)
+        self._passable.pop(network_state_operators, None)
+        self._read_state(self._states[network_state_operators], network_state_operators, indexes)
+
+    def trace(
+        self,
+        start: Union[ConductingEquipment, Iterable[ConductingEquipment]],
+        direction: Optional[FeederDirection] = None,
+        phases: PhaseCode = None,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL,
+        depth_first: bool = False
+    ) -> GraphTraversal:
+        """
+        Trace out from `start`, stopping at open phases and equipment that is not in service.
+
+        :param start: The equipment to start from. Start equipment is traced out of even if it is open.
+        :param direction: `FeederDirection.DOWNSTREAM` or `FeederDirection.UPSTREAM` to only follow connections in that direction, as
+            `NetworkStateOperators.downstream()` and `upstream()` do. If None, every connection is followed.
+        :param phases: The phases to trace. If None, every phase of the start equipment is traced.
+        :param network_state_operators: The state to trace the network in.
+        :param depth_first: Whether to visit equipment depth first rather than breadth first. This only affects `order` and `parent`.
+        """
+        state = self.state(network_state_operators)
+        order, parent, reached = _trace(
+            self.indptr, self.indices, self.edge_from_terminal, self.edge_to_terminal, self.edge_phases, self.terminal_phases, self.remaps_phases,
+            state.open_phases, state.in_service, state.direction, self.index_of(start), np.uint8(_phase_mask(phases) if phases is not None else _ALL_PHASES),
+            _direction_mode(direction), depth_first
+        )
+        return GraphTraversal(self, order, parent, reached)
+
+    def trace_from_sources(
+        self,
+        sources: Iterable[ConductingEquipment],
+        direction: Optional[FeederDirection] = FeederDirection.UPSTREAM,
+        stop_at: Tuple[Type[ConductingEquipment], ...] = (),
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL
+    ) -> 'MultiSourceTraversal':
+        """
+        Trace out from many pieces of equipment at once, e.g. upstream from every customer on a feeder, recording which sources reach each piece of
+        equipment.
+
+        The network is walked once from all the sources together, so equipment where the paths of several sources converge is only stepped through once,
+        and each source is then labelled onto the equipment it reaches by following the connections that walk used. This costs one walk of the part of
+        the network the sources reach plus the size of the labels, rather than a trace per source.
+
+        Unlike `trace`, the walk is not phase aware: it passes through anything that is `passable` and follows any connection that shares a phase.
+
+        :param sources: The equipment to trace from. Sources are traced out of even if they are open.
+        :param direction: The direction to trace in, as for `trace`.
+        :param stop_at: Types of equipment to stop at, e.g. `(PowerTransformer,)` to find the distribution substation of each source. Equipment of these
+            types is reached, but not traced through, unless it is a source.
+        :param network_state_operators: The state to trace the network in.
+        """
+        sources = self.index_of(sources)
+        stop = self.type_mask(stop_at)
+
+        state = self.state(network_state_operators)
+        blocked = stop | ~self.passable(network_state_operators)
+        edge_used = _walk_from_sources(
+            self.indptr, self.indices, self.edge_from_terminal, self.edge_to_terminal, self.edge_phases, blocked, state.in_service, state.direction, sources,
+            _direction_mode(direction)
+        )
+        source_indptr, source_equipment = _label_sources(self.indptr, self.indices, edge_used, blocked, sources)
+
+        # Invert the labels to get the sources reaching each piece of equipment.
+        label_sources = np.repeat(np.arange(len(sources), dtype=np.int32), np.diff(source_indptr))
+        by_equipment = np.argsort(source_equipment, kind="stable")
+        equipment_indptr = np.zeros(len(self.equipment) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source_equipment, minlength=len(self.equipment)), out=equipment_indptr[1:])
+
+        return MultiSourceTraversal(self, sources, source_indptr, source_equipment, equipment_indptr, label_sources[by_equipment], stop)
+
+    def downstream(self, start: Union[ConductingEquipment, Iterable[ConductingEquipment]], **kwargs) -> List[ConductingEquipment]:
+        """The equipment downstream of `start`, including `start`. Takes the same keyword arguments as `trace`."""
+        return self.trace(start, direction=FeederDirection.DOWNSTREAM, **kwargs).equipment
+
+    def upstream(self, start: Union[ConductingEquipment, Iterable[ConductingEquipment]], **kwargs) -> List[ConductingEquipment]:
+        """The equipment upstream of `start`, including `start`. Takes the same keyword arguments as `trace`."""
+        return self.trace(start, direction=FeederDirection.UPSTREAM, **kwargs).equipment
+
+    def path(
+        self,
+        from_equipment: ConductingEquipment,
+        to_equipment: ConductingEquipment,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL
+    ) -> List[ConductingEquipment]:
+        """
+        The equipment on the shortest path between two pieces of equipment, inclusive, without passing through anything that is not `passable`. Empty if
+        there is no such path. The ends of the path may themselves be open.
+
+        The path is found by searching out from both ends at once, a level at a time from whichever end has the smaller frontier, until the searches meet.
+        This only reaches equipment within about half the length of the path from either end, rather than everything closer to `from_equipment` than
+        `to_equipment` is, and does not depend on feeder direction, so it finds paths between equipment on sibling branches.
+        """
+        if self._path_visited is None:
+            self._path_visited = np.zeros((2, len(self.equipment)), dtype=np.int64)
+            self._path_parents = np.empty((2, len(self.equipment)), dtype=np.int32)
+            self._path_depths = np.empty((2, len(self.equipment)), dtype=np.int32)
+            self._path_frontiers = np.empty((3, len(self.equipment)), dtype=np.int32)
+        self._path_stamp += 1
+
+        state = self.state(network_state_operators)
+        path = _bidirectional_path(
+            self.indptr, self.indices, self.edge_phases, self.passable(network_state_operators), state.in_service, self.index[from_equipment.mrid],
+            self.index[to_equipment.mrid], self._path_visited, self._path_parents, self._path_depths, self._path_frontiers, self._path_stamp
+        )
+        return self.equipment_at(path)
+
+    def connected_components(
+        self,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL,
+        separated_by: Tuple[Type[ConductingEquipment], ...] = (),
+        passable: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        A component number for each piece of equipment, where equipment with the same number is connected without passing through an open switch.
+        Equipment that is not `passable`, or is one of the `separated_by` types, separates components and has a component number of -1.
+
+        :param network_state_operators: The state to find the components in.
+        :param separated_by: Types of equipment that separate components whatever their state, e.g. `(Switch,)` for isolation sections.
+        :param passable: Whether each piece of equipment is passable, in place of `passable(network_state_operators)`, e.g. a copy of it with some
+            switches operated, to find the components of a switching scenario without changing the network.
+        """
+        if passable is None:
+            passable = self.passable(network_state_operators)
+        return _connected_components(self.indptr, self.indices, self.edge_phases, passable & ~self.type_mask(separated_by))
+
+    def type_mask(self, types: Tuple[Type[ConductingEquipment], ...]) -> np.ndarray:
+        """Whether each piece of equipment is an instance of one of `types`. The masks are cached, so do not modify the returned array."""
+        mask = self._type_masks.get(types)
+        if mask is None:
+            mask = np.zeros(len(self.equipment), dtype=np.bool_)
+            if types:
+                mask[[i for i, equipment in enumerate(self.equipment) if isinstance(equipment, types)]] = True
+            self._type_masks[types] = mask
+        return mask
+
+    def passable(self, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL) -> np.ndarray:
+        """
+        Whether each piece of equipment passes supply on to the equipment beyond it on at least one phase, i.e. it is in service and is not open on every
+        one of its phases. The mask is cached until the state is refreshed, so do not modify the returned array.
+        """
+        passable = self._passable.get(network_state_operators)
+        if passable is None:
+            state = self.state(network_state_operators)
+            passable = _passable(self.equipment_terminals, self.terminal_phases, state.open_phases, state.in_service)
+            self._passable[network_state_operators] = passable
+        return passable
+
+    def _read_state(self, state: GraphState, network_state_operators: Type[NetworkStateOperators], indexes: Iterable[int]):
+        for i in indexes:
+            equipment = self.equipment[i]
+            state.in_service[i] = network_state_operators.is_in_service(equipment)
+            if isinstance(equipment, Switch):
+                open_phases = 0
+                for terminal in equipment.terminals:
+                    for phase in terminal.phases.single_phases:
+                        if network_state_operators.is_open(equipment, phase):
+                            open_phases |= phase.bit_mask
+                state.open_phases[i] = open_phases
+
+            for t in range(self.equipment_terminals[i], self.equipment_terminals[i + 1]):
+                state.direction[t] = _direction_bits(network_state_operators.get_direction(self.terminals[t]))
+
+
+def _direction_bits(direction: FeederDirection) -> int:
+    if direction == FeederDirection.CONNECTOR:
+        return FeederDirection.BOTH.value
+    return direction.value
+
+
+def _direction_mode(direction: Optional[FeederDirection]) -> int:
+    if direction is None:
+        return _MODE_ANY
+    elif direction == FeederDirection.DOWNSTREAM:
+        return _MODE_DOWNSTREAM
+    elif direction == FeederDirection.UPSTREAM:
+        return _MODE_UPSTREAM
+    raise ValueError(f"Can only trace DOWNSTREAM or UPSTREAM, not {direction}")
+
+
+def _phase_mask(phases: PhaseCode) -> int:
+    mask = 0
+    for phase in phases.single_phases:
+        mask |= phase.bit_mask
+    return mask
+
+
+def _compile_edges(terminal_node: np.ndarray, terminal_equipment: np.ndarray, terminal_phases: np.ndarray, node_count: int, equipment_count: int):
+    # Group the connected terminals by node, so the edges can be generated from each node's terminals in turn.
+    connected = np.flatnonzero(terminal_node >= 0).astype(np.int32)
+    by_node = connected[np.argsort(terminal_node[connected], kind="stable")]
+    node_indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terminal_node[connected], minlength=node_count), out=node_indptr[1:])
+
+    edge_from, edge_to = _node_edges(node_indptr, by_node, terminal_equipment)
+
+    # Sort the edges by the equipment they leave from to get the CSR layout.
+    from_equipment = terminal_equipment[edge_from]
+    order = np.argsort(from_equipment, kind="stable")
+    edge_from = edge_from[order]
+    edge_to = edge_to[order]
+
+    indptr = np.zeros(equipment_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(from_equipment, minlength=equipment_count), out=indptr[1:])
+    indices = terminal_equipment[edge_to]
+    edge_phases = terminal_phases[edge_from] & terminal_phases[edge_to]
+    return indptr, indices, edge_from, edge_to, edge_phases
+
+
+@numba.njit(cache=True)
+def _node_edges(node_indptr, by_node, terminal_equipment):
+    count = 0
+    for n in range(len(node_indptr) - 1):
+        size = node_indptr[n + 1] - node_indptr[n]
+        count += size * (size - 1)
+
+    edge_from = np.empty(count, dtype=np.int32)
+    edge_to = np.empty(count, dtype=np.int32)
+    e = 0
+    for n in range(len(node_indptr) - 1):
+        for a in range(node_indptr[n], node_indptr[n + 1]):
+            for b in range(node_indptr[n], node_indptr[n + 1]):
+                if a != b and terminal_equipment[by_node[a]] != terminal_equipment[by_node[b]]:
+                    edge_from[e] = by_node[a]
+                    edge_to[e] = by_node[b]
+                    e += 1
+    return edge_from[:e], edge_to[:e]
+
+
+def _remaps_phases(equipment_terminals: np.ndarray, terminal_phases: np.ndarray) -> np.ndarray:
+    counts = np.diff(equipment_terminals)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    remaps = np.zeros(len(counts), dtype=np.bool_)
+    remaps[owner[terminal_phases != terminal_phases[equipment_terminals[owner]]]] = True
+    return remaps
+
+
+@numba.njit(cache=True)
+def _trace(indptr, indices, edge_from, edge_to, edge_phases, terminal_phases, remaps_phases, open_phases, in_service, direction, starts, start_phases,
+           mode, depth_first):
+    n = len(indptr) - 1
+    reached = np.zeros(n, dtype=np.uint8)
+    parent = np.full(n, -1, dtype=np.int32)
+    order = np.empty(n, dtype=np.int32)
+    visited = 0
+
+    # Equipment is queued again each time new phases reach it, which can happen at most once per phase bit.
+    queue = np.empty(n * 8 + len(starts), dtype=np.int32)
+    head = 0
+    tail = 0
+    carried = np.zeros(n, dtype=np.uint8)
+    for s in starts:
+        if reached[s] == 0:
+            order[visited] = s
+            visited += 1
+        reached[s] |= start_phases
+        carried[s] |= start_phases
+        queue[tail] = s
+        tail += 1
+
+    while head < tail:
+        if depth_first:
+            tail -= 1
+            current = queue[tail]
+        else:
+            current = queue[head]
+            head += 1
+
+        phases = carried[current]
+        for e in range(indptr[current], indptr[current + 1]):
+            from_terminal = edge_from[e]
+            to_terminal = edge_to[e]
+            if mode == _MODE_DOWNSTREAM and not ((direction[from_terminal] & _DOWNSTREAM_BIT) and (direction[to_terminal] & _UPSTREAM_BIT)):
+                continue
+            if mode == _MODE_UPSTREAM and not ((direction[from_terminal] & _UPSTREAM_BIT) and (direction[to_terminal] & _DOWNSTREAM_BIT)):
+                continue
+
+            leaving = phases & terminal_phases[from_terminal]
+            if leaving == 0 and phases != 0 and remaps_phases[current]:
+                leaving = terminal_phases[from_terminal]
+            arriving = leaving & edge_phases[e]
+
+            next_equipment = indices[e]
+            new_phases = arriving & ~reached[next_equipment]
+            if new_phases == 0 or not in_service[next_equipment]:
+                continue
+
+            if reached[next_equipment] == 0:
+                order[visited] = next_equipment
+                visited += 1
+                parent[next_equipment] = current
+            reached[next_equipment] |= new_phases
+
+            passing = new_phases & ~open_phases[next_equipment]
+            if passing != 0:
+                carried[next_equipment] |= passing
+                queue[tail] = next_equipment
+                tail += 1
+
+    return order[:visited], parent, reached
+
+
+@numba.njit(cache=True)
+def _walk_from_sources(indptr, indices, edge_from, edge_to, edge_phases, blocked, in_service, direction, sources, mode):
+    # Walk from every source together, stepping out of each piece of equipment once, and mark every connection the walk could follow. Connections into
+    # equipment that has already been reached are marked too, as that is where the paths of different sources converge.
+    n = len(indptr) - 1
+    reached = np.zeros(n, dtype=np.bool_)
+    is_source = np.zeros(n, dtype=np.bool_)
+    edge_used = np.zeros(len(indices), dtype=np.bool_)
+    queue = np.empty(n, dtype=np.int32)
+    tail = 0
+    for s in sources:
+        is_source[s] = True
+        if not reached[s]:
+            reached[s] = True
+            queue[tail] = s
+            tail += 1
+
+    head = 0
+    while head < tail:
+        current = queue[head]
+        head += 1
+        if blocked[current] and not is_source[current]:
+            continue
+
+        for e in range(indptr[current], indptr[current + 1]):
+            if mode == _MODE_DOWNSTREAM and not ((direction[edge_from[e]] & _DOWNSTREAM_BIT) and (direction[edge_to[e]] & _UPSTREAM_BIT)):
+                continue
+            if mode == _MODE_UPSTREAM and not ((direction[edge_from[e]] & _UPSTREAM_BIT) and (direction[edge_to[e]] & _DOWNSTREAM_BIT)):
+                continue
+
+            next_equipment = indices[e]
+            if edge_phases[e] == 0 or not in_service[next_equipment]:
+                continue
+
+            edge_used[e] = True
+            if not reached[next_equipment]:
+                reached[next_equipment] = True
+                queue[tail] = next_equipment
+                tail += 1
+
+    return edge_used
+
+
+@numba.njit(cache=True)
+def _label_sources(indptr, indices, edge_used, blocked, sources):
+    # Breadth first from each source over the marked connections only, not stepping out of blocked equipment other than the source itself. A stamp per
+    # source means the visited flags never need clearing.
+    n = len(indptr) - 1
+    stamp = np.full(n, -1, dtype=np.int32)
+    queue = np.empty(n, dtype=np.int32)
+    source_indptr = np.zeros(len(sources) + 1, dtype=np.int64)
+    labels = np.empty(max(n, 16), dtype=np.int32)
+    count = 0
+
+    for i in range(len(sources)):
+        stamp[sources[i]] = i
+        queue[0] = sources[i]
+        head = 0
+        tail = 1
+        while head < tail:
+            current = queue[head]
+            head += 1
+            if count == len(labels):
+                grown = np.empty(len(labels) * 2, dtype=np.int32)
+                grown[:count] = labels
+                labels = grown
+            labels[count] = current
+            count += 1
+            if blocked[current] and current != sources[i]:
+                continue
+
+            for e in range(indptr[current], indptr[current + 1]):
+                next_equipment = indices[e]
+                if edge_used[e] and stamp[next_equipment] != i:
+                    stamp[next_equipment] = i
+                    queue[tail] = next_equipment
+                    tail += 1
+        source_indptr[i + 1] = count
+
+    return source_indptr, labels[:count]
+
+
+@numba.njit(cache=True)
+def _bidirectional_path(indptr, indices, edge_phases, passable, in_service, source, target, visited, parents, depths, frontiers, stamp):
+    if source == target:
+        return np.array([source], dtype=np.int32)
+
+    # Index 0 is the search from `source`, index 1 from `target`. Each side keeps its current level of the search in its row of `frontiers`, and the
+    # parent of everything it has reached, pointing back towards its own end. The last row of `frontiers` holds the level being built. Only the entries
+    # stamped with `stamp` in `visited` belong to this search, so the work done depends on how far the searches spread rather than on the network size.
+    sizes = np.zeros(2, dtype=np.int64)
+    ends = np.array([source, target], dtype=np.int32)
+    for side in range(2):
+        visited[side, ends[side]] = stamp
+        parents[side, ends[side]] = -1
+        depths[side, ends[side]] = 0
+        frontiers[side, 0] = ends[side]
+        sizes[side] = 1
+
+    best = -1
+    meet_from = -1
+    meet_to = -1
+    while sizes[0] > 0 and sizes[1] > 0:
+        side = 0 if sizes[0] <= sizes[1] else 1
+        other = 1 - side
+        count = 0
+        for f in range(sizes[side]):
+            current = frontiers[side, f]
+            if current != ends[side] and not passable[current]:
+                continue
+
+            for e in range(indptr[current], indptr[current + 1]):
+                next_equipment = indices[e]
+                if edge_phases[e] == 0 or not in_service[next_equipment]:
+                    continue
+
+                if visited[other, next_equipment] == stamp:
+                    # The searches meet on this connection. Keep the shortest meeting of this level, and only cross through the far side's equipment
+                    # if it can be passed through, or is the far end itself.
+                    if next_equipment == ends[other] or passable[next_equipment]:
+                        length = depths[side, current] + 1 + depths[other, next_equipment]
+                        if best == -1 or length < best:
+                            best = length
+                            meet_from = current
+                            meet_to = next_equipment
+                    continue
+
+                if visited[side, next_equipment] != stamp:
+                    visited[side, next_equipment] = stamp
+                    parents[side, next_equipment] = current
+                    depths[side, next_equipment] = depths[side, current] + 1
+                    frontiers[2, count] = next_equipment
+                    count += 1
+
+        if best != -1:
+            break
+        frontiers[side, :count] = frontiers[2, :count]
+        sizes[side] = count
+
+    if best == -1:
+        return np.empty(0, dtype=np.int32)
+
+    # Join the half reached from this side's end to the half reached from the other end, then orient the path from `source` to `target`.
+    path = np.empty(best + 1, dtype=np.int32)
+    length = 0
+    node = meet_from
+    while node != -1:
+        path[length] = node
+        length += 1
+        node = parents[side, node]
+    path[:length] = path[:length][::-1].copy()
+    node = meet_to
+    while node != -1:
+        path[length] = node
+        length += 1
+        node = parents[other, node]
+
+    if side == 1:
+        path = path[::-1].copy()
+    return path
+
+
+@numba.njit(cache=True)
+def _passable(equipment_terminals, terminal_phases, open_phases, in_service):
+    n = len(equipment_terminals) - 1
+    passable = np.empty(n, dtype=np.bool_)
+    for i in range(n):
+        phases = 0
+        for t in range(equipment_terminals[i], equipment_terminals[i + 1]):
+            phases |= terminal_phases[t]
+        passable[i] = in_service[i] and (phases == 0 or (phases & ~open_phases[i]) != 0)
+    return passable
+
+
+@numba.njit(cache=True)
+def _connected_components(indptr, indices, edge_phases, passable):
+    # Equipment that does not pass supply on is a boundary rather than part of a component.
+    n = len(indptr) - 1
+    labels = np.full(n, -1, dtype=np.int32)
+
+    stack = np.empty(n, dtype=np.int32)
+    component = 0
+    for root in range(n):
+        if labels[root] != -1 or not passable[root]:
+            continue
+
+        labels[root] = component
+        stack[0] = root
+        size = 1
+        while size > 0:
+            size -= 1
+            current = stack[size]
+            for e in range(indptr[current], indptr[current + 1]):
+                next_equipment = indices[e]
+                if labels[next_equipment] == -1 and passable[next_equipment] and edge_phases[e] != 0:
+                    labels[next_equipment] = component
+                    stack[size] = next_equipment
+                    size += 1
+        component += 1
+
+    return labels
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.ewb import EnergyConsumer, Feeder
+
+    from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+    network = build_synthetic_feeder(backbone_spans=100, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network)
+    feeder = next(network.objects(Feeder))
+
+    # The first run of the script also includes numba compiling each kernel the first time it is used. The compiled kernels are cached on disk.
+    start = perf_counter()
+    graph = NetworkGraph(network)
+    print(f"Compiled {len(graph)} equipment and {graph.edge_count} edges in {(perf_counter() - start) * 1000:.1f} ms")
+
+    start = perf_counter()
+    downstream = graph.downstream(feeder.normal_head_terminal.conducting_equipment)
+    print(f"{len(downstream)} equipment downstream of the feeder head, traced in {(perf_counter() - start) * 1000:.1f} ms")
+
+    consumer = next(network.objects(EnergyConsumer))
+    start = perf_counter()
+    upstream = graph.upstream(consumer)
+    print(f"{len(upstream)} equipment upstream of {consumer.mrid}, traced in {(perf_counter() - start) * 1000:.1f} ms")
+
+    start = perf_counter()
+    labels = graph.connected_components()
+    print(f"{labels.max() + 1} connected components, found in {(perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
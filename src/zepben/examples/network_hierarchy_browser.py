@@ -0,0 +1,229 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Browses the network hierarchy of an EWB server, loading the equipment of each container only when it is asked for.
+
+fetching_network_hierarchy.py, id_csv_generator.py and tx_id_to_name.py fetch the whole hierarchy, then walk down it fetching each container in turn, so the
+server sits idle while each container is processed, and every new `NetworkConsumerClient` fetches the whole hierarchy again before its first container. A
+`NetworkHierarchyBrowser` fetches the hierarchy once, or loads it from a `FeederSnapshotCache` so large utilities with thousands of feeders start up without
+waiting for it. The containers under any part of the hierarchy can be listed a page at a time, and `walk` loads containers in order while fetching the next
+few in the background.
+
+Each container is loaded with a new client, so it gets a `NetworkService` of its own. The clients share a stub that only asks the server for the
+hierarchy once, answering every later request for it with the first response, and passes every other request on to the server. Each client builds the
+hierarchy from that response just as it would had it asked the server itself, so every `NetworkService` holds the same objects, hierarchy included, as one
+fetched by a plain `NetworkConsumerClient`. When the hierarchy is loaded from a `FeederSnapshotCache`, the response is rebuilt from the loaded hierarchy,
+which leaves out the server's references from the hierarchy to equipment that is not in it. They would be unresolved references in every service anyway.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Deque, Iterable, List, Optional, Tuple, Union
+
+from grpc import Channel
+from zepben.ewb import NetworkConsumerClient, NetworkHierarchy, NetworkService, EquipmentContainer, GeographicalRegion, SubGeographicalRegion, Substation, \
+    Feeder, IdentifiedObject, IncludedEnergizedContainers, IncludedEnergizingContainers, connect_with_token
+from zepben.protobuf.nc.nc_pb2_grpc import NetworkConsumerStub
+from zepben.protobuf.nc.nc_responses_pb2 import GetNetworkHierarchyResponse
+
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache, network_hierarchy_response
+
+__all__ = ["NetworkHierarchyBrowser"]
+
+HierarchyNode = Union[GeographicalRegion, SubGeographicalRegion, Substation, Feeder]
+
+
+class NetworkHierarchyBrowser:
+    """
+    Lazy access to the network hierarchy of an EWB server, and the equipment of the containers in it.
+
+    :param channel: The channel to fetch the hierarchy and containers over.
+    :param prefetch: The number of containers after the current one that `walk` fetches in the background.
+    :param include_energizing_containers: The energizing containers to fetch with each container.
+    :param include_energized_containers: The energized containers to fetch with each container.
+    :param snapshot_cache: An optional `FeederSnapshotCache` to load the hierarchy and containers from, and store them in, instead of always fetching them
+        from the server.
+    """
+
+    def __init__(
+        self,
+        channel: Channel,
+        prefetch: int = 2,
+        include_energizing_containers: IncludedEnergizingContainers = IncludedEnergizingContainers.NONE,
+        include_energized_containers: IncludedEnergizedContainers = IncludedEnergizedContainers.LV_FEEDERS,
+        snapshot_cache: Optional[FeederSnapshotCache] = None
+    ):
+        if prefetch < 0:
+            raise ValueError(f"prefetch must not be negative, got {prefetch}")
+
+        self.channel = channel
+        self.prefetch = prefetch
+        self.include_energizing_containers = include_energizing_containers
+        self.include_energized_containers = include_energized_containers
+        self.snapshot_cache = snapshot_cache
+
+        self._stub = _HierarchyStub(NetworkConsumerStub(channel))
+        self._hierarchy: Optional[NetworkHierarchy] = None
+        self._hierarchy_lock = asyncio.Lock()
+
+    async def hierarchy(self) -> NetworkHierarchy:
+        """The network hierarchy, which is fetched, or loaded from the snapshot cache, the first time it is needed."""
+        async with self._hierarchy_lock:
+            if self._hierarchy is None:
+                client = NetworkConsumerClient(stub=self._stub)
+                if self.snapshot_cache is not None:
+                    result = await self.snapshot_cache.get_network_hierarchy(client)
+                else:
+                    result = await client.get_network_hierarchy()
+                self._hierarchy = result.throw_on_error().value
+                if self._stub.response is None:
+                    self._stub.response = network_hierarchy_response(self._hierarchy)
+            return self._hierarchy
+
+    async def children(self, node: Optional[HierarchyNode] = None, offset: int = 0, limit: Optional[int] = None) -> List[HierarchyNode]:
+        """
+        A page of the containers directly under `node` in the hierarchy, sorted by name then mRID so pages are stable between runs.
+
+        :param node: The geographical region, sub-geographical region or substation to list the children of, or None for the geographical regions.
+        :param offset: The number of children to skip.
+        :param limit: The most children to return, or None for all of them after `offset`.
+        """
+        hierarchy = await self.hierarchy()
+        if node is None:
+            children = hierarchy.geographical_regions.values()
+        elif isinstance(node, GeographicalRegion):
+            children = node.sub_geographical_regions
+        elif isinstance(node, SubGeographicalRegion):
+            children = node.substations
+        elif isinstance(node, Substation):
+            children = node.feeders
+        else:
+            children = []
+
+        ordered = sorted(children, key=lambda it: (it.name or "", it.mrid))
+        return ordered[offset:] if limit is None else ordered[offset:offset + limit]
+
+    async def feeders(self, node: Optional[HierarchyNode] = None) -> List[Feeder]:
+        """Every feeder under `node` in the hierarchy, or in the whole network if `node` is None, in the order `children` lists them."""
+        if isinstance(node, Feeder):
+            return [node]
+
+        feeders = []
+        for child in await self.children(node):
+            feeders.extend(await self.feeders(child))
+        return feeders
+
+    async def load(self, container: Union[EquipmentContainer, str]) -> NetworkService:
+        """
+        Fetch the equipment of `container` into a new `NetworkService`.
+
+        :param container: The container, or the mRID of the container, to fetch.
+        """
+        mrid = container if isinstance(container, str) else container.mrid
+        client = await self._client()
+        if self.snapshot_cache is not None:
+            result = await self.snapshot_cache.get_equipment_container(
+                client,
+                mrid,
+                include_energizing_containers=self.include_energizing_containers,
+                include_energized_containers=self.include_energized_containers
+            )
+        else:
+            result = await client.get_equipment_container(
+                mrid,
+                include_energizing_containers=self.include_energizing_containers,
+                include_energized_containers=self.include_energized_containers
+            )
+
+        result.throw_on_error()
+        return client.service
+
+    async def walk(self, containers: Iterable[Union[EquipmentContainer, str]]) -> AsyncIterator[Tuple[str, NetworkService]]:
+        """
+        Load each of `containers` in order, yielding the mRID of each one with the `NetworkService` it was loaded into.
+
+        The next `prefetch` containers are fetched while the caller processes the current one. Only those containers are held in memory, and each
+        `NetworkService` is released once the caller moves on to the next. If a container fails to load, its error is raised when it is reached and the
+        containers being prefetched are cancelled.
+
+        :param containers: The containers, or the mRIDs of the containers, to load.
+        """
+        remaining = iter(containers)
+        pending: Deque[Tuple[str, asyncio.Task]] = deque()
+
+        def fill():
+            while len(pending) <= self.prefetch:
+                container = next(remaining, None)
+                if container is None:
+                    return
+                mrid = container if isinstance(container, str) else container.mrid
+                pending.append((mrid, asyncio.create_task(self.load(mrid))))
+
+        try:
+            fill()
+            while pending:
+                mrid, task = pending.popleft()
+                network = await task
+                fill()
+                yield mrid, network
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _client(self) -> NetworkConsumerClient:
+        # A new client fetches the whole hierarchy before its first container, which the stub answers without asking the server once it has the hierarchy.
+        await self.hierarchy()
+        return NetworkConsumerClient(stub=self._stub)
+
+
+class _HierarchyStub:
+    """A `NetworkConsumerStub` that only asks `stub` for the network hierarchy once, and passes every other request straight on to it."""
+
+    def __init__(self, stub: NetworkConsumerStub):
+        self._stub = stub
+        self.response: Optional[GetNetworkHierarchyResponse] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self._stub, name)
+
+    async def getNetworkHierarchy(self, request, **kwargs) -> GetNetworkHierarchyResponse:
+        if self.response is None:
+            self.response = await self._stub.getNetworkHierarchy(request, **kwargs)
+        return self.response
+
+
+async def main():
+    from datetime import date
+    from time import perf_counter
+
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+
+    # If you have access to the data directory of the EWB server, use `FeederSnapshotCache.for_ewb_data` instead so snapshots are invalidated when
+    # a new network model is loaded.
+    with FeederSnapshotCache("feeder_snapshots.sqlite", network_model_date=date.today()) as cache:
+        browser = NetworkHierarchyBrowser(channel, prefetch=3, snapshot_cache=cache)
+
+        start = perf_counter()
+        hierarchy = await browser.hierarchy()
+        print(f"Loaded a hierarchy of {len(hierarchy.feeders)} feeders in {perf_counter() - start:.3f} seconds")
+
+        # Browse down to the first page of feeders in the first substation, without loading the equipment of anything else.
+        region = (await browser.children(limit=1))[0]
+        sub_region = (await browser.children(region, limit=1))[0]
+        substation = (await browser.children(sub_region, limit=1))[0]
+        print(f"{region.name} / {sub_region.name} / {substation.name}")
+
+        async for feeder_mrid, network in browser.walk(await browser.children(substation, limit=10)):
+            print(f"    {feeder_mrid}: {network.len_of(IdentifiedObject)} objects")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,238 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Runs traces against "what-if" changes to a network without changing the network itself.
+
+current_state_manipulations.py and tracing.py open switches and disconnect terminals on the shared `NetworkService`, trace it, and then put everything back
+by hand, so only one scenario can be looked at at a time. A `NetworkOverlay` instead records switch operations, in service changes and terminal
+connections as a layer of changes over the normal or current state. Its `state_operators` can be passed to any trace that takes `NetworkStateOperators`,
+and read through to the network for anything the overlay has not changed.
+
+Overlays are copy-on-write: `branch` starts a new overlay on top of an existing one in constant time, sharing its changes rather than copying them, so
+hundreds of scenarios can be built from a common starting point and traced side by side from one loaded network.
+"""
+
+from collections import ChainMap
+from typing import Dict, Generator, List, Optional, Sequence, Type
+
+from zepben.ewb import BusbarSection, Equipment, NetworkStateOperators, NetworkTraceStep, SinglePhaseKind, Switch, Terminal
+from zepben.ewb.services.network.tracing.networktrace.network_trace_step_path_provider import NetworkTraceStepPathProvider, PathFactory, \
+    seq_term_map_to_path
+
+__all__ = ["NetworkOverlay"]
+
+_SWITCH_PHASES = (SinglePhaseKind.A, SinglePhaseKind.B, SinglePhaseKind.C, SinglePhaseKind.N)
+
+
+class NetworkOverlay:
+    """
+    A set of changes to the open state of switches, the in service state of equipment and the connectivity of terminals, layered over a state of a network.
+
+    Only these states are overlaid. Phases, feeder direction and containers are read from, and written to, the network itself, so traces that assign them,
+    such as `Tracing.set_phases` and `Tracing.assign_equipment_to_feeders`, should not be run with the operators of an overlay.
+
+    :param base: The state the overlay changes, `NetworkStateOperators.NORMAL` or `NetworkStateOperators.CURRENT`.
+    :param parent: The overlay to build on. Its changes are visible through this overlay, and changes made to this overlay do not affect it. Changes made
+        to the parent after branching are also visible through this overlay.
+    """
+
+    def __init__(self, base: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL, parent: Optional['NetworkOverlay'] = None):
+        self.parent = parent
+        self.base: Type[NetworkStateOperators] = parent.base if parent is not None else base
+
+        # Each map holds this overlay's changes over its parent's, by mRID, so branching is one new dict per map.
+        self._open: ChainMap = parent._open.new_child() if parent is not None else ChainMap()
+        self._in_service: ChainMap = parent._in_service.new_child() if parent is not None else ChainMap()
+        self._nodes: ChainMap = parent._nodes.new_child() if parent is not None else ChainMap()
+
+        self.state_operators: Type[NetworkStateOperators] = _overlay_state_operators(self)
+        """The network state operators to pass to traces to run them against this overlay."""
+
+    def branch(self) -> 'NetworkOverlay':
+        """Start a new overlay on top of this one."""
+        return NetworkOverlay(parent=self)
+
+    @property
+    def changed_mrids(self) -> Dict[str, List[str]]:
+        """The mRIDs of the switches, equipment and terminals changed by this overlay and its parents, by kind of change."""
+        return {"open": list(self._open), "in_service": list(self._in_service), "connectivity": list(self._nodes)}
+
+    def is_open(self, switch: Switch, phase: SinglePhaseKind = None) -> bool:
+        """Whether `switch` is open on `phase` in the overlay, or on any phase if `phase` is None."""
+        state = self._open.get(switch.mrid)
+        if state is None:
+            return self.base.is_open_switch(switch, phase)
+        return state != 0 if phase is None else state & phase.bit_mask != 0
+
+    def set_open(self, switch: Switch, is_open: bool, phase: SinglePhaseKind = None) -> 'NetworkOverlay':
+        """Open or close `switch` on `phase` in the overlay, or on every phase if `phase` is None."""
+        if phase is None:
+            state = 0b1111 if is_open else 0
+        else:
+            state = self._open.get(switch.mrid)
+            if state is None:
+                state = sum(it.bit_mask for it in _SWITCH_PHASES if self.base.is_open_switch(switch, it))
+            state = state | phase.bit_mask if is_open else state & ~phase.bit_mask
+
+        self._open[switch.mrid] = state
+        return self
+
+    def is_in_service(self, equipment: Equipment) -> bool:
+        """Whether `equipment` is in service in the overlay."""
+        in_service = self._in_service.get(equipment.mrid)
+        return self.base.is_in_service(equipment) if in_service is None else in_service
+
+    def set_in_service(self, equipment: Equipment, in_service: bool) -> 'NetworkOverlay':
+        """Put `equipment` in or out of service in the overlay. Traces do not step onto equipment that is out of service."""
+        self._in_service[equipment.mrid] = in_service
+        return self
+
+    def connected_terminals(self, terminal: Terminal) -> List[Terminal]:
+        """The terminals connected to `terminal` in the overlay."""
+        return [it for it in self._node(terminal) if it is not terminal]
+
+    def has_connectivity_changes(self, terminal: Terminal) -> bool:
+        """Whether the terminals connected to `terminal` are different in the overlay."""
+        return terminal.mrid in self._nodes
+
+    def disconnect(self, terminal: Terminal) -> 'NetworkOverlay':
+        """Disconnect `terminal` from everything it is connected to in the overlay, as `NetworkService.disconnect` does to the network."""
+        remaining = tuple(it for it in self._node(terminal) if it is not terminal)
+        for it in remaining:
+            self._nodes[it.mrid] = remaining
+        self._nodes[terminal.mrid] = (terminal,)
+        return self
+
+    def connect(self, terminal_a: Terminal, terminal_b: Terminal) -> 'NetworkOverlay':
+        """
+        Connect `terminal_a` to `terminal_b` in the overlay, along with everything already connected to either of them, as
+        `NetworkService.connect_terminals` does to the network.
+        """
+        node_a = self._node(terminal_a)
+        merged = node_a + tuple(it for it in self._node(terminal_b) if not any(it is other for other in node_a))
+        for it in merged:
+            self._nodes[it.mrid] = merged
+        return self
+
+    def _node(self, terminal: Terminal) -> Sequence[Terminal]:
+        # The terminals at the same connectivity node as `terminal`, including itself. Each change builds a new tuple, so nodes can be shared with parents.
+        node = self._nodes.get(terminal.mrid)
+        if node is None:
+            node = (terminal, *terminal.connected_terminals())
+        return node
+
+
+class _OverlayPathProvider(NetworkTraceStepPathProvider):
+    # Steps between equipment using the connectivity of an overlay, falling back to the network's own for terminals the overlay has not changed.
+
+    def __init__(self, state_operators: Type[NetworkStateOperators], overlay: NetworkOverlay):
+        super().__init__(state_operators)
+        self._overlay = overlay
+
+    def _next_external_paths(self, path: NetworkTraceStep.Path, path_factory: PathFactory) -> Generator[NetworkTraceStep.Path, None, None]:
+        if not self._overlay.has_connectivity_changes(path.to_terminal):
+            yield from super()._next_external_paths(path, path_factory)
+        elif isinstance(path.to_equipment, BusbarSection):
+            yield from self._next_paths_from_busbar(path, path_factory)
+        else:
+            connected = self._overlay.connected_terminals(path.to_terminal)
+            busbars = [it for it in connected if isinstance(it.conducting_equipment, BusbarSection)]
+            yield from seq_term_map_to_path(busbars or connected, path_factory)
+
+    def _next_paths_from_busbar(self, path: NetworkTraceStep.Path, path_factory: PathFactory) -> Generator[NetworkTraceStep.Path, None, None]:
+        if not self._overlay.has_connectivity_changes(path.to_terminal):
+            yield from NetworkTraceStepPathProvider._next_paths_from_busbar(path, path_factory)
+        else:
+            yield from seq_term_map_to_path(
+                (
+                    it for it in self._overlay.connected_terminals(path.to_terminal)
+                    if it is not path.from_terminal and not isinstance(it.conducting_equipment, BusbarSection)
+                ),
+                path_factory
+            )
+
+
+def _overlay_state_operators(overlay: NetworkOverlay) -> Type[NetworkStateOperators]:
+    # Traces take a class of static state operators rather than an instance, so each overlay gets its own subclass of its base state.
+    provider: Optional[_OverlayPathProvider] = None
+
+    class OverlayNetworkStateOperators(overlay.base):
+        description = f"{overlay.base.description} overlay"
+
+        @staticmethod
+        def is_open_switch(switch: Switch, phase: SinglePhaseKind = None) -> bool:
+            return overlay.is_open(switch, phase)
+
+        @staticmethod
+        def set_open(switch: Switch, is_open: bool, phase: SinglePhaseKind = None) -> None:
+            overlay.set_open(switch, is_open, phase)
+
+        @staticmethod
+        def is_in_service(equipment: Equipment) -> bool:
+            return overlay.is_in_service(equipment)
+
+        @staticmethod
+        def set_in_service(equipment: Equipment, in_service: bool) -> None:
+            overlay.set_in_service(equipment, in_service)
+
+        @classmethod
+        def network_trace_step_path_provider(cls) -> NetworkTraceStepPathProvider:
+            return provider
+
+        @classmethod
+        def next_paths(cls, path: NetworkTraceStep.Path) -> Generator[NetworkTraceStep.Path, None, None]:
+            yield from provider.next_paths(path)
+
+    provider = _OverlayPathProvider(OverlayNetworkStateOperators, overlay)
+    return OverlayNetworkStateOperators
+
+
+async def main():
+    import asyncio
+    from time import perf_counter
+
+    from zepben.ewb import Feeder, PowerTransformer, Tracing, stop_at_open
+
+    from zepben.examples.synthetic_feeder import build_synthetic_zone, assign_directions_and_feeders
+
+    network = build_synthetic_zone(feeder_count=2, backbone_spans=100, lv_circuits_per_transformer=2, spans_per_lv_circuit=5, sections_per_feeder=10)
+    await assign_directions_and_feeders(network)
+    fdr_0 = network.get("fdr_0", Feeder)
+    fdr_1 = network.get("fdr_1", Feeder)
+    tie = network.get("fdr_0_tie", Switch)
+
+    async def transformers_supplied_by(feeder: Feeder, state_operators: Type[NetworkStateOperators]) -> int:
+        transformers = set()
+        await (
+            Tracing.network_trace(network_state_operators=state_operators)
+            .add_condition(stop_at_open())
+            .add_step_action(lambda step, _: transformers.add(step.path.to_equipment.mrid) if isinstance(step.path.to_equipment, PowerTransformer) else None)
+        ).run(feeder.normal_head_terminal, can_stop_on_start_item=False)
+        return len(transformers)
+
+    # Close the tie in one overlay, then branch a scenario off it for each sectionaliser on fdr_0 that could be opened to move load onto fdr_1.
+    tie_closed = NetworkOverlay().set_open(tie, False)
+    scenarios = {
+        switch.mrid: tie_closed.branch().set_open(switch, True)
+        for switch in network.objects(Switch)
+        if switch.mrid.startswith(f"{fdr_0.mrid}_sect_")
+    }
+
+    start = perf_counter()
+    supplied = await asyncio.gather(*(transformers_supplied_by(fdr_1, overlay.state_operators) for overlay in scenarios.values()))
+    print(f"Traced {len(scenarios)} scenarios in {(perf_counter() - start) * 1000:.0f} ms")
+    for sectionaliser, count in zip(scenarios, supplied):
+        print(f"    opening {sectionaliser} with {tie.mrid} closed: {fdr_1.mrid} supplies {count} transformers")
+
+    print(f"The network itself is unchanged: {tie.mrid} is normally open: {tie.is_normally_open()}, "
+          f"{fdr_1.mrid} supplies {await transformers_supplied_by(fdr_1, NetworkStateOperators.NORMAL)} transformers")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
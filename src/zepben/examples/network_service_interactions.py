@@ -125,6 +125,7 @@ for name_type in network.name_types:
     print(f"Network has name type {name_type}")
 
 # Remark: In practice, NMI names are not assigned to lines and breakers.
+# A `NameType` only knows the names of the service it belongs to. To look names up across many fetched feeders, see `NameIndex` in name_index.py.
 
 print("\n####################\n# REMOVING OBJECTS #\n####################\n")
 
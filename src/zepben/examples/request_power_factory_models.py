@@ -4,14 +4,17 @@
 #  License, v. 2.0. If a copy of the MPL was not distributed with this
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import asyncio
 import os
-from typing import List, Generator
+from typing import Dict, List, Generator, Optional
 
-import requests
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
 from zepben.auth import get_token_fetcher
 
+from zepben.examples.model_download import ModelDownloader
+from zepben.examples.model_job_poller import ModelJobPoller, ModelJob, ModelJobState, ModelStatus
+
 # This example utilises the EWB GraphQL APIs to fetch the network hierarchy from the server and
 # then create a Powerfactory model by selecting components of the hierarchy to use.
 # To use, populate the below variables with your desired targets plus the server and auth settings.
@@ -103,17 +106,21 @@ query network {
 '''
 
 
-def request_pf_model_for_zone(graphql_body):
+def request_pf_model_for_zone(graphql_body) -> Optional[str]:
     """
     Request model for ZoneSub -> Feeder -> lvFeeder
+
+    :return: The id of the requested model, or None if it was not requested.
     """
     if check_if_currently_generating_a_model():
         result = network_client.execute(graphql_body)  # retrieve network hierarchy
         target = list(get_target(result))
         model_id = request_pf_model(target, file_name, feeder_max_demand)
         print(f"Power factory model creation requested, model id: {model_id}")
+        return model_id
     else:
         print("Warning: Still generating previous model, current model will not be generated.")
+        return None
 
 
 def get_target(result) -> Generator[str, None, None]:
@@ -227,9 +234,23 @@ def check_if_currently_generating_a_model():
     )
 
 
+async def save_model(model_number, name: str, downloader: Optional[ModelDownloader] = None):
+    """
+    Stream the model to disk, resuming if the connection drops, and check it is the size the server said it would be.
+
+    :param downloader: The downloader to share between downloads. If None, one is created just for this model.
+    """
+    if downloader is None:
+        async with ModelDownloader() as downloader:
+            return await save_model(model_number, name, downloader)
+
+    model_url = api_endpoint.replace("graphql", "power-factory-model/") + str(model_number)
+    result = await downloader.download(model_url, os.path.join(output_dir, name) + ".pfd", headers={'Authorization': token})
+    print(f"{result.path.name} saved at {output_dir} ({result.size_bytes} bytes)")
+
+
 def download_model(model_number):
     # Request model
-    model_url = api_endpoint.replace("graphql", "power-factory-model/") + str(model_number)
     body = gql('''
     query powerFactoryModelById($modelId: ID!) {
       powerFactoryModelById(modelId: $modelId) {
@@ -256,15 +277,62 @@ def download_model(model_number):
     model_status = result['powerFactoryModelById']['state']
     match model_status:
         case 'COMPLETED':
-            model = requests.get(model_url, headers={'Authorization': token})
-            open(os.path.join(output_dir, file_name) + ".pfd", 'wb').write(model.content)
-            print(file_name + ".pfd saved at " + output_dir)
+            asyncio.run(save_model(model_number, file_name))
         case "CREATION":
             print("Model is still being created, please download at a later time")
         case "FAILED":
             print("Model creation error: " + str(result['powerFactoryModelById']['errors']))
 
 
+async def fetch_model_statuses(model_ids: List[str]) -> Dict[str, ModelStatus]:
+    """
+    Fetch the state of every model in `model_ids` in one request. The gql client is synchronous, so it is run on a worker thread to keep the event loop free.
+    """
+    body = gql('''
+    query powerFactoryModelsByIds($modelIds: [ID!]!) {
+      powerFactoryModelsByIds(modelIds: $modelIds) {
+        id
+        state
+        errors
+      }
+    }
+    ''')
+    variables = dict(
+        modelIds=model_ids
+    )
+    result = await asyncio.to_thread(api_client.execute, body, variable_values=variables)
+    return {
+        str(model['id']): ModelStatus(ModelJobState(model['state']), model['errors'] or [])
+        for model in result['powerFactoryModelsByIds']
+    }
+
+
+async def download_models_when_ready(model_ids: List[str]):
+    """
+    Wait for each model in `model_ids` to be generated, downloading each one as soon as it is rather than waiting for them all.
+    """
+    def report(job: ModelJob):
+        match job.state:
+            case ModelJobState.COMPLETED:
+                print(f"Model {job.model_id} created after {job.elapsed:.0f} seconds, downloading")
+            case ModelJobState.TIMED_OUT:
+                print(f"Timed out waiting for model {job.model_id}, please download at a later time")
+            case _:
+                print(f"Model {job.model_id} creation error: {job.errors}")
+
+    async with ModelDownloader() as downloader, ModelJobPoller(
+        fetch_model_statuses,
+        on_completed=lambda job: save_model(job.model_id, job.name, downloader),
+        on_progress=report
+    ) as poller:
+        for model_id in model_ids:
+            poller.track(model_id, f"{file_name}-{model_id}")
+
+    for job in poller.jobs.values():
+        if job.error is not None:
+            print(f"Failed to download model {job.model_id}: {job.error}")
+
+
 graphql_queries = dict(
     zone_with_hv_lv=gql(
         '''
@@ -307,10 +375,13 @@ graphql_queries = dict(
 
 if __name__ == "__main__":
     # Generate model with lv
-    request_pf_model_for_zone(graphql_queries['zone_with_hv_lv'])
+    requested = [request_pf_model_for_zone(graphql_queries['zone_with_hv_lv'])]
 
     # Generate model without lv
-    request_pf_model_for_zone(graphql_queries['zone_with_hv_only'])
+    requested.append(request_pf_model_for_zone(graphql_queries['zone_with_hv_only']))
+
+    # Wait for the requested models, downloading each one as soon as it has been created
+    asyncio.run(download_models_when_ready([model_id for model_id in requested if model_id is not None]))
 
     # Download a model via model number
     download_model(123)
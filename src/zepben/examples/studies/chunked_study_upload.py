@@ -0,0 +1,270 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Uploads a study to EAS in bounded-size chunks, so studies covering a whole zone or network can be uploaded without building one giant `StudyInput`.
+
+Features are added to the upload as JSON text (see geojson_columns.py). By default they are all buffered and uploaded as a single study when the upload is
+closed, exactly as `Mutation.add_studies` would. As EAS has no way to add results to an existing study, bounding the memory of a very large study means
+splitting it: with `split=True`, features are buffered until the next one would take the chunk over `max_chunk_bytes`, and each chunk is uploaded as its own
+study, named `<name> (part <n>)` and sharing the same tags, whenever the study does not fit in one chunk.
+
+Each chunk's request body is written straight from the buffered feature text, gzip compressed and posted over the `EasClient`'s own HTTP client. Up to
+`max_concurrent_uploads` chunks are uploaded at once; adding features waits while that many are in flight, so when splitting, memory use is bounded by the
+chunk size rather than the size of the study. Failed chunks are retried with exponential backoff, and the outcome of every chunk is recorded in a `StudyChunk`.
+"""
+
+import asyncio
+import gzip
+import json
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import httpx
+from zepben.eas import EasClient, GeoJsonOverlayInput, StudyInput, StudyResultInput
+from zepben.eas.lib import GraphQLClientHttpError
+
+__all__ = ["ChunkedStudyUpload", "StudyChunk", "ChunkState"]
+
+# The same operation `EasClient.mutation(Mutation.add_studies(...))` sends.
+_ADD_STUDIES = "mutation addStudies($studies_0: [StudyInput!]!) {\n  addStudies(studies: $studies_0)\n}"
+
+
+class ChunkState(Enum):
+    UPLOADING = "uploading"
+    UPLOADED = "uploaded"
+    FAILED = "failed"
+
+
+@dataclass
+class StudyChunk:
+    """The progress of a single chunk of a `ChunkedStudyUpload`."""
+
+    number: int
+    study_name: str
+    result_names: List[str]
+    feature_count: int
+    size_bytes: int
+    """The size of the uncompressed request body."""
+
+    state: ChunkState = ChunkState.UPLOADING
+    sent_bytes: int = 0
+    """The size of the request body as last sent, after compression."""
+
+    attempts: int = 0
+    study_ids: List[str] = field(default_factory=list)
+    error: Optional[Exception] = None
+
+
+@dataclass
+class _PendingResult:
+    overlay_styles: List[str]
+    features: List[str] = field(default_factory=list)
+
+
+class ChunkedStudyUpload:
+    """
+    A study being uploaded to EAS in chunks. Use as an async context manager, which waits for every chunk to finish uploading on exit, or cancels the
+    chunks still uploading if the block raises.
+
+    :param eas_client: The client to upload with. It must have been created with `asynchronous=True`.
+    :param name: The name of the study.
+    :param description: The description of the study.
+    :param tags: The tags of the study. Every chunk of a split study is given the same tags.
+    :param styles: The Mapbox layers of the study. Every chunk of a split study is given the same styles.
+    :param split: Whether to split a study larger than `max_chunk_bytes` into several studies named `<name> (part <n>)`. If False, the whole study is
+        buffered and uploaded as one study when the upload is closed.
+    :param max_chunk_bytes: The largest uncompressed size the features of one chunk may add up to when splitting. A single feature larger than this gets a
+        chunk of its own.
+    :param max_concurrent_uploads: The number of chunks that may be uploading at once.
+    :param max_attempts: The number of times to try uploading each chunk before recording it as failed.
+    :param retry_delay: The seconds to wait before the first retry of a chunk. The delay doubles on each retry.
+    :param compress: Whether to gzip request bodies. If the server rejects the content encoding of a compressed body, compression is turned off for the
+        rest of the upload.
+    :param on_progress: Called with each chunk once it has been uploaded or has failed.
+    """
+
+    def __init__(
+        self,
+        eas_client: EasClient,
+        name: str,
+        description: str,
+        tags: List[str],
+        styles: List,
+        split: bool = False,
+        max_chunk_bytes: int = 4 * 1024 * 1024,
+        max_concurrent_uploads: int = 3,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+        compress: bool = True,
+        on_progress: Callable[[StudyChunk], None] = None
+    ):
+        self.eas_client = eas_client
+        self.name = name
+        self.description = description
+        self.tags = tags
+        self.styles = styles
+        self.split = split
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.compress = compress
+        self.on_progress = on_progress
+
+        self.chunks: List[StudyChunk] = []
+
+        self._pending: Dict[str, _PendingResult] = {}
+        self._pending_bytes = 0
+        self._uploading: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> 'ChunkedStudyUpload':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            for task in self._uploading:
+                task.cancel()
+            # Wait for the cancelled uploads to finish, so none are left pending, and record the chunks they were uploading as failed.
+            await asyncio.gather(*self._uploading, return_exceptions=True)
+            for chunk in self.chunks:
+                if chunk.state == ChunkState.UPLOADING:
+                    chunk.state = ChunkState.FAILED
+                    chunk.error = chunk.error or asyncio.CancelledError()
+
+    @property
+    def failed_chunks(self) -> List[StudyChunk]:
+        return [chunk for chunk in self.chunks if chunk.state == ChunkState.FAILED]
+
+    async def add_features(self, result_name: str, features: Iterable[str], overlay_styles: List[str]):
+        """
+        Add features to the GeoJSON overlay of the result called `result_name`, creating the result if needed.
+
+        :param result_name: The name of the study result to add the features to.
+        :param features: The JSON text of each GeoJSON feature, e.g. from `GeoJsonColumns.features_json`. The text must be ASCII, which it always is when
+            written by geojson_columns.py, so its length is its size in bytes.
+        :param overlay_styles: The ids of the layers in `styles` to show for the result. Only used when the result is created.
+        """
+        for feature in features:
+            size = len(feature) + 1
+            if self.split and self._pending and self._pending_bytes + size > self.max_chunk_bytes:
+                await self._submit_pending(split=True)
+
+            self._pending.setdefault(result_name, _PendingResult(overlay_styles)).features.append(feature)
+            self._pending_bytes += size
+
+    async def close(self) -> List[StudyChunk]:
+        """Upload anything still buffered and wait for every chunk to finish. Returns the outcome of every chunk."""
+        if self._pending or not self.chunks:
+            await self._submit_pending(split=bool(self.chunks))
+
+        if self._uploading:
+            await asyncio.wait(self._uploading)
+        return self.chunks
+
+    async def _submit_pending(self, split: bool):
+        while len(self._uploading) >= self.max_concurrent_uploads:
+            await asyncio.wait(self._uploading, return_when=asyncio.FIRST_COMPLETED)
+
+        number = len(self.chunks) + 1
+        study_name = f"{self.name} (part {number})" if split else self.name
+        body = self._request_body(study_name, self._pending)
+        chunk = StudyChunk(
+            number=number,
+            study_name=study_name,
+            result_names=list(self._pending),
+            feature_count=sum(len(result.features) for result in self._pending.values()),
+            size_bytes=len(body)
+        )
+        self.chunks.append(chunk)
+
+        self._pending = {}
+        self._pending_bytes = 0
+
+        task = asyncio.create_task(self._upload(chunk, body))
+        self._uploading.add(task)
+        task.add_done_callback(self._uploading.discard)
+
+    def _request_body(self, study_name: str, results: Dict[str, _PendingResult]) -> bytes:
+        # Each overlay is serialised as a placeholder string, which is then swapped for the feature text, so the features are never parsed back into
+        # Python objects just for the client to serialise them again.
+        placeholders = {f"__features_{i}__": result for i, result in enumerate(results.values())}
+        study = StudyInput(
+            name=study_name,
+            description=self.description,
+            tags=self.tags,
+            styles=self.styles,
+            results=[
+                StudyResultInput(name=result_name, sections=[], geoJsonOverlay=GeoJsonOverlayInput(data=placeholder, styles=result.overlay_styles))
+                for placeholder, (result_name, result) in zip(placeholders, results.items())
+            ]
+        )
+        body = json.dumps({
+            "query": _ADD_STUDIES,
+            "operationName": "addStudies",
+            "variables": {"studies_0": [study.model_dump(by_alias=True, exclude_unset=True)]}
+        })
+
+        for placeholder, result in placeholders.items():
+            body = body.replace(json.dumps(placeholder), f'{{"type":"FeatureCollection","features":[{",".join(result.features)}]}}', 1)
+        return body.encode()
+
+    async def _upload(self, chunk: StudyChunk, body: bytes):
+        compressed = None
+        while chunk.attempts < self.max_attempts:
+            chunk.attempts += 1
+            try:
+                if self.compress:
+                    compressed = compressed or gzip.compress(body, compresslevel=6)
+                    content, headers = compressed, {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+                else:
+                    content, headers = body, {"Content-Type": "application/json"}
+
+                chunk.sent_bytes = len(content)
+                response = await self.eas_client.http_client.post(self.eas_client.url, content=content, headers=headers)
+                chunk.study_ids = self.eas_client.get_data(response)["data"]["addStudies"]
+                chunk.state = ChunkState.UPLOADED
+                chunk.error = None
+                break
+            except GraphQLClientHttpError as e:
+                chunk.error = e
+                if self.compress and _rejects_compression(e):
+                    # The server does not accept compressed bodies, so try again uncompressed without using up an attempt.
+                    self.compress = False
+                    chunk.attempts -= 1
+                    continue
+                if e.status_code < 500 and e.status_code != 429:
+                    break
+            except httpx.TransportError as e:
+                chunk.error = e
+            except Exception as e:
+                chunk.error = e
+                break
+
+            if chunk.attempts < self.max_attempts:
+                await asyncio.sleep(self.retry_delay * 2 ** (chunk.attempts - 1))
+
+        if chunk.state != ChunkState.UPLOADED:
+            chunk.state = ChunkState.FAILED
+
+        if self.on_progress is not None:
+            self.on_progress(chunk)
+
+
+def _rejects_compression(error: GraphQLClientHttpError) -> bool:
+    # A 400 is only taken as a rejected encoding when it says so, so GraphQL and validation errors are reported rather than retried.
+    if error.status_code == 415:
+        return True
+    if error.status_code != 400:
+        return False
+    try:
+        text = error.response.text.lower()
+    except Exception:
+        return False
+    return "content-encoding" in text or "content encoding" in text or "gzip" in text
@@ -6,9 +6,11 @@
 import asyncio
 import json
 
-from geojson import Feature, LineString, FeatureCollection, Point
-from zepben.eas import StudyInput, StudyResultInput, GeoJsonOverlayInput, EasClient, Mutation
+from zepben.eas import EasClient
 from zepben.ewb import AcLineSegment, EnergyConsumer, connect_with_token, NetworkConsumerClient, IncludedEnergizedContainers
+
+from zepben.examples.studies.chunked_study_upload import ChunkedStudyUpload
+from zepben.examples.studies.geojson_columns import geojson_columns
 # A study is a geographical visualisation of data that is drawn on top of the network.
 # This data is typically the result of a load flow simulation.
 # Each study may contain multiple results: different visualisations that the user may switch between.
@@ -36,60 +38,6 @@ async def main():
     await grpc_client.get_equipment_container(feeder_mrid, include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS)
     network = grpc_client.service
 
-    print("Creating study..")
-    # Make result that displays a heatmap of energy consumers.
-    ec_geojson = []
-    for ec in network.objects(EnergyConsumer):
-        if ec.location is not None:
-            coord = list(ec.location.points)[0]
-            ec_feature = Feature(
-                id=ec.mrid,
-                geometry=Point((coord.x_position, coord.y_position))
-            )
-            ec_geojson.append(ec_feature)
-
-    ec_result = StudyResultInput(
-        name="Energy Consumers",
-        geoJsonOverlay=GeoJsonOverlayInput(
-            data=FeatureCollection(ec_geojson),
-            styles=["ec-heatmap"]  # Select which Mapbox layers to show for this result
-        ),
-        sections=[]
-    )
-
-    # Make result that highlights LV lines. Each result is a named GeoJSON overlay.
-    lv_lines_geojson = []
-    for line in network.objects(AcLineSegment):
-        if line.base_voltage_value <= 1000 and line.location is not None:
-            line_feature = Feature(
-                id=line.mrid,
-                geometry=LineString([(p.x_position, p.y_position) for p in line.location.points]),
-                properties={
-                    "length": line.length  # Numeric and textual data may be added here. It will be displayed and formatted according to the style(s) used.
-                }
-            )
-            lv_lines_geojson.append(line_feature)
-
-    lv_lines_result = StudyResultInput(
-        name="LV Lines",
-        geoJsonOverlay=GeoJsonOverlayInput(
-            data=FeatureCollection(lv_lines_geojson),
-            styles=["lv-lines", "lv-lengths"]  # Select which Mapbox layers to show for this result
-        ),
-        sections=[]
-    )
-
-    # Create and upload the study.
-    study = StudyInput(
-        name="Example Study",
-        description="Example study with two results.",
-        tags=["example"],  # Tags make it easy to search for studies in a large list of them.
-        results=[ec_result, lv_lines_result],
-        styles=json.load(open("style.json", "r"))  # This is the "layers" property of a Mapbox GL JS style.
-        # Layers specify how features are rendered. For more information about layers, read https://docs.mapbox.com/mapbox-gl-js/style-spec/layers/.
-        # Each layer may have an entry in the legend via the metadata["zb:legend"] field.
-    )
-    print("Study created..")
     print("Connecting to EAS..")
     eas_client = EasClient(
         host=c["host"],
@@ -101,9 +49,42 @@ async def main():
 
     print("Connection established..")
 
+    # Create and upload the study. The features of each result are written out as GeoJSON text straight from columns of coordinates and properties (see
+    # geojson_columns.py), and the study is sent as a single request when the upload is closed (see chunked_study_upload.py, which can also split studies
+    # covering a zone or more into bounded-size parts).
     print("Uploading study...")
-    response = await eas_client.mutation(Mutation.add_studies([study]))
-    print(response)
+    async with ChunkedStudyUpload(
+        eas_client,
+        name="Example Study",
+        description="Example study with two results.",
+        tags=["example"],  # Tags make it easy to search for studies in a large list of them.
+        styles=json.load(open("style.json", "r"))  # This is the "layers" property of a Mapbox GL JS style.
+        # Layers specify how features are rendered. For more information about layers, read https://docs.mapbox.com/mapbox-gl-js/style-spec/layers/.
+        # Each layer may have an entry in the legend via the metadata["zb:legend"] field.
+    ) as upload:
+        # Make result that displays a heatmap of energy consumers. Equipment without a location is skipped.
+        ec_geojson = geojson_columns(network.objects(EnergyConsumer))
+        await upload.add_features(
+            "Energy Consumers",
+            ec_geojson.features_json(),
+            overlay_styles=["ec-heatmap"]  # Select which Mapbox layers to show for this result
+        )
+
+        # Make result that highlights LV lines. Each result is a named GeoJSON overlay.
+        lv_lines_geojson = geojson_columns(
+            (line for line in network.objects(AcLineSegment) if line.base_voltage_value <= 1000),
+            properties={
+                "length": "length"  # Numeric and textual data may be added here. It will be displayed and formatted according to the style(s) used.
+            }
+        )
+        await upload.add_features(
+            "LV Lines",
+            lv_lines_geojson.features_json(),
+            overlay_styles=["lv-lines", "lv-lengths"]  # Select which Mapbox layers to show for this result
+        )
+
+    for chunk in upload.chunks:
+        print(f"{chunk.study_name}: {chunk.state.value} {chunk.study_ids or chunk.error}")
     print("Study uploaded! Please check the Evolve Web App.")
 
     await eas_client.close()
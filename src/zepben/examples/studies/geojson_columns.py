@@ -0,0 +1,207 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Builds GeoJSON for study results from columns of coordinates and properties, rather than a `geojson.Feature` per piece of equipment.
+
+The geometry of every object is extracted into a single coordinate array, with an offsets array marking where each object's points start, and each property
+is evaluated once per object into its own column. The FeatureCollection is then written straight from those arrays as JSON text, with the coordinates and
+numeric properties formatted by numpy in bulk, so no per-feature dictionaries or `geojson` objects are ever created.
+"""
+
+import json
+import math
+from array import array
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Union
+
+import numpy as np
+from zepben.ewb import PowerSystemResource
+
+__all__ = ["GeoJsonColumns", "geojson_columns", "feature_collection_json", "feature_collection"]
+
+COORDINATE_PRECISION = 6
+
+PropertySource = Union[str, Callable[[PowerSystemResource], Any]]
+"""Either the name of an attribute to read from each object, or a function that computes the property from each object."""
+
+
+@dataclass
+class GeoJsonColumns:
+    """
+    The geometry and properties of a set of features, stored column-wise.
+
+    Feature `i` has the points `coordinates[offsets[i]:offsets[i + 1]]`. A feature with a single point is written as a GeoJSON `Point`, and a feature with
+    more than one as a `LineString`.
+    """
+
+    mrids: List[str]
+    offsets: np.ndarray
+    coordinates: np.ndarray
+    properties: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.mrids)
+
+    def slice(self, start: int, stop: int) -> 'GeoJsonColumns':
+        """The features from `start` up to but not including `stop`. The returned columns share memory with these ones where numpy allows it."""
+        start = min(start, len(self))
+        stop = max(start, min(stop, len(self)))
+        offsets = self.offsets[start:stop + 1]
+        return GeoJsonColumns(
+            mrids=self.mrids[start:stop],
+            offsets=offsets - offsets[0],
+            coordinates=self.coordinates[offsets[0]:offsets[-1]],
+            properties={k: v[start:stop] for k, v in self.properties.items()}
+        )
+
+    @staticmethod
+    def concat(blocks: Iterable['GeoJsonColumns']) -> 'GeoJsonColumns':
+        """Join blocks of features with the same property names into one."""
+        blocks = [b for b in blocks if len(b)]
+        if not blocks:
+            return _empty({})
+
+        names = list(blocks[0].properties)
+        if any(list(b.properties) != names for b in blocks):
+            raise ValueError(f"Can only concatenate blocks with the same properties, expected {names}")
+
+        point_counts = np.concatenate([np.diff(b.offsets) for b in blocks])
+        return GeoJsonColumns(
+            mrids=[mrid for b in blocks for mrid in b.mrids],
+            offsets=np.concatenate(([0], np.cumsum(point_counts))),
+            coordinates=np.concatenate([b.coordinates for b in blocks]),
+            properties={name: np.concatenate([b.properties[name] for b in blocks]) for name in names}
+        )
+
+    def features_json(self) -> Iterator[str]:
+        """The JSON text of each feature, in order."""
+        if not len(self):
+            return
+
+        # Coordinates are rounded to the same precision `geojson` writes by default.
+        coordinates = self.coordinates.round(COORDINATE_PRECISION)
+        point_text = np.char.add(
+            np.char.add("[", _number_text(coordinates[:, 0])),
+            np.char.add(",", np.char.add(_number_text(coordinates[:, 1]), "]"))
+        ).tolist()
+        property_text = _property_text(self.properties, len(self))
+
+        starts = self.offsets[:-1].tolist()
+        ends = self.offsets[1:].tolist()
+        for mrid, start, end, properties in zip(map(encode_basestring_ascii, self.mrids), starts, ends, property_text):
+            if end - start == 1:
+                geometry = f'{{"type":"Point","coordinates":{point_text[start]}}}'
+            else:
+                geometry = f'{{"type":"LineString","coordinates":[{",".join(point_text[start:end])}]}}'
+            yield f'{{"type":"Feature","id":{mrid},"geometry":{geometry},"properties":{{{properties}}}}}'
+
+
+def geojson_columns(psrs: Iterable[PowerSystemResource], properties: Mapping[str, PropertySource] = None) -> GeoJsonColumns:
+    """
+    Extract the location and properties of every object in `psrs` into columns. Objects without a location, or whose location has no points, are skipped.
+
+    :param psrs: The objects to build features for.
+    :param properties: The properties to give each feature, by name.
+    """
+    mrids = []
+    located = []
+    counts = array("q")
+    xy = array("d")
+    for psr in psrs:
+        location = psr.location
+        if location is None or location.num_points() == 0:
+            continue
+
+        mrids.append(psr.mrid)
+        located.append(psr)
+        counts.append(location.num_points())
+        for point in location.points:
+            xy.append(point.x_position)
+            xy.append(point.y_position)
+
+    if not mrids:
+        return _empty(properties or {})
+
+    return GeoJsonColumns(
+        mrids=mrids,
+        offsets=np.concatenate(([0], np.cumsum(np.frombuffer(counts, dtype=np.int64)))),
+        coordinates=np.frombuffer(xy, dtype=np.float64).reshape(-1, 2),
+        properties={name: _column(located, source) for name, source in (properties or {}).items()}
+    )
+
+
+def feature_collection_json(*blocks: GeoJsonColumns) -> str:
+    """The JSON text of a FeatureCollection containing the features of every block."""
+    return f'{{"type":"FeatureCollection","features":[{",".join(feature for block in blocks for feature in block.features_json())}]}}'
+
+
+def feature_collection(*blocks: GeoJsonColumns) -> Dict[str, Any]:
+    """
+    A FeatureCollection containing the features of every block, in the form expected by `GeoJsonOverlayInput.data`.
+
+    The EAS client serialises the overlay itself, so the JSON text is parsed back in a single call to the C JSON decoder. This does build a dictionary per
+    feature, so large studies should send the text from `GeoJsonColumns.features_json` directly instead.
+    """
+    return json.loads(feature_collection_json(*blocks))
+
+
+def _column(psrs: List[PowerSystemResource], source: PropertySource) -> np.ndarray:
+    getter = attrgetter(source) if isinstance(source, str) else source
+    values = list(map(getter, psrs))
+
+    # Keep numeric columns numeric so they can be formatted in bulk, with None stored as NaN. A column of only None is kept as objects, so it can be
+    # concatenated with a block where the same property has values of another type.
+    if any(v is not None for v in values) and all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64 if None in values else None)
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _property_text(properties: Dict[str, np.ndarray], length: int) -> List[str]:
+    if not properties:
+        return [""] * length
+
+    columns = []
+    for name, values in properties.items():
+        key = json.dumps(name)
+        if values.dtype.kind == "f":
+            text = _number_text(values)
+        elif values.dtype.kind in "iu":
+            text = values.astype(str)
+        elif values.dtype.kind == "b":
+            text = np.where(values, "true", "false")
+        else:
+            text = np.array([_json_value(v) for v in values.tolist()], dtype=object)
+        columns.append(np.char.add(f"{key}:", text.astype(str)))
+
+    return [",".join(row) for row in zip(*(c.tolist() for c in columns))]
+
+
+def _number_text(values: np.ndarray) -> np.ndarray:
+    # JSON has no NaN or infinity, so they are written as null.
+    return np.where(np.isfinite(values), values.astype(str), "null")
+
+
+def _json_value(value: Any) -> str:
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return "null"
+    return json.dumps(value, default=str)
+
+
+def _empty(properties: Mapping[str, Any]) -> GeoJsonColumns:
+    return GeoJsonColumns(
+        mrids=[],
+        offsets=np.zeros(1, dtype=np.int64),
+        coordinates=np.empty((0, 2), dtype=np.float64),
+        properties={name: np.empty(0, dtype=object) for name in properties}
+    )
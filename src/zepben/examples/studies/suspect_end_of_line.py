@@ -6,28 +6,28 @@
 
 import asyncio
 import json
+from dataclasses import dataclass, field
 from datetime import datetime
-from itertools import islice
-from typing import List, Dict, Tuple, Callable, Any, Union, Type, Set
+from typing import List, Dict, Type, Set, Optional
 
-from geojson import FeatureCollection, Feature
-from geojson.geometry import Geometry, LineString, Point
-from zepben.eas import EasClient, StudyInput, StudyResultInput, GeoJsonOverlayInput, Mutation
+from zepben.eas import EasClient
 from zepben.ewb import PowerTransformer, ConductingEquipment, EnergyConsumer, AcLineSegment, \
-    NetworkConsumerClient, PhaseCode, PowerElectronicsConnection, Feeder, PowerSystemResource, Location, \
-    connect_with_token, NetworkTraceStep, Tracing, downstream, upstream, IncludedEnergizedContainers
+    NetworkConsumerClient, PowerElectronicsConnection, Feeder, connect_with_token, NetworkService
 
+from zepben.examples.feeder_device_hierarchy import FeederDeviceHierarchy
+from zepben.examples.feeder_fetch_pool import FeederFetchPool
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache
+from zepben.examples.studies.chunked_study_upload import ChunkedStudyUpload
+from zepben.examples.studies.geojson_columns import GeoJsonColumns, geojson_columns
 
-with open("../config.json") as f:
-    c = json.loads(f.read())
-
-
-def chunk(it, size):
-    it = iter(it)
-    return iter(lambda: tuple(islice(it, size)), ())
+# Set this to a `FeederSnapshotCache` to only download each feeder from the EWB server once per network model. See feeder_snapshot_cache.py.
+snapshot_cache: Optional[FeederSnapshotCache] = None
 
 
 async def main():
+    with open("../config.json") as f:
+        c = json.loads(f.read())
+
     # Only process feeders in the following zones
     zone_mrids = ["MTN"]
     print(f"Start time: {datetime.now()}")
@@ -46,224 +46,119 @@ async def main():
                 feeder_mrids.append(feeder.mrid)
 
     print(f"Feeders to be processed: {', '.join(feeder_mrids)}")
-    futures = []
-
-    # Process the feeders in batches of 3, using asyncio, for performance
-    batches = chunk(feeder_mrids, 3)
-    for feeders in batches:
-        all_traced_equipment = []
-        transformer_to_suspect_end = dict()
-
-        rpc_channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
-        print(f"Processing feeders {', '.join(feeders)}")
-        for feeder_mrid in feeders:
-            futures.append(asyncio.ensure_future(fetch_feeder_and_trace(feeder_mrid, rpc_channel)))
-
-        for future in futures:
-            tx_to_sus_end = await future
-            if tx_to_sus_end:   # Empty if the feeder failed
-                all_traced_equipment.extend(eq for (k, (count, sus_eq_list)) in tx_to_sus_end.items() for eq in sus_eq_list)
-                transformer_to_suspect_end.update(tx_to_sus_end)
-
-        print(f"Created Study for {len(feeder_mrids)} feeders")
-
-        eas_client = EasClient(host=c["host"], port=c["rpc_port"], protocol="https", access_token=c["access_token"], asynchronous=True)
-
-        print(f"Uploading Study for {', '.join(feeders)} ...")
-        await upload_suspect_end_of_line_study(
-            eas_client,
-            all_traced_equipment,
-            transformer_to_suspect_end,
-            name=f"Suspect end of line {', '.join(feeders)}",
-            description="Highlights every line that is downstream of transformer and ends without a consumer.",
-            tags=["suspect_end_of_line", "-".join(zone_mrids)],
-            styles=json.load(open("style_eol.json", "r"))
-        )
-        await eas_client.close()
-        print(f"Uploaded Study")
+    eas_client = EasClient(host=c["host"], port=c["rpc_port"], protocol="https", access_token=c["access_token"], asynchronous=True)
+    study_name = f"Suspect end of line {', '.join(zone_mrids)}"
+    styles = json.load(open("style_eol.json", "r"))
+
+    # Features are buffered as JSON text as the feeders are traced, so the networks do not need to be held in memory at once. Pass `split=True` to upload
+    # the study in bounded chunks, as several studies, when it is too large to buffer.
+    async with ChunkedStudyUpload(
+        eas_client,
+        name=study_name,
+        description="Highlights every line that is downstream of transformer and ends without a consumer.",
+        tags=["suspect_end_of_line", "-".join(zone_mrids)],
+        styles=styles,
+        on_progress=lambda chunk: print(f"Uploaded {chunk.study_name} ({chunk.feature_count} features): {chunk.state.value}")
+    ) as upload:
+        async def trace_fetched_feeder(feeder_mrid: str, network: NetworkService):
+            print(f"Tracing feeder {feeder_mrid}")
+            suspect_ends = find_suspect_ends_of_line(network.get(feeder_mrid, Feeder))
+            for columns in suspect_end_of_line_columns(suspect_ends).values():
+                await upload.add_features(study_name, columns.features_json(), overlay_styles=[s['id'] for s in styles])
+
+        # Fetch up to 3 feeders at a time over the one channel, tracing each one as soon as it arrives.
+        pool = FeederFetchPool(rpc_channel, max_in_flight=3, snapshot_cache=snapshot_cache)
+        results = await pool.run(feeder_mrids, trace_fetched_feeder)
+        for feeder_mrid, error in results.failed.items():
+            print(f"Failed to process {feeder_mrid}: {error}")
+
+    for chunk in upload.failed_chunks:
+        print(f"Failed to upload {chunk.study_name}: {chunk.error}")
+    print(f"Uploaded Study for {len(results.succeeded)} feeders in {len(upload.chunks)} part(s)")
+    await eas_client.close()
 
     print(f"Finish time: {datetime.now()}")
 
 
-def collect_eq_provider(collection: Set[ConductingEquipment]):
-
-    async def collect_equipment(ps: NetworkTraceStep, _):
-        collection.add(ps.path.to_equipment)
-
-    return collect_equipment
-
-
-async def get_downstream_eq(ce: ConductingEquipment) -> Set[ConductingEquipment]:
-    equipment_set = set()
-
-    await (
-        Tracing.network_trace()
-        .add_condition(downstream())
-        .add_step_action(collect_eq_provider(equipment_set))
-    ).run(start=ce, phases=PhaseCode.ABCN, can_stop_on_start_item=False)
-
-    return equipment_set
-
-
-async def fetch_feeder_and_trace(feeder_mrid: str, rpc_channel):
-    print(f"Fetching Feeder {feeder_mrid}")
-    client = NetworkConsumerClient(rpc_channel)
-
-    result = (
-        await client.get_equipment_container(
-            mrid=feeder_mrid,
-            expected_class=Feeder,
-            include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS
-        )
-    )
-    if result.was_failure:
-        print(f"Failed: {result.thrown}")
-        return {}
-
-    network = client.service
-
-    print(f"Finished fetching Feeder {feeder_mrid}")
-    print(f"Tracing downstream transformers for feeder {feeder_mrid}")
-    transformer_to_eq: Dict[str, Set[ConductingEquipment]] = {}
-    for io in (pt for pt in network.objects(PowerTransformer)):
-        pt: PowerTransformer = io
-        downstream_equipment = await get_downstream_eq(pt)
-        transformer_to_eq[pt.mrid] = downstream_equipment
-
-    print(f"Tracing suspect ends for feeder {feeder_mrid}")
-    transformer_to_suspect_end = await get_transformer_to_suspect_end(transformer_to_eq)
-
-    return transformer_to_suspect_end
-
-
-async def get_transformer_to_suspect_end(
-    transformer_to_eq: Dict[str, Set[ConductingEquipment]]
-) -> Dict[str, Tuple[int, Set[ConductingEquipment]]]:
-
-    transformer_to_suspect_end: Dict[str, (int, List[ConductingEquipment])] = {}
-    for pt_mrid, eq_list in transformer_to_eq.items():
-        single_terminal_junctions = [
-            eq for eq in eq_list
-            if not isinstance(eq, (EnergyConsumer, PowerElectronicsConnection))
-               and len(list(eq.terminals)) == 1
-        ]
-        upstream_eq = set(
-            await _get_upstream_eq_up_to_transformer(stj) for stj in single_terminal_junctions
-        )
-
-        transformer_to_suspect_end[pt_mrid] = (len(single_terminal_junctions), list(upstream_eq))
-
-    return transformer_to_suspect_end
-
-
-async def upload_suspect_end_of_line_study(
-    eas_client: EasClient,
-    pts: List[PowerTransformer],
-    transformer_to_suspect_end: Dict[str, Tuple[int, List[ConductingEquipment]]],
-    name: str,
-    description: str,
-    tags: List[str],
-    styles: List
-) -> None:
-
-    class_to_properties = {
-        EnergyConsumer: {
-            "name": lambda ec: ec.name,
-            "type": lambda x: "ec"
-        },
-        PowerTransformer: {
-            "consumer_count": _suspect_end_count_from(transformer_to_suspect_end),
-            "type": lambda x: "pt"
-        },
-        AcLineSegment: {"name": lambda ec: ec.name},
-    }
-    feature_collection = to_geojson_feature_collection(pts, class_to_properties)
-
-    response = await eas_client.mutation(Mutation.add_studies(
-        [
-            StudyInput(
-                name=name,
-                description=description,
-                tags=tags,
-                results=[
-                    StudyResultInput(
-                        name=name,
-                        geoJsonOverlay=GeoJsonOverlayInput(
-                            data=feature_collection,
-                            styles=[s['id'] for s in styles]
-                        ),
-                        sections=[]
-                    )
-                ],
-                styles=styles
-            )
-        ]
-    ))
-
-    print(f"Study response: {response}")
-
-
-async def _get_upstream_eq_up_to_transformer(ce: ConductingEquipment) -> Set[ConductingEquipment]:
-    eqs = set()
+# The properties given to the features of each class of equipment. Transformer properties depend on the feeder, see `suspect_end_of_line_columns`.
+_CLASS_TO_PROPERTIES = {
+    EnergyConsumer: {
+        "name": "name",
+        "type": lambda x: "ec"
+    },
+    AcLineSegment: {"name": "name"},
+}
 
-    await (
-        Tracing.network_trace()
-        .add_condition(upstream())
-        .add_step_action(collect_eq_provider(eqs))
-        .add_stop_condition(_is_transformer)
-    ).run(start=ce, phases=PhaseCode.ABCN, can_stop_on_start_item=False)
 
-    return eqs
+@dataclass
+class SuspectEndOfLine:
+    """A single terminal piece of equipment that is not a consumer, and so ends a line without supplying anything."""
+    feeder_mrid: str
+    transformer_mrid: str
+    end_mrid: str
+    end_class: str
 
 
-async def _is_transformer(ps: NetworkTraceStep):
-    return isinstance(ps.path.to_equipment, PowerTransformer)
+@dataclass
+class SuspectEndsOfLine:
+    """The suspect ends of line found on a feeder, along with the equipment on the paths from their transformers to them."""
+    ends: List[SuspectEndOfLine] = field(default_factory=list)
+    transformer_suspect_end_counts: Dict[str, int] = field(default_factory=dict)
+    path_equipment: List[ConductingEquipment] = field(default_factory=list)
 
 
-def _suspect_end_count_from(pt_to_sus_end: Dict[str, Tuple[int, List[ConductingEquipment]]]):
-    def fun(pt: PowerTransformer):
-        count, suspect_eq = pt_to_sus_end.get(pt.mrid)
-        return count if count else 0
+def find_suspect_ends_of_line(feeder: Feeder) -> SuspectEndsOfLine:
+    """
+    Find every suspect end of line below a transformer on `feeder` with a single downstream walk of the feeder.
 
-    return fun
+    Each piece of equipment on a path from a transformer to a suspect end is only collected once, by walking up from each end until a transformer or an
+    already collected piece of equipment is reached, so the work done is proportional to the size of the feeder rather than the number of ends times the
+    length of their paths.
+    """
+    hierarchy = FeederDeviceHierarchy(feeder)
+    results = SuspectEndsOfLine()
+    on_path: Set[str] = set()
 
+    for eq in hierarchy.equipment:
+        if isinstance(eq, PowerTransformer):
+            results.transformer_suspect_end_counts.setdefault(eq.mrid, 0)
+            continue
 
-def to_geojson_feature_collection(
-    psrs: List[PowerSystemResource],
-    class_to_properties: Dict[Type, Dict[str, Callable[[Any], Any]]]
-) -> FeatureCollection:
+        if isinstance(eq, (EnergyConsumer, PowerElectronicsConnection)) or eq.num_terminals() != 1:
+            continue
 
-    features = []
-    for psr in psrs:
-        properties_map = class_to_properties.get(type(psr))
+        transformer = hierarchy.transformer(eq)
+        if transformer is None:
+            continue
 
-        if properties_map is not None:
-            features.append(to_geojson_feature(psr, properties_map))
+        results.ends.append(SuspectEndOfLine(feeder.mrid, transformer.mrid, eq.mrid, type(eq).__name__))
+        results.transformer_suspect_end_counts[transformer.mrid] = results.transformer_suspect_end_counts.get(transformer.mrid, 0) + 1
 
-    return FeatureCollection(features)
+        for path_eq in hierarchy.path_to_head(eq):
+            if path_eq.mrid in on_path:
+                break
 
+            on_path.add(path_eq.mrid)
+            results.path_equipment.append(path_eq)
+            if path_eq is transformer:
+                break
 
-def to_geojson_feature(
-    psr: PowerSystemResource,
-    property_map: Dict[str, Callable[[PowerSystemResource], Any]]
-) -> Union[Feature, None]:
+    return results
 
-    geometry = to_geojson_geometry(psr.location)
-    if geometry is None:
-        return None
 
-    properties = {k: f(psr) for (k, f) in property_map.items()}
-    return Feature(psr.mrid, geometry, properties)
-
-
-def to_geojson_geometry(location: Location) -> Union[Geometry, None]:
-    points = list(location.points)
-    if len(points) > 1:
-        return LineString([(point.x_position, point.y_position) for point in points])
-    elif len(points) == 1:
-        return Point((points[0].x_position, points[0].y_position))
-    else:
-        return None
+def suspect_end_of_line_columns(suspect_ends: SuspectEndsOfLine) -> Dict[Type, GeoJsonColumns]:
+    """The GeoJSON columns of the equipment on the paths to each suspect end of line, for each class of equipment shown in the study."""
+    class_to_properties = {
+        **_CLASS_TO_PROPERTIES,
+        PowerTransformer: {
+            "consumer_count": lambda pt: suspect_ends.transformer_suspect_end_counts.get(pt.mrid, 0),
+            "type": lambda x: "pt"
+        },
+    }
+    return {
+        cls: geojson_columns((eq for eq in suspect_ends.path_equipment if type(eq) is cls), properties)
+        for cls, properties in class_to_properties.items()
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Keeps the current state of a network up to date from a stream of SCADA switch events, such as those published by an ADMS.
+
+current_state_manipulations.py operates each switch by hand and then traces the whole feeder again. With thousands of switch events a minute that would
+mean thousands of traces, most of them for switches that operate again a few seconds later. A `SwitchEventIngestion` instead collects events into time
+windows. Within a window only the last event for each switch (and phase) counts, and the surviving events are applied to the current state together with
+a single `FeederReassignment` update, so each window costs one incremental recalculation however many events it held.
+
+Events can come from any async iterable of `SwitchEvent`. `read_switch_events` reads them from a CSV file, optionally replaying them at the rate they were
+recorded, and `queue_switch_events` reads them from an `asyncio.Queue`, standing in for a message queue subscription. The ingestion keeps running totals,
+latency and throughput in its `metrics` while it runs.
+"""
+
+import asyncio
+import csv
+import inspect
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import perf_counter
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from zepben.ewb import NetworkService, SinglePhaseKind, Switch
+
+from zepben.examples.feeder_reassignment import FeederReassignment, FeederStateDelta, SwitchChange
+
+__all__ = ["SwitchEvent", "SwitchEventIngestion", "IngestionWindow", "IngestionMetrics", "WindowConsumer", "read_switch_events", "queue_switch_events"]
+
+
+@dataclass(frozen=True)
+class SwitchEvent:
+    """A switch reported as opened or closed."""
+
+    mrid: str
+    """The mRID of the switch."""
+
+    is_open: bool
+    phase: Optional[SinglePhaseKind] = None
+    """The phase that operated, or None if every phase operated."""
+
+    timestamp: Optional[datetime] = None
+    """When the switch operated. Events in the same window are applied in timestamp order if they all have one, and in the order they arrived otherwise."""
+
+
+@dataclass
+class IngestionWindow:
+    """The events collected in one window, and the outcome of applying them."""
+
+    events: int
+    """How many events arrived in the window."""
+
+    changes: List[SwitchChange]
+    """The switch changes left after coalescing the events, in the order they were applied."""
+
+    unknown: List[str]
+    """The mRIDs of events that are not for a switch in the network."""
+
+    delta: FeederStateDelta
+    """What applying the changes did to the current state of the network."""
+
+    apply_seconds: float
+    """How long applying the changes and updating the network took."""
+
+
+@dataclass
+class IngestionMetrics:
+    """Running totals for a `SwitchEventIngestion`, updated at the end of each window."""
+
+    events_received: int = 0
+    events_applied: int = 0
+    """How many switch changes were applied, after coalescing."""
+
+    events_coalesced: int = 0
+    """How many events were dropped because a later event in the same window replaced them."""
+
+    events_unknown: int = 0
+    """How many events were for an mRID that is not a switch in the network."""
+
+    windows: int = 0
+    apply_seconds: float = 0.0
+    """The total time spent applying changes and updating the network."""
+
+    elapsed_seconds: float = 0.0
+    """The time since the ingestion started."""
+
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=10_000))
+    """The seconds from each recent event arriving to the network being updated with it."""
+
+    @property
+    def events_per_second(self) -> float:
+        """The number of events received per second since the ingestion started."""
+        return self.events_received / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def utilisation(self) -> float:
+        """The fraction of the time since the ingestion started spent updating the network. Near 1, events are arriving faster than they can be applied."""
+        return self.apply_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def latency(self, percentile: float = 50) -> float:
+        """The given percentile, from 0 to 100, of the recent event latencies in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+WindowConsumer = Callable[[IngestionWindow], Union[Awaitable[None], None]]
+"""Called with each window once it has been applied. May be a plain function or a coroutine function."""
+
+
+class SwitchEventIngestion:
+    """
+    Applies a stream of switch events to the current state of a network in time windows.
+
+    A window opens when the first event after the previous window arrives, and closes `window_seconds` later, or sooner once it holds `max_window_events`.
+    Events that arrive while a window is being applied are all collected into the next one, so when events arrive faster than they can be applied the
+    windows grow rather than falling further behind.
+
+    :param network: The network to update. It must already have current phases, direction and feeders, as `FeederReassignment` requires.
+    :param window_seconds: How long to collect events for before applying them.
+    :param max_window_events: The most events to collect into one window, or None for no limit.
+    :param on_window: Optional callback, called with each window once it has been applied.
+    """
+
+    def __init__(self, network: NetworkService, window_seconds: float = 1.0, max_window_events: Optional[int] = None, on_window: WindowConsumer = None):
+        if window_seconds <= 0:
+            raise ValueError(f"window_seconds must be positive, got {window_seconds}")
+
+        self.network = network
+        self.window_seconds = window_seconds
+        self.max_window_events = max_window_events
+        self.on_window = on_window
+        self.metrics = IngestionMetrics()
+        self._reassignment = FeederReassignment(network)
+
+    async def run(self, events: AsyncIterable[SwitchEvent]) -> IngestionMetrics:
+        """
+        Apply every event from `events`, returning once it is exhausted and the last window has been applied.
+
+        :param events: The switch events, in the order they arrived.
+        :return: The metrics for the whole run, which are also available from `metrics` while it is running.
+        """
+        self.metrics = IngestionMetrics()
+        started = perf_counter()
+        received: asyncio.Queue = asyncio.Queue()
+
+        async def receive():
+            try:
+                async for event in events:
+                    received.put_nowait((event, perf_counter()))
+            finally:
+                received.put_nowait(None)
+
+        receiver = asyncio.create_task(receive())
+        try:
+            finished = False
+            while not finished:
+                item = await received.get()
+                if item is None:
+                    break
+
+                # Events that queued up while the last window was being applied go straight into this one, even if it should already have closed.
+                window = [item]
+                closes_at = item[1] + self.window_seconds
+                while self.max_window_events is None or len(window) < self.max_window_events:
+                    if not received.empty():
+                        item = received.get_nowait()
+                    elif perf_counter() >= closes_at:
+                        break
+                    else:
+                        try:
+                            item = await asyncio.wait_for(received.get(), closes_at - perf_counter())
+                        except asyncio.TimeoutError:
+                            break
+                    if item is None:
+                        finished = True
+                        break
+                    window.append(item)
+
+                await self._apply(window, started)
+
+            await receiver
+        finally:
+            receiver.cancel()
+
+        self.metrics.elapsed_seconds = perf_counter() - started
+        return self.metrics
+
+    async def _apply(self, window: List[Tuple[SwitchEvent, float]], started: float):
+        changes, unknown = self._coalesce([event for event, _ in window])
+
+        start = perf_counter()
+        delta = await self._reassignment.apply(changes)
+        finished = perf_counter()
+
+        metrics = self.metrics
+        metrics.events_received += len(window)
+        metrics.events_applied += len(changes)
+        metrics.events_unknown += len(unknown)
+        metrics.events_coalesced += len(window) - len(changes) - len(unknown)
+        metrics.windows += 1
+        metrics.apply_seconds += finished - start
+        metrics.elapsed_seconds = finished - started
+        metrics.latencies.extend(finished - received_at for _, received_at in window)
+
+        if self.on_window is not None:
+            outcome = self.on_window(IngestionWindow(events=len(window), changes=changes, unknown=unknown, delta=delta, apply_seconds=finished - start))
+            if inspect.isawaitable(outcome):
+                await outcome
+
+    def _coalesce(self, events: List[SwitchEvent]) -> Tuple[List[SwitchChange], List[str]]:
+        # Keep the last event for each switch and phase. An event for every phase of a switch replaces any earlier events for single phases of it.
+        if all(event.timestamp is not None for event in events):
+            events = sorted(events, key=lambda it: it.timestamp)
+
+        latest: Dict[Tuple[str, Optional[SinglePhaseKind]], SwitchChange] = {}
+        unknown = []
+        for event in events:
+            switch = self.network.get(event.mrid, default=None)
+            if not isinstance(switch, Switch):
+                unknown.append(event.mrid)
+                continue
+
+            if event.phase is None:
+                for key in [key for key in latest if key[0] == event.mrid]:
+                    del latest[key]
+            latest.pop((event.mrid, event.phase), None)
+            latest[(event.mrid, event.phase)] = SwitchChange(switch, event.is_open, event.phase)
+
+        return list(latest.values()), unknown
+
+
+async def read_switch_events(path: str, speed: Optional[float] = None) -> AsyncIterator[SwitchEvent]:
+    """
+    Read switch events from a CSV file with the columns `timestamp,mrid,phase,state`, where `timestamp` is in ISO 8601 format, `phase` is the name of a
+    `SinglePhaseKind` or blank for every phase, and `state` is "open" or "closed".
+
+    :param path: The CSV file to read.
+    :param speed: If given, replay the events at this multiple of the rate they were recorded, e.g. 60 to replay an hour of events in a minute. Otherwise
+        the events are read as fast as they are consumed.
+    """
+    first: Optional[Tuple[datetime, float]] = None
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            timestamp = datetime.fromisoformat(row["timestamp"])
+            if speed is not None:
+                if first is None:
+                    first = (timestamp, perf_counter())
+                due = first[1] + (timestamp - first[0]).total_seconds() / speed
+                await asyncio.sleep(max(0.0, due - perf_counter()))
+
+            yield SwitchEvent(
+                mrid=row["mrid"],
+                is_open=row["state"].strip().lower() == "open",
+                phase=SinglePhaseKind[row["phase"]] if row["phase"] else None,
+                timestamp=timestamp
+            )
+
+
+async def queue_switch_events(queue: asyncio.Queue) -> AsyncIterator[SwitchEvent]:
+    """Read switch events from `queue` until None is put on it."""
+    while True:
+        event = await queue.get()
+        if event is None:
+            return
+        yield event
+
+
+async def main():
+    import random
+
+    from zepben.ewb import Fuse, NetworkStateOperators
+
+    from zepben.examples.synthetic_feeder import build_synthetic_zone, assign_directions_and_feeders
+
+    network = build_synthetic_zone(feeder_count=2, backbone_spans=50, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network, NetworkStateOperators.CURRENT)
+    fuses = [fuse.mrid for fuse in network.objects(Fuse)]
+
+    # Stand in for a SCADA feed: 5,000 events over about five seconds, mostly fuses blowing and being replaced, with the zone open point moving once.
+    queue = asyncio.Queue()
+
+    async def publish():
+        rng = random.Random(1)
+        for i in range(5_000):
+            if i == 2_500:
+                queue.put_nowait(SwitchEvent("fdr_0_tie", is_open=False, timestamp=datetime.now()))
+                queue.put_nowait(SwitchEvent("fdr_0_sect_25", is_open=True, timestamp=datetime.now()))
+            queue.put_nowait(SwitchEvent(rng.choice(fuses), is_open=rng.random() < 0.5, timestamp=datetime.now()))
+            if i % 100 == 0:
+                await asyncio.sleep(0.1)
+        queue.put_nowait(None)
+
+    def print_window(window: IngestionWindow):
+        print(f"{window.events} events, {len(window.changes)} changes applied in {window.apply_seconds * 1000:.0f} ms: "
+              f"{len(window.delta.containers)} equipment changed feeder, {len(window.delta.de_energised)} de-energised, {len(window.delta.energised)} energised")
+
+    ingestion = SwitchEventIngestion(network, window_seconds=0.5, on_window=print_window)
+    publisher = asyncio.create_task(publish())
+    metrics = await ingestion.run(queue_switch_events(queue))
+    await publisher
+
+    print(f"Received {metrics.events_received} events in {metrics.windows} windows, {metrics.events_per_second:.0f} events/s. "
+          f"Applied {metrics.events_applied}, coalesced {metrics.events_coalesced}, {metrics.events_unknown} unknown.")
+    print(f"Latency p50 {metrics.latency(50) * 1000:.0f} ms, p95 {metrics.latency(95) * 1000:.0f} ms, max {metrics.latency(100) * 1000:.0f} ms, "
+          f"utilisation {metrics.utilisation:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
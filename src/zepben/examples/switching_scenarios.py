@@ -0,0 +1,272 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Evaluates every candidate open point swap on a zone, in parallel, to rank them by the load they move between feeders.
+
+run_swap_feeder in current_state_manipulations.py evaluates one swap by operating the switches on the network and tracing the feeders again. Here the
+zone is compiled into a `NetworkGraph` once, and each scenario (close one switch, open another) is evaluated against a copy of its passable mask with the
+two switches operated, without changing the network. The feeder supplying each piece of equipment is the feeder whose head terminal leads into its
+connected component, with every feeder head as a boundary, so a scenario costs one connected components pass over the arrays.
+
+Scenarios are shared out in chunks over a pool of worker processes. The workers are forked from the process holding the graph, so they read the same
+model snapshot, copy-on-write, rather than each loading or being sent their own copy, and throughput grows with the number of cores.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+import numpy as np
+from zepben.ewb import EnergyConsumer, Feeder, NetworkStateOperators, PowerTransformer, Switch, TransformerFunctionKind
+
+from zepben.examples.network_graph import NetworkGraph
+
+__all__ = ["SwitchingScenarioEvaluator", "SwitchingScenario", "ScenarioResult", "Transfer"]
+
+_NO_FEEDER = -1
+_PARALLELED = -2
+
+
+@dataclass(frozen=True)
+class SwitchingScenario:
+    """Close one switch and open another, e.g. close a tie and open a sectionaliser to move the open point of a zone."""
+
+    close_mrid: str
+    open_mrid: str
+
+
+@dataclass(frozen=True)
+class Transfer:
+    """A piece of equipment supplied by a different feeder in a scenario."""
+
+    mrid: str
+    from_feeder: Optional[str]
+    """The mRID of the feeder supplying the equipment before the switching, or None if it was not supplied."""
+
+    to_feeder: Optional[str]
+    """
+    The mRID of the feeder supplying the equipment after the switching, or None if it is no longer supplied, or is supplied by several paralleled
+    feeders.
+    """
+
+
+@dataclass
+class ScenarioResult:
+    """What a `SwitchingScenario` does to the supply of the zone."""
+
+    scenario: SwitchingScenario
+    paralleled_feeders: List[Tuple[str, ...]] = field(default_factory=list)
+    """Groups of feeders that supply each other after the switching. A scenario that keeps the zone radial has none."""
+
+    transformer_transfers: List[Transfer] = field(default_factory=list)
+    """The distribution transformers supplied by a different feeder, or no feeder, after the switching."""
+
+    customer_transfers: List[Transfer] = field(default_factory=list)
+    """The energy consumers supplied by a different feeder, or no feeder, after the switching."""
+
+    customers_by_feeder: Dict[str, int] = field(default_factory=dict)
+    """The number of energy consumers supplied by each feeder after the switching, leaving out paralleled feeders."""
+
+    @property
+    def is_radial(self) -> bool:
+        return not self.paralleled_feeders
+
+    @property
+    def customers_lost(self) -> int:
+        """The number of energy consumers that are no longer supplied by a single feeder."""
+        return sum(1 for transfer in self.customer_transfers if transfer.to_feeder is None)
+
+    def customers_moved_to(self, feeder_mrid: str) -> int:
+        """The number of energy consumers supplied by `feeder_mrid` after the switching that were not before."""
+        return sum(1 for transfer in self.customer_transfers if transfer.to_feeder == feeder_mrid)
+
+
+class SwitchingScenarioEvaluator:
+    """
+    Evaluates switching scenarios on a compiled network, in parallel.
+
+    :param graph: The compiled zone. Scenarios are evaluated against its state for `network_state_operators`, as it was when the evaluator was created.
+    :param network_state_operators: The state to start each scenario from.
+    :param max_workers: The number of worker processes, or None for one per core. With 1, or where processes cannot be forked, e.g. on Windows, scenarios
+        are evaluated in this process.
+    :param chunk_size: The number of scenarios sent to a worker at a time. Each scenario only takes a few milliseconds, so sending them one at a time
+        would spend more time passing messages than evaluating them.
+    """
+
+    def __init__(
+        self,
+        graph: NetworkGraph,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 32
+    ):
+        self.graph = graph
+        self.network_state_operators = network_state_operators
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        self.feeders: List[Feeder] = [
+            feeder for feeder in graph.network.objects(Feeder)
+            if feeder.normal_head_terminal is not None and feeder.normal_head_terminal.conducting_equipment in graph
+        ]
+
+        # Feeder heads bound the components, and each feeder owns the components its head terminal leads into.
+        self._is_head = np.zeros(len(graph), dtype=np.bool_)
+        self._is_head[graph.index_of([feeder.normal_head_terminal.conducting_equipment for feeder in self.feeders])] = True
+        self._passable = graph.passable(network_state_operators) & ~self._is_head
+        self._head_neighbours = [
+            graph.index_of([terminal.conducting_equipment for terminal in feeder.normal_head_terminal.connected_terminals()]) for feeder in self.feeders
+        ]
+
+        self._transformers = np.flatnonzero(graph.type_mask((PowerTransformer,)))
+        self._transformers = self._transformers[[graph.equipment[i].function != TransformerFunctionKind.voltageRegulator for i in self._transformers]]
+        self._customers = np.flatnonzero(graph.type_mask((EnergyConsumer,)))
+
+        self._before, _ = self._supply(self._passable)
+
+    def candidate_swaps(self) -> List[SwitchingScenario]:
+        """
+        Every swap of an open point between two feeders for a closed switch on the path from it to the head of either feeder. These are the swaps that
+        keep the zone radial, moving the load between the open point and the switch from one feeder to the other.
+        """
+        graph = self.graph
+        scenarios = []
+        for tie in np.flatnonzero(graph.type_mask((Switch,)) & ~self._passable & ~self._is_head):
+            # The sides of the open switch supplied by different feeders, and the head of the feeder on each.
+            sides = {}
+            for neighbour in graph.indices[graph.indptr[tie]:graph.indptr[tie + 1]]:
+                feeder = int(self._before[neighbour])
+                if feeder >= 0:
+                    sides.setdefault(feeder, int(neighbour))
+            if len(sides) < 2:
+                continue
+
+            for feeder, neighbour in sides.items():
+                head = self.feeders[feeder].normal_head_terminal.conducting_equipment
+                for equipment in graph.path(graph.equipment[neighbour], head, self.network_state_operators)[:-1]:
+                    if isinstance(equipment, Switch) and not self._is_head[graph.index[equipment.mrid]]:
+                        scenarios.append(SwitchingScenario(close_mrid=graph.equipment[tie].mrid, open_mrid=equipment.mrid))
+
+        return scenarios
+
+    def evaluate(self, scenarios: Iterable[SwitchingScenario]) -> List[ScenarioResult]:
+        """Evaluate `scenarios`, returning their results in the same order."""
+        global _evaluator
+
+        scenarios = list(scenarios)
+        chunks = [scenarios[i:i + self.chunk_size] for i in range(0, len(scenarios), self.chunk_size)]
+        workers = self.max_workers or os.cpu_count() or 1
+        if workers == 1 or "fork" not in multiprocessing.get_all_start_methods() or len(chunks) < 2:
+            return [self._evaluate(scenario) for scenario in scenarios]
+
+        # Forked workers inherit the evaluator through this global, rather than it being pickled and sent to each of them.
+        _evaluator = self
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                return [result for chunk in executor.map(_evaluate_chunk, chunks) for result in chunk]
+        finally:
+            _evaluator = None
+
+    def _evaluate(self, scenario: SwitchingScenario) -> ScenarioResult:
+        graph = self.graph
+        passable = self._passable.copy()
+        close = graph.index[scenario.close_mrid]
+        passable[close] = graph.state(self.network_state_operators).in_service[close]
+        passable[graph.index[scenario.open_mrid]] = False
+
+        after, paralleled = self._supply(passable)
+        customers = after[self._customers]
+        return ScenarioResult(
+            scenario=scenario,
+            paralleled_feeders=[tuple(self.feeders[feeder].mrid for feeder in group) for group in paralleled],
+            transformer_transfers=self._transfers(self._transformers, after),
+            customer_transfers=self._transfers(self._customers, after),
+            customers_by_feeder={
+                self.feeders[feeder].mrid: int(count) for feeder, count in enumerate(np.bincount(customers[customers >= 0], minlength=len(self.feeders)))
+            }
+        )
+
+    def _supply(self, passable: np.ndarray) -> Tuple[np.ndarray, List[List[int]]]:
+        # The index of the feeder supplying each piece of equipment, with the groups of feeders that end up in the same component.
+        labels = self.graph.connected_components(passable=passable)
+        feeders_of: Dict[int, List[int]] = {}
+        for feeder, neighbours in enumerate(self._head_neighbours):
+            for component in {int(it) for it in labels[neighbours] if it >= 0}:
+                feeders_of.setdefault(component, []).append(feeder)
+
+        component_feeder = np.full(int(labels.max()) + 2 if len(labels) else 1, _NO_FEEDER, dtype=np.int32)
+        paralleled = []
+        for component, feeders in feeders_of.items():
+            component_feeder[component] = feeders[0] if len(feeders) == 1 else _PARALLELED
+            if len(feeders) > 1:
+                paralleled.append(feeders)
+
+        # Labels of -1 index the last entry, which is never a component.
+        return component_feeder[labels], paralleled
+
+    def _transfers(self, equipment: np.ndarray, after: np.ndarray) -> List[Transfer]:
+        changed = equipment[self._before[equipment] != after[equipment]]
+        return [Transfer(self.graph.equipment[i].mrid, self._feeder_mrid(self._before[i]), self._feeder_mrid(after[i])) for i in changed]
+
+    def _feeder_mrid(self, feeder: int) -> Optional[str]:
+        return self.feeders[feeder].mrid if feeder >= 0 else None
+
+
+_evaluator: Optional[SwitchingScenarioEvaluator] = None
+
+
+def _evaluate_chunk(scenarios: List[SwitchingScenario]) -> List[ScenarioResult]:
+    return [_evaluator._evaluate(scenario) for scenario in scenarios]
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.examples.synthetic_feeder import build_synthetic_zone, assign_directions_and_feeders
+
+    network = build_synthetic_zone(feeder_count=4, backbone_spans=200, lv_circuits_per_transformer=2, spans_per_lv_circuit=5, sections_per_feeder=20)
+
+    # Leave the open point between fdr_0 and fdr_1 in the wrong place, so fdr_0 is supplying half of fdr_1.
+    network.get("fdr_0_tie", Switch).set_normally_open(False)
+    network.get("fdr_1_sect_100", Switch).set_normally_open(True)
+    await assign_directions_and_feeders(network)
+    evaluator = SwitchingScenarioEvaluator(NetworkGraph(network))
+
+    scenarios = evaluator.candidate_swaps()
+    # Repeat the candidates to give the pool enough work to be worth timing.
+    workload = scenarios * 10
+
+    start = perf_counter()
+    SwitchingScenarioEvaluator(evaluator.graph, max_workers=1).evaluate(workload)
+    serial = perf_counter() - start
+
+    start = perf_counter()
+    results = evaluator.evaluate(workload)[:len(scenarios)]
+    parallel = perf_counter() - start
+    print(f"Evaluated {len(workload)} scenarios in {serial * 1000:.0f} ms in one process, {parallel * 1000:.0f} ms on {os.cpu_count()} cores")
+
+    # Rank the swaps that keep every customer supplied by how evenly they share the customers of the two feeders they move load between.
+    def imbalance(result: ScenarioResult) -> int:
+        feeders = {transfer.from_feeder for transfer in result.customer_transfers} | {transfer.to_feeder for transfer in result.customer_transfers}
+        counts = [result.customers_by_feeder[feeder] for feeder in feeders]
+        return max(counts) - min(counts)
+
+    candidates = [it for it in results if it.is_radial and it.customer_transfers and not it.customers_lost]
+    print(f"Most balancing of {len(scenarios)} candidate swaps:")
+    for result in sorted(candidates, key=imbalance)[:5]:
+        transfer = result.customer_transfers[0]
+        print(f"    close {result.scenario.close_mrid}, open {result.scenario.open_mrid}: {len(result.transformer_transfers)} transformers and "
+              f"{len(result.customer_transfers)} customers move from {transfer.from_feeder} to {transfer.to_feeder}, leaving "
+              f"{result.customers_by_feeder[transfer.from_feeder]} and {result.customers_by_feeder[transfer.to_feeder]} customers")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
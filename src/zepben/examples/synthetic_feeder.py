@@ -0,0 +1,359 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Builds synthetic radial feeders of a configurable size, using the same construction patterns as ieee_13_node_test_feeder.py.
+
+The feeder has a breaker at its head, an MV backbone with a voltage regulator part way along it, and a distribution transformer teed off every backbone
+span. Each distribution transformer supplies a number of fused LV circuits, and each LV circuit is a chain of LV spans with a consumer on the end of every span.
+
+Several feeders can be built into one network as a zone with `build_synthetic_zone`, which splits each backbone into sections with closed sectionalisers and
+joins the ends of neighbouring backbones with normally open tie switches, so there is something to switch between feeders.
+
+`build_synthetic_network` builds a whole utility's worth of feeders, up to millions of objects, supplied by zone substations along a subtransmission
+backbone and grouped into the geographical region hierarchy, with a location for every piece of equipment. local_network_server.py serves it in place of
+an EWB server.
+
+Backbones are limited to `MAX_BACKBONE_SPANS` spans. The SDK's phase trace recurses once for every branch along the path it is following, so a
+longer backbone exceeds Python's default recursion limit when `assign_directions_and_feeders` phases it. Tracing through a closed tie in a zone follows
+both backbones, so keep the combined length of feeders that are tied together under the limit too. Use more feeders, rather than longer ones, for larger
+networks.
+"""
+
+import asyncio
+from math import cos, radians, sin
+from typing import Collection, List, Optional, Tuple, Type
+
+from zepben.ewb import (
+    AcLineSegment, BaseVoltage, Breaker, BusbarSection, CableInfo, Circuit, ConductingEquipment, EnergyConsumer, EnergySource, EquipmentContainer, Feeder,
+    Fuse, GeographicalRegion, IdentifiedObject, LoadBreakSwitch, Location, LvFeeder, NetworkService, NetworkStateOperators, OverheadWireInfo, PhaseCode,
+    PositionPoint, PowerTransformer, PowerTransformerEnd, SubGeographicalRegion, Substation, Terminal, TransformerFunctionKind, Tracing
+)
+
+__all__ = ["build_synthetic_feeder", "build_synthetic_zone", "build_synthetic_network", "assign_directions_and_feeders", "MAX_BACKBONE_SPANS"]
+
+MAX_BACKBONE_SPANS = 250
+"""The most backbone spans a synthetic feeder can have and still be phased by the SDK without exceeding Python's default recursion limit."""
+
+
+def build_synthetic_feeder(
+    feeder_mrid: str = "synthetic_fdr",
+    backbone_spans: int = 50,
+    lv_circuits_per_transformer: int = 2,
+    spans_per_lv_circuit: int = 5,
+    regulator_span: int = None
+) -> NetworkService:
+    """
+    Build a synthetic feeder into a new `NetworkService`.
+
+    Feeder direction and feeder assignment are not set, use `assign_directions_and_feeders` before tracing the returned network.
+
+    :param feeder_mrid: The mRID of the `Feeder`. All other mRIDs are prefixed with it, so several feeders can be built into separate services and compared.
+    :param backbone_spans: Number of MV backbone spans, each of which supplies one distribution transformer. At most `MAX_BACKBONE_SPANS`.
+    :param lv_circuits_per_transformer: Number of fused LV circuits supplied by each distribution transformer.
+    :param spans_per_lv_circuit: Number of LV spans in each LV circuit, each of which ends in an `EnergyConsumer`.
+    :param regulator_span: The backbone span the voltage regulator is placed before. Defaults to the middle of the backbone.
+    """
+    builder = _FeederBuilder(feeder_mrid)
+    builder.build(backbone_spans, lv_circuits_per_transformer, spans_per_lv_circuit, backbone_spans // 2 if regulator_span is None else regulator_span)
+    return builder.network
+
+
+def build_synthetic_zone(
+    feeder_count: int = 2,
+    backbone_spans: int = 50,
+    lv_circuits_per_transformer: int = 2,
+    spans_per_lv_circuit: int = 5,
+    sections_per_feeder: int = 2
+) -> NetworkService:
+    """
+    Build several synthetic feeders into one `NetworkService`, with the end of each backbone tied to the end of the next by a normally open
+    `LoadBreakSwitch`.
+
+    The feeders have the mRIDs "fdr_0", "fdr_1", ..., and the tie from feeder i to feeder i + 1 has the mRID "fdr_<i>_tie". Each backbone is split into
+    `sections_per_feeder` sections by closed `LoadBreakSwitch`es, "fdr_<i>_sect_<span>", placed before the first span of every section after the first.
+
+    :param feeder_count: Number of feeders in the zone.
+    :param backbone_spans: Number of MV backbone spans on each feeder. At most `MAX_BACKBONE_SPANS`.
+    :param lv_circuits_per_transformer: Number of fused LV circuits supplied by each distribution transformer.
+    :param spans_per_lv_circuit: Number of LV spans in each LV circuit.
+    :param sections_per_feeder: Number of sections each backbone is split into.
+    """
+    network = NetworkService()
+    sectionaliser_spans = {backbone_spans * i // sections_per_feeder for i in range(1, sections_per_feeder)}
+
+    builders = [_FeederBuilder(f"fdr_{i}", network) for i in range(feeder_count)]
+    ends = [builder.build(backbone_spans, lv_circuits_per_transformer, spans_per_lv_circuit, backbone_spans // 2, sectionaliser_spans) for builder in builders]
+
+    for i, builder in enumerate(builders[:-1]):
+        # noinspection PyProtectedMember
+        tie = builder._equipment(LoadBreakSwitch, "tie", 2, base_voltage=builder.mv)
+        tie.set_normally_open(True)
+        tie.set_open(True)
+        network.connect_terminals(ends[i], tie.get_terminal_by_sn(1))
+        network.connect_terminals(tie.get_terminal_by_sn(2), ends[i + 1])
+
+    return network
+
+
+def build_synthetic_network(
+    regions: int = 2,
+    substations_per_region: int = 3,
+    feeders_per_substation: int = 4,
+    backbone_spans: int = 50,
+    lv_circuits_per_transformer: int = 2,
+    spans_per_lv_circuit: int = 5,
+    origin: Tuple[float, float] = (144.96, -37.81)
+) -> NetworkService:
+    """
+    Build a network of zone substations and their feeders into a new `NetworkService`, with the containers and locations an EWB server would hold.
+
+    Each sub-geographical region, "sgr_<r>", has a bulk supply point, "sgr_<r>_bsp", supplying a chain of 66 kV subtransmission lines that is held in the
+    circuit "sgr_<r>_circuit". Each zone substation along the chain, "zs_<r>_<s>", has an HV breaker, a 66/11 kV zone transformer and an MV bus, from
+    which its feeders, "zs_<r>_<s>_fdr_<f>", radiate in different directions. Feeders are built as by `build_synthetic_feeder`, so the equipment on them has
+    mRIDs prefixed with the feeder mRID.
+
+    With the defaults each feeder has about 6,500 objects, counting terminals, connectivity nodes and locations, so a network of a million objects needs
+    about 150 feeders. Feeder direction and feeder assignment are not set, use `assign_directions_and_feeders` before tracing or serving the network.
+
+    :param regions: Number of sub-geographical regions, each supplied by its own subtransmission backbone.
+    :param substations_per_region: Number of zone substations along each subtransmission backbone.
+    :param feeders_per_substation: Number of feeders supplied by each zone substation.
+    :param backbone_spans: Number of MV backbone spans on each feeder, each of which supplies one distribution transformer. At most `MAX_BACKBONE_SPANS`.
+    :param lv_circuits_per_transformer: Number of fused LV circuits supplied by each distribution transformer.
+    :param spans_per_lv_circuit: Number of LV spans in each LV circuit, each of which ends in an `EnergyConsumer`.
+    :param origin: The (longitude, latitude) of the first bulk supply point. Regions and substations are laid out east of it.
+    """
+    network = NetworkService()
+    geographical_region = _add_to(network, GeographicalRegion(mrid="gr", name="Synthetic utility"))
+    substation_spacing = 2 * backbone_spans * _BACKBONE_SPAN_LENGTH
+
+    for region in range(regions):
+        sub_geographical_region = _add_to(network, SubGeographicalRegion(mrid=f"sgr_{region}", geographical_region=geographical_region))
+        geographical_region.add_sub_geographical_region(sub_geographical_region)
+
+        region_origin = (origin[0], origin[1] - region * 2 * substation_spacing / _METRES_PER_DEGREE)
+        builder = _FeederBuilder(f"sgr_{region}", network, region_origin)
+        hv = builder._add(BaseVoltage(mrid=f"sgr_{region}_hv", nominal_voltage=66_000))
+        circuit = _add_to(network, Circuit(mrid=f"sgr_{region}_circuit"))
+
+        source = builder._equipment(EnergySource, "bsp", 1, base_voltage=hv)
+        builder._locate(source, (0.0, 0.0))
+        _contain(circuit, source)
+
+        upstream_terminal = source.get_terminal_by_sn(1)
+        for index in range(substations_per_region):
+            along = (index + 1) * substation_spacing
+            line = builder._equipment(AcLineSegment, f"hv_{index}", 2, base_voltage=hv, length=substation_spacing, asset_info=builder.mv_wire)
+            builder._locate(line, (along - substation_spacing, 0.0), (along, 0.0))
+            _contain(circuit, line)
+            builder._connect(upstream_terminal, line.get_terminal_by_sn(1))
+            upstream_terminal = line.get_terminal_by_sn(2)
+
+            substation = _add_to(network, Substation(mrid=f"zs_{region}_{index}", sub_geographical_region=sub_geographical_region))
+            sub_geographical_region.add_substation(substation)
+            bus = _build_zone_substation(_FeederBuilder(substation.mrid, network, builder.position(along, 0.0)), substation, upstream_terminal, hv)
+
+            for feeder_index in range(feeders_per_substation):
+                feeder_builder = _FeederBuilder(
+                    f"{substation.mrid}_fdr_{feeder_index}",
+                    network,
+                    builder.position(along, 0.0),
+                    bearing=360.0 * feeder_index / feeders_per_substation + 90.0 / feeders_per_substation
+                )
+                feeder_builder.build(backbone_spans, lv_circuits_per_transformer, spans_per_lv_circuit, backbone_spans // 2)
+
+                feeder = network.get(feeder_builder.feeder_mrid, Feeder)
+                feeder.normal_energizing_substation = substation
+                substation.add_feeder(feeder)
+
+                head = feeder.normal_head_terminal.conducting_equipment
+                _contain(substation, head)
+                builder._connect(bus.get_terminal_by_sn(1), head.get_terminal_by_sn(1))
+
+    return network
+
+
+def _build_zone_substation(builder: '_FeederBuilder', substation: Substation, hv_terminal: Terminal, hv: BaseVoltage) -> BusbarSection:
+    breaker = builder._equipment(Breaker, "hv_br", 2, base_voltage=hv)
+    tx = builder._transformer("tx", TransformerFunctionKind.powerTransformer, hv, builder.mv)
+    bus = builder._equipment(BusbarSection, "bus", 1, base_voltage=builder.mv)
+
+    builder._connect(hv_terminal, breaker.get_terminal_by_sn(1))
+    builder._connect(breaker.get_terminal_by_sn(2), tx.get_terminal_by_sn(1))
+    builder._connect(tx.get_terminal_by_sn(2), bus.get_terminal_by_sn(1))
+    for it in (breaker, tx, bus):
+        builder._locate(it, (0.0, 0.0))
+        _contain(substation, it)
+    return bus
+
+
+def _contain(container: EquipmentContainer, equipment: ConductingEquipment):
+    container.add_equipment(equipment)
+    equipment.add_container(container)
+
+
+def _add_to(network: NetworkService, io: IdentifiedObject):
+    network.add(io)
+    return io
+
+
+async def assign_directions_and_feeders(network: NetworkService, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL):
+    """Set phases and feeder direction, and assign equipment to HV and LV feeders, as the EWB server would have done before the feeder was fetched."""
+    if network.len_of(EnergySource):
+        await Tracing.set_phases().run(network, network_state_operators=network_state_operators)
+    else:
+        for feeder in network.objects(Feeder):
+            await Tracing.set_phases().run(
+                feeder.normal_head_terminal,
+                phases=feeder.normal_head_terminal.phases,
+                network_state_operators=network_state_operators
+            )
+    await Tracing.set_direction().run(network, network_state_operators=network_state_operators)
+    await Tracing.assign_equipment_to_feeders().run(network, network_state_operators=network_state_operators)
+    await Tracing.assign_equipment_to_lv_feeders().run(network, network_state_operators=network_state_operators)
+
+
+class _FeederBuilder:
+
+    def __init__(self, feeder_mrid: str, network: Optional[NetworkService] = None, origin: Optional[Tuple[float, float]] = None, bearing: float = 0.0):
+        self.prefix = feeder_mrid
+        self.network = network if network is not None else NetworkService()
+        self.mv = self._add(BaseVoltage(mrid=f"{self.prefix}_mv", nominal_voltage=11_000))
+        self.lv = self._add(BaseVoltage(mrid=f"{self.prefix}_lv", nominal_voltage=415))
+        self.mv_wire = self._add(OverheadWireInfo(mrid=f"{self.prefix}_mv_wire", name="AAAC 7/4.75", rated_current=285))
+        self.lv_cable = self._add(CableInfo(mrid=f"{self.prefix}_lv_cable", name="4C 240 AL XLPE", rated_current=350))
+        self.feeder_mrid = feeder_mrid
+
+        # Equipment is only given a location if the builder has an origin, the (longitude, latitude) of the feeder head. The backbone runs away from the
+        # origin on `bearing`, in degrees anticlockwise from east, with transformers teed off alternate sides of it and LV circuits running away from them.
+        self.origin = origin
+        self.bearing = radians(bearing)
+
+    def build(
+        self,
+        backbone_spans: int,
+        lv_circuits_per_transformer: int,
+        spans_per_lv_circuit: int,
+        regulator_span: int,
+        sectionaliser_spans: Collection[int] = ()
+    ) -> Terminal:
+        """Build the feeder, returning the terminal at the end of its backbone."""
+        if backbone_spans > MAX_BACKBONE_SPANS:
+            raise ValueError(f"backbone_spans must be at most {MAX_BACKBONE_SPANS} for the feeder to be phased by the SDK, got {backbone_spans}")
+
+        breaker = self._equipment(Breaker, "br", 2, base_voltage=self.mv)
+        self._locate(breaker, (0.0, 0.0))
+        self._add(Feeder(mrid=self.feeder_mrid, normal_head_terminal=breaker.get_terminal_by_sn(2)))
+
+        upstream_terminal = breaker.get_terminal_by_sn(2)
+        for span in range(backbone_spans):
+            along = span * _BACKBONE_SPAN_LENGTH
+            if span in sectionaliser_spans:
+                sectionaliser = self._equipment(LoadBreakSwitch, f"sect_{span}", 2, base_voltage=self.mv)
+                self._locate(sectionaliser, (along, 0.0))
+                self._connect(upstream_terminal, sectionaliser.get_terminal_by_sn(1))
+                upstream_terminal = sectionaliser.get_terminal_by_sn(2)
+
+            if span == regulator_span:
+                regulator = self._transformer(f"vr_{span}", TransformerFunctionKind.voltageRegulator, self.mv, self.mv)
+                self._locate(regulator, (along, 0.0))
+                self._connect(upstream_terminal, regulator.get_terminal_by_sn(1))
+                upstream_terminal = regulator.get_terminal_by_sn(2)
+
+            backbone = self._equipment(AcLineSegment, f"mv_{span}", 2, base_voltage=self.mv, length=_BACKBONE_SPAN_LENGTH, asset_info=self.mv_wire)
+            self._locate(backbone, (along, 0.0), (along + _BACKBONE_SPAN_LENGTH, 0.0))
+            self._connect(upstream_terminal, backbone.get_terminal_by_sn(1))
+            upstream_terminal = backbone.get_terminal_by_sn(2)
+
+            along += _BACKBONE_SPAN_LENGTH
+            side = 1 if span % 2 == 0 else -1
+            tee = self._equipment(AcLineSegment, f"tee_{span}", 2, base_voltage=self.mv, length=_TEE_LENGTH, asset_info=self.mv_wire)
+            self._locate(tee, (along, 0.0), (along, side * _TEE_LENGTH))
+            self._connect(upstream_terminal, tee.get_terminal_by_sn(1))
+
+            tx = self._transformer(f"tx_{span}", TransformerFunctionKind.distributionTransformer, self.mv, self.lv)
+            self._locate(tx, (along, side * _TEE_LENGTH))
+            self._connect(tee.get_terminal_by_sn(2), tx.get_terminal_by_sn(1))
+            self._add(LvFeeder(mrid=f"{self.prefix}_lvf_{span}", normal_head_terminal=tx.get_terminal_by_sn(2)))
+
+            for circuit in range(lv_circuits_per_transformer):
+                offset = (circuit - (lv_circuits_per_transformer - 1) / 2) * _LV_CIRCUIT_SPACING
+                self._lv_circuit(tx.get_terminal_by_sn(2), f"{span}_{circuit}", spans_per_lv_circuit, (along, side * _TEE_LENGTH), offset, side)
+
+        return upstream_terminal
+
+    def _lv_circuit(self, tx_terminal: Terminal, name: str, spans: int, tx_position: Tuple[float, float], offset: float, side: int):
+        along, across = tx_position
+        fuse = self._equipment(Fuse, f"fuse_{name}", 2, base_voltage=self.lv)
+        self._locate(fuse, tx_position)
+        self._connect(tx_terminal, fuse.get_terminal_by_sn(1))
+
+        upstream_terminal = fuse.get_terminal_by_sn(2)
+        for span in range(spans):
+            start = (along + offset, across + side * span * _LV_SPAN_LENGTH)
+            end = (along + offset, across + side * (span + 1) * _LV_SPAN_LENGTH)
+            line = self._equipment(AcLineSegment, f"lv_{name}_{span}", 2, base_voltage=self.lv, length=_LV_SPAN_LENGTH, asset_info=self.lv_cable)
+            self._locate(line, tx_position if span == 0 else start, end)
+            self._connect(upstream_terminal, line.get_terminal_by_sn(1))
+            upstream_terminal = line.get_terminal_by_sn(2)
+
+            ec = self._equipment(EnergyConsumer, f"ec_{name}_{span}", 1, base_voltage=self.lv)
+            self._locate(ec, end)
+            self._connect(upstream_terminal, ec.get_terminal_by_sn(1))
+
+    def _transformer(self, name: str, function: TransformerFunctionKind, hv: BaseVoltage, lv: BaseVoltage) -> PowerTransformer:
+        mrid = f"{self.prefix}_{name}"
+        terminals = self._terminals(mrid, 2)
+        ends = [
+            self._add(PowerTransformerEnd(mrid=f"{mrid}_e{i}", terminal=terminal, rated_u=base_voltage.nominal_voltage))
+            for i, (terminal, base_voltage) in enumerate(zip(terminals, (hv, lv)), start=1)
+        ]
+        return self._add(PowerTransformer(mrid=mrid, function=function, terminals=terminals, power_transformer_ends=ends))
+
+    def _equipment(self, cls: Type[ConductingEquipment], name: str, num_terminals: int, **kwargs) -> ConductingEquipment:
+        mrid = f"{self.prefix}_{name}"
+        return self._add(cls(mrid=mrid, terminals=self._terminals(mrid, num_terminals), **kwargs))
+
+    def _terminals(self, mrid: str, num_terminals: int) -> List[Terminal]:
+        return [self._add(Terminal(mrid=f"{mrid}_t{i}", phases=PhaseCode.ABCN)) for i in range(1, num_terminals + 1)]
+
+    def _locate(self, equipment: ConductingEquipment, *points: Tuple[float, float]):
+        # Points are (along, across) the backbone in metres from the origin.
+        if self.origin is None:
+            return
+
+        location = Location(mrid=f"{equipment.mrid}_loc")
+        for along, across in points:
+            location.add_point(PositionPoint(*self.position(along, across)))
+        equipment.location = self._add(location)
+
+    def position(self, along: float, across: float) -> Tuple[float, float]:
+        """The (longitude, latitude) of the point `along` and `across` the backbone in metres from the origin."""
+        longitude, latitude = self.origin
+        east = along * cos(self.bearing) - across * sin(self.bearing)
+        north = along * sin(self.bearing) + across * cos(self.bearing)
+        return longitude + east / (_METRES_PER_DEGREE * cos(radians(latitude))), latitude + north / _METRES_PER_DEGREE
+
+    def _connect(self, t1: Terminal, t2: Terminal):
+        self.network.connect_terminals(t1, t2)
+
+    def _add(self, io: IdentifiedObject):
+        self.network.add(io)
+        return io
+
+
+_BACKBONE_SPAN_LENGTH = 250.0
+_TEE_LENGTH = 30.0
+_LV_SPAN_LENGTH = 40.0
+_LV_CIRCUIT_SPACING = 20.0
+_METRES_PER_DEGREE = 111_320.0
+
+
+if __name__ == "__main__":
+    synthetic = build_synthetic_feeder()
+    asyncio.run(assign_directions_and_feeders(synthetic))
+    print(f"Built {synthetic.len_of(ConductingEquipment)} conducting equipment, {synthetic.len_of(EnergyConsumer)} of which are energy consumers.")
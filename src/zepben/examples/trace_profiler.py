@@ -0,0 +1,416 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Profiles `NetworkTrace` runs, to find which conditions and step actions a trace spends its time in.
+
+tracing.py shows the ways a trace can be configured: depth first or breadth first queues, branching, `ALL_STEPS` or `FIRST_STEP_ON_EQUIPMENT`, and any
+number of conditions and step actions, but not what any of them cost. A `TraceProfiler` instruments a configured trace and records, for every run of it,
+the wall time, the number of steps, how large its queues grew, how many terminals it visited, and the calls to and time spent in each queue condition,
+stop condition and step action, including those added by the SDK itself such as `stop_at_open`.
+
+Instrumentation is done the same way as the SDK's own debug logging: the methods of each condition and action are replaced with timed versions on the
+instances themselves, so branches of a branching trace, which share their parent's conditions and actions, are profiled along with it. The timing adds
+a small cost to each call, so compare profiled runs with each other rather than with runs that were not profiled.
+"""
+
+import inspect
+import json
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from zepben.ewb import NetworkTrace, QueueCondition, StepAction, StopCondition
+
+__all__ = ["TraceProfiler", "TraceRunProfile", "CallbackProfile"]
+
+
+@dataclass
+class CallbackProfile:
+    """The calls to one condition or step action of a trace."""
+
+    name: str
+    """The name of the function, with where it was defined, or the class of the condition or action if it is not a plain function."""
+
+    kind: str
+    """"queue condition", "stop condition" or "step action"."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    """The total time spent in the calls, including awaiting them for step actions that are coroutines."""
+
+    max_seconds: float = 0.0
+    """The time taken by the slowest call."""
+
+    matched: int = 0
+    """How many calls returned True. A matched stop condition stops the trace at the step, a matched queue condition lets the step be queued."""
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+    def _since(self, before: 'CallbackProfile') -> 'CallbackProfile':
+        return CallbackProfile(
+            self.name,
+            self.kind,
+            self.calls - before.calls,
+            self.seconds - before.seconds,
+            self.max_seconds,
+            self.matched - before.matched
+        )
+
+
+@dataclass
+class TraceRunProfile:
+    """What one run of a trace did, including the runs of any branches it created."""
+
+    trace: str
+    """The name of the trace."""
+
+    wall_seconds: float
+    steps: int
+    """How many steps were taken off the queues of the trace and its branches."""
+
+    visits: int
+    """How many of those steps were to a terminal and phases not already visited. Only these are checked against stop conditions and actioned."""
+
+    queued: int
+    """How many steps were added to the queues."""
+
+    queue_high_water: int
+    """The most steps waiting on the queue of the trace, or any one of its branches, at once."""
+
+    branches: int
+    """How many branches were run. Always 0 for a trace that is not branching."""
+
+    branch_queue_high_water: int
+    """The most branches waiting to be run by any one trace or branch at once."""
+
+    visited: int
+    """The number of terminals, or terminal phases, visited by the trace and its branches when the run finished."""
+
+    queue_next_seconds: float
+    """The time spent finding and queueing the next steps from each visited step. This includes the time spent in queue conditions."""
+
+    callbacks: List[CallbackProfile] = field(default_factory=list)
+    """The conditions and step actions called during the run, slowest first."""
+
+    @property
+    def callback_seconds(self) -> float:
+        """The time spent in conditions and step actions."""
+        return sum(it.seconds for it in self.callbacks)
+
+    @property
+    def trace_seconds(self) -> float:
+        """The time spent in the trace itself, finding paths, tracking visited terminals and managing queues, rather than in its conditions and actions."""
+        return self.wall_seconds - self.callback_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The profile as a dict of JSON compatible values."""
+        profile = asdict(self)
+        profile["callback_seconds"] = self.callback_seconds
+        profile["trace_seconds"] = self.trace_seconds
+        for as_dict, callback in zip(profile["callbacks"], self.callbacks):
+            as_dict["mean_seconds"] = callback.mean_seconds
+        return profile
+
+
+class TraceProfiler:
+    """
+    Records a `TraceRunProfile` for every run of the traces it instruments.
+
+    Instrument a trace once its conditions and step actions have been added, before running it. Conditions and actions added to it after it has been
+    instrumented are not profiled. A profiler can instrument any number of traces, including ones that run concurrently.
+    """
+
+    def __init__(self):
+        self.runs: List[TraceRunProfile] = []
+        """The profile of every completed run, in the order they finished."""
+
+    def instrument(self, trace: NetworkTrace, name: Optional[str] = None) -> NetworkTrace:
+        """
+        Instrument `trace` so that each of its runs is profiled.
+
+        :param trace: The trace to profile.
+        :param name: The name to give the trace in its profiles. Defaults to the name of the trace.
+        :return: `trace`, so it can be instrumented as it is built and run.
+        """
+        _TraceRecorder(self, trace, name or trace.name)
+        return trace
+
+    def callbacks(self, trace: Optional[str] = None) -> List[CallbackProfile]:
+        """
+        The calls to each condition and step action, summed over every run, slowest first.
+
+        :param trace: Only include runs of the trace with this name, or every run if None.
+        """
+        totals: Dict[tuple, CallbackProfile] = {}
+        for run in self.runs:
+            if trace is None or run.trace == trace:
+                for it in run.callbacks:
+                    total = totals.setdefault((it.name, it.kind), CallbackProfile(it.name, it.kind))
+                    total.calls += it.calls
+                    total.seconds += it.seconds
+                    total.max_seconds = max(total.max_seconds, it.max_seconds)
+                    total.matched += it.matched
+        return sorted(totals.values(), key=lambda it: it.seconds, reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Every run, and the totals for each condition and step action, as a dict of JSON compatible values."""
+        return {
+            "runs": [run.to_dict() for run in self.runs],
+            "callbacks": [dict(asdict(it), mean_seconds=it.mean_seconds) for it in self.callbacks()],
+        }
+
+    def write_json(self, path: str):
+        """Write `to_dict` to `path` as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self, top: int = 5) -> str:
+        """A readable summary of each run and its `top` slowest conditions and step actions."""
+        lines = []
+        for run in self.runs:
+            lines.append(
+                f"{run.trace}: {run.wall_seconds * 1000:.1f} ms, {run.steps} steps ({run.visits} visits), {run.visited} visited, "
+                f"queue high water {run.queue_high_water}, {run.branches} branches (queue high water {run.branch_queue_high_water}), "
+                f"{run.queue_next_seconds * 1000:.1f} ms queueing next steps, {run.trace_seconds * 1000:.1f} ms in the trace itself"
+            )
+            for it in run.callbacks[:top]:
+                matched = "" if it.kind == "step action" else f", {it.matched} matched"
+                lines.append(f"    {it.seconds * 1000:8.2f} ms, {it.calls} calls{matched}  {it.kind}: {it.name}")
+        return "\n".join(lines)
+
+
+class _TraceRecorder:
+    # Counts the steps, queues and callbacks of one instrumented trace and the branches it creates, and records a profile when each run finishes.
+
+    def __init__(self, profiler: TraceProfiler, trace: NetworkTrace, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.callbacks: Dict[int, CallbackProfile] = {}
+        self._reset_counts()
+        self._instrument(trace)
+
+        run = trace.run
+
+        async def profiled_run(*args, **kwargs):
+            # Wrap conditions and actions here as well, in case any were added between instrumenting the trace and running it.
+            self._instrument_callbacks(trace)
+            self._reset_counts()
+            before = {key: CallbackProfile(it.name, it.kind, it.calls, it.seconds, 0.0, it.matched) for key, it in self.callbacks.items()}
+
+            start = perf_counter()
+            try:
+                return await run(*args, **kwargs)
+            finally:
+                wall_seconds = perf_counter() - start
+                self.visited += len(trace._tracker._visited)
+                callbacks = [it._since(before.get(key, CallbackProfile(it.name, it.kind))) for key, it in self.callbacks.items()]
+                profiler.runs.append(
+                    TraceRunProfile(
+                        trace=name,
+                        wall_seconds=wall_seconds,
+                        steps=self.steps,
+                        visits=self.visits,
+                        queued=self.queued,
+                        queue_high_water=self.queue_high_water,
+                        branches=self.branches,
+                        branch_queue_high_water=self.branch_queue_high_water,
+                        visited=self.visited,
+                        queue_next_seconds=self.queue_next_seconds,
+                        callbacks=sorted((it for it in callbacks if it.calls), key=lambda it: it.seconds, reverse=True)
+                    )
+                )
+
+        trace.run = profiled_run
+
+    def _reset_counts(self):
+        self.steps = self.visits = self.queued = self.queue_high_water = 0
+        self.branches = self.branch_queue_high_water = self.visited = 0
+        self.queue_next_seconds = 0.0
+        for it in self.callbacks.values():
+            it.max_seconds = 0.0
+
+    def _instrument(self, trace: NetworkTrace):
+        # Applied to the trace and to each of its branches as they are created.
+        self._instrument_callbacks(trace)
+        self._instrument_queues(trace)
+
+        can_visit_item = trace.can_visit_item
+
+        def counted_can_visit_item(item, context) -> bool:
+            self.steps += 1
+            visited = can_visit_item(item, context)
+            if visited:
+                self.visits += 1
+            return visited
+
+        trace.can_visit_item = counted_can_visit_item
+
+        queue_next = trace.queue_next
+
+        def timed_queue_next(current, context):
+            start = perf_counter()
+            try:
+                return queue_next(current, context)
+            finally:
+                self.queue_next_seconds += perf_counter() - start
+
+        trace.queue_next = timed_queue_next
+
+        create_new_this = trace.create_new_this
+
+        def instrumented_create_new_this() -> NetworkTrace:
+            branch = create_new_this()
+            self._instrument(branch)
+
+            run = branch.run
+
+            async def counted_run(*args, **kwargs):
+                self.branches += 1
+                try:
+                    return await run(*args, **kwargs)
+                finally:
+                    self.visited += len(branch._tracker._visited)
+
+            branch.run = counted_run
+            return branch
+
+        trace.create_new_this = instrumented_create_new_this
+
+    def _instrument_queues(self, trace: NetworkTrace):
+        queue = trace.queue
+        append = queue.append
+
+        def counted_append(item) -> bool:
+            appended = append(item)
+            if appended:
+                self.queued += 1
+                self.queue_high_water = max(self.queue_high_water, len(queue))
+            return appended
+
+        queue.append = counted_append
+
+        branch_queue = trace.branch_queue
+        if branch_queue is not None:
+            branch_append = branch_queue.append
+
+            def counted_branch_append(item) -> bool:
+                appended = branch_append(item)
+                self.branch_queue_high_water = max(self.branch_queue_high_water, len(branch_queue))
+                return appended
+
+            branch_queue.append = counted_branch_append
+
+    def _instrument_callbacks(self, trace: NetworkTrace):
+        for condition in trace.queue_conditions:
+            self._wrap(condition, "queue condition", "should_queue", "should_queue_start_item")
+        for condition in trace.stop_conditions:
+            self._wrap(condition, "stop condition", "should_stop")
+        for action in trace.step_actions:
+            self._wrap(action, "step action", "apply")
+
+    def _wrap(self, callback: Any, kind: str, *method_names: str):
+        # Branches share their parent's condition and action instances, so each instance is only wrapped once.
+        if id(callback) in self.callbacks:
+            return
+
+        profile = CallbackProfile(_callback_name(callback), kind)
+        self.callbacks[id(callback)] = profile
+        for method_name in method_names:
+            setattr(callback, method_name, _timed(getattr(callback, method_name), profile))
+
+
+def _timed(func: Callable, profile: CallbackProfile) -> Callable:
+    def record(start: float, result: Any):
+        seconds = perf_counter() - start
+        profile.calls += 1
+        profile.seconds += seconds
+        if seconds > profile.max_seconds:
+            profile.max_seconds = seconds
+        if result is True:
+            profile.matched += 1
+
+    async def awaited(start: float, result: Any) -> Any:
+        result = await result
+        record(start, result)
+        return result
+
+    def timed(*args):
+        start = perf_counter()
+        result = func(*args)
+        if inspect.iscoroutine(result):
+            return awaited(start, result)
+        record(start, result)
+        return result
+
+    return timed
+
+
+def _callback_name(callback: Any) -> str:
+    # Conditions and actions added as functions are wrapped in an instance of the SDK's own classes, so name them after the function rather than the class.
+    if isinstance(callback, StepAction):
+        func = callback._func
+    elif isinstance(callback, StopCondition):
+        func = getattr(callback, "should_stop_matched_step", None) or callback.__dict__.get("should_stop")
+    elif isinstance(callback, QueueCondition):
+        func = getattr(callback, "should_queue_matched_step", None) or callback.__dict__.get("should_queue")
+    else:
+        func = None
+
+    code = getattr(func, "__code__", None)
+    if code is None or inspect.ismethod(func):
+        return type(callback).__name__
+    return f"{func.__qualname__} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+async def main():
+    from zepben.ewb import Breaker, NetworkTraceActionType, PowerTransformer, Tracing, TraversalQueue, stop_at_open
+
+    from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+    network = build_synthetic_feeder(backbone_spans=200, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network)
+    feeder_head = network.get("synthetic_fdr_br", Breaker)
+
+    profiler = TraceProfiler()
+
+    def count_transformers(step, _):
+        if isinstance(step.path.to_equipment, PowerTransformer):
+            transformers.add(step.path.to_equipment.mrid)
+
+    def describe_step(step, _):
+        descriptions.append(f"{step.path.from_equipment.mrid} -> {step.path.to_equipment.mrid} on {sorted(it.name for it in step.path.to_phases_set())}")
+
+    traces = {
+        "depth first": Tracing.network_trace(queue=TraversalQueue.depth_first()),
+        "breadth first": Tracing.network_trace(queue=TraversalQueue.breadth_first()),
+        "all steps": Tracing.network_trace(action_step_type=NetworkTraceActionType.ALL_STEPS),
+        "branching": Tracing.network_trace_branching(),
+    }
+    for name, trace in traces.items():
+        transformers = set()
+        descriptions = []
+        profiler.instrument(
+            trace.add_condition(stop_at_open())
+            .add_step_action(count_transformers)
+            .add_step_action(describe_step),
+            name=name
+        )
+        await trace.run(feeder_head.get_terminal_by_sn(2), can_stop_on_start_item=False)
+
+    print(profiler.report(top=3))
+    print()
+    print("Slowest callbacks over every run:")
+    for it in profiler.callbacks():
+        print(f"    {it.seconds * 1000:8.2f} ms {it.calls:8d} calls, {it.mean_seconds * 1e6:6.2f} us mean  {it.kind}: {it.name}")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
@@ -237,6 +237,31 @@ async def network_trace_conditions():
         visited.clear()
         reset_switch()
 
+    async def conditions_stop_at_open_overlay():
+        """
+        The same trace, but opening the switch in a :class:`NetworkOverlay` rather than on the network, so there is nothing to reset afterwards. The
+        overlay's `state_operators` are passed to the trace in place of `NetworkStateOperators.NORMAL`.
+        """
+        from zepben.ewb import Tracing, stop_at_open, Switch
+        from zepben.examples.network_overlay import NetworkOverlay
+
+        print_heading("Network Trace Stopping at open equipment in an overlay:")
+
+        overlay = NetworkOverlay(NetworkStateOperators.NORMAL).set_open(network.get("sw_671_692", Switch), True)
+        print("Switch set to normally open in the overlay\n")
+
+        await (
+            Tracing.network_trace(network_state_operators=overlay.state_operators)
+            .add_step_action(print_step)
+            .add_condition(stop_at_open())
+        ).run(start_item)
+
+        print(f"Number of equipment visited: {len(visited)}")
+        print(f"Switch is normally open on the network (unchanged): {switch.is_normally_open()}")
+        print()
+
+        visited.clear()
+
     async def conditions_downstream():
         """
         You can specify a direction to trace to achieve a directed network trace.
@@ -290,6 +315,7 @@ async def network_trace_conditions():
         reset_switch()
 
     await conditions_stop_at_open()
+    await conditions_stop_at_open_overlay()
     await conditions_downstream()
     await conditions_limit_equipment_steps()
 
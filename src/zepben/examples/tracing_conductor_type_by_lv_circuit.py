@@ -4,97 +4,145 @@
 #  License, v. 2.0. If a copy of the MPL was not distributed with this
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+"""
+Reports the length of each type of conductor supplied by each transformer, writing a CSV per feeder to ./csvs as each feeder is fetched.
+
+Each feeder is walked once with a `FeederDeviceHierarchy`, which gives every `AcLineSegment` its nearest supplying transformer, rather than running a
+downstream trace from every transformer. The lines are then grouped by transformer and conductor type with pandas. A transformer is marked as looped when
+any line it supplies is on a loop found by the walk, rather than when one of its own terminals has a feeder direction of BOTH, which misses loops in the
+circuits it supplies.
+"""
+
 import asyncio
-import csv
 import json
 import os
-from typing import List, Union, Tuple, Optional, Dict
+import sys
+from typing import Optional, Set, Type
 
-from zepben.ewb import NetworkConsumerClient, PhaseCode, AcLineSegment, FeederDirection, connect_with_token, \
-    Tracing, downstream, NetworkTraceStep, ConductingEquipment, PowerTransformer, IncludedEnergizedContainers
+import pandas as pd
+from zepben.ewb import NetworkConsumerClient, AcLineSegment, connect_with_token, Feeder, NetworkService, NetworkStateOperators, LoadBreakSwitch, PhaseCode, \
+    Terminal
 
-LineInfo = Tuple[str, str, Optional[Union[int, float]]]
+from zepben.examples.feeder_device_hierarchy import FeederDeviceHierarchy
+from zepben.examples.feeder_fetch_pool import FeederFetchPool
+from zepben.examples.feeder_snapshot_cache import FeederSnapshotCache
 
+# Set this to a `FeederSnapshotCache` to only download each feeder from the EWB server once per network model. See feeder_snapshot_cache.py.
+snapshot_cache: Optional[FeederSnapshotCache] = None
 
-async def main():
-    with open("config.json") as f:
-        c = json.loads(f.read())
 
-    print("Connecting to Server")
-    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
+def lines_by_transformer(feeder: Feeder, network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL) -> pd.DataFrame:
+    """
+    Every `AcLineSegment` reached from the head of `feeder`, with the transformer that supplies it, from a single walk of the feeder.
 
-    client = NetworkConsumerClient(channel)
-    result = (await client.get_network_hierarchy()).throw_on_error().result
-    print("Connection Established")
+    Returns a row per line with columns "transformer", "line", "line_type", "length" and "loop", where "line_type" is the name of the line's asset
+    info, if it has any, and "loop" is whether the line is on a loop. Lines that are not supplied through a transformer are left out.
+    """
+    hierarchy = FeederDeviceHierarchy(feeder, network_state_operators)
+    looped = _on_loops(hierarchy)
 
-    tx_to_line_type: Dict[str, Tuple[List[LineInfo], bool]] = {}
+    transformers = []
+    lines = []
+    line_types = []
+    lengths = []
+    for equipment in hierarchy.equipment:
+        if not isinstance(equipment, AcLineSegment) or (transformer := hierarchy.transformer(equipment)) is None:
+            continue
 
-    os.makedirs("csvs", exist_ok=True)
-    for feeder in result.feeders.values():
-        print(f"Fetching {feeder.mrid}")
-        if not (network := await get_feeder_network(channel, feeder.mrid)):  # Skip feeders that fail to pull down
-            print(f"Failed to retrieve feeder {feeder.mrid}")
+        transformers.append(transformer.mrid)
+        lines.append(equipment.mrid)
+        line_types.append(equipment.asset_info.name if equipment.asset_info is not None else None)
+        lengths.append(equipment.length)
+
+    frame = pd.DataFrame({"transformer": transformers, "line": lines, "line_type": line_types, "length": pd.array(lengths, dtype="Float64")})
+    frame["loop"] = frame["line"].isin(looped)
+    return frame
+
+
+def _on_loops(hierarchy: FeederDeviceHierarchy) -> Set[str]:
+    # Each loop runs up from both of its ends to the first equipment their paths to the head share.
+    on_loops = set()
+    for a, b in hierarchy.loops:
+        above_b = {it.mrid for it in hierarchy.path_to_head(b)}
+        for it in hierarchy.path_to_head(a):
+            on_loops.add(it.mrid)
+            if it.mrid in above_b:
+                meets = it.mrid
+                break
+        else:
             continue
-        for io in network.objects(PowerTransformer):
-            print(io)
-            _loop = False
 
-            for t in io.terminals:
-                t_dir = t.normal_feeder_direction
-                if t_dir == FeederDirection.BOTH:
-                    _loop = True
+        for it in hierarchy.path_to_head(b):
+            if it.mrid == meets:
+                break
+            on_loops.add(it.mrid)
+    return on_loops
 
 
-            tx_to_line_type[io.mrid] = (await get_downstream_trace(io, PhaseCode.ABCN), _loop)
-        await save_to_csv(tx_to_line_type, feeder.mrid)
+def conductor_types_by_transformer(lines: pd.DataFrame) -> pd.DataFrame:
+    """
+    The total length and number of lines of each conductor type supplied by each transformer, from the rows of `lines_by_transformer`.
 
+    Returns a row per transformer and line type with columns "transformer", "line_type", "lines", "length" and "loop", where "loop" is whether any line
+    the transformer supplies is on a loop. Lines without asset info are counted under a line type of None, and lines without a length add nothing to
+    the length.
+    """
+    grouped = lines.groupby(["transformer", "line_type"], dropna=False, sort=True).agg(lines=("line", "size"), length=("length", "sum")).reset_index()
+    grouped["loop"] = grouped["transformer"].map(lines.groupby("transformer")["loop"].any())
+    return grouped
 
-async def save_to_csv(data: Dict[str, Tuple[List[LineInfo], bool]], feeder_mrid):
-    filename = f"csvs/conductor_types_{feeder_mrid}.csv"
-    with open(filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Feeder", "Transformer", "Line", "Line Type", "Length", "Loop"])
 
-        for transformer, (values, loop) in data.items():
-            for value in values:
-                line, line_type, length = value
-                switch_data = [feeder_mrid, transformer, line, line_type, length, loop]
-                writer.writerow(switch_data)
+def write_csv(conductor_types: pd.DataFrame, feeder_mrid: str):
+    os.makedirs("csvs", exist_ok=True)
+    conductor_types.assign(feeder=feeder_mrid)[["feeder", *conductor_types.columns]].to_csv(f"csvs/conductor_types_{feeder_mrid}.csv", index=False)
 
-    print(f"Data saved to {filename}")
 
+async def looped_feeder_example():
+    """
+    Report a synthetic feeder tied to its neighbour at the end of its backbone, closing a loop back through the zone substation bus. The backbones of both
+    feeders have a feeder direction of BOTH, so every tee off them meets the backbone at a junction with terminals in both directions, but only the lines
+    on the loop itself are marked as looped, not the transformer tees and LV circuits off it.
 
-async def get_feeder_network(channel, feeder_mrid):
-    client = NetworkConsumerClient(channel)
-    result = (
-        await client.get_equipment_container(
-            mrid=feeder_mrid,
-            include_energized_containers=IncludedEnergizedContainers.LV_FEEDERS
-        )
-    )
-    if result.was_failure:
-        print(f"Failed: {result.thrown}")
-        return None
-    return client.service
+    This runs without an EWB server: `python tracing_conductor_type_by_lv_circuit.py looped-example`.
+    """
+    from zepben.examples.synthetic_feeder import assign_directions_and_feeders, build_synthetic_network
+
+    network = build_synthetic_network(regions=1, substations_per_region=1, feeders_per_substation=2, backbone_spans=10)
+    tie = LoadBreakSwitch(mrid="tie")
+    for backbone_end in ("zs_0_0_fdr_0_mv_9", "zs_0_0_fdr_1_mv_9"):
+        terminal = Terminal(mrid=f"tie_{backbone_end}", phases=PhaseCode.ABCN)
+        tie.add_terminal(terminal)
+        network.add(terminal)
+        network.connect_terminals(terminal, network.get(backbone_end, AcLineSegment).get_terminal_by_sn(2))
+    network.add(tie)
+    await assign_directions_and_feeders(network)
+
+    feeder = network.get("zs_0_0_fdr_0", Feeder)
+    lines = lines_by_transformer(feeder)
+    print(f"{feeder.mrid} has {len(list(FeederDeviceHierarchy(feeder).loops))} loop, with {lines['loop'].sum()} of the {len(lines)} lines it reaches on it:")
+    print(conductor_types_by_transformer(lines).to_string(index=False))
 
 
-async def get_downstream_trace(ce: ConductingEquipment, phase_code: PhaseCode) -> List[LineInfo]:
-    l_type: List[LineInfo] = []
+async def main():
+    with open("config.json") as f:
+        c = json.loads(f.read())
+
+    print("Connecting to Server")
+    channel = connect_with_token(host=c["host"], access_token=c["access_token"], rpc_port=c["rpc_port"])
 
-    def collect_eq_in(step: NetworkTraceStep, _):
-        if isinstance(equip := step.path.to_equipment, AcLineSegment):
-            nonlocal l_type
-            l_type.append((equip.mrid, equip.asset_info.name, equip.length or 0))
+    client = NetworkConsumerClient(channel)
+    result = (await client.get_network_hierarchy()).throw_on_error().result
+    print("Connection Established")
 
-    await (
-        Tracing.network_trace()
-        .add_condition(downstream())
-        .add_step_action(collect_eq_in)
-    ).run(start=ce, phases=phase_code)
+    # Each feeder is reported as soon as it arrives, and dropped once its CSV has been written.
+    def write_feeder(feeder_mrid: str, network: NetworkService):
+        write_csv(conductor_types_by_transformer(lines_by_transformer(network.get(feeder_mrid, Feeder))), feeder_mrid)
+        print(f"Data saved to csvs/conductor_types_{feeder_mrid}.csv")
 
-    return l_type
+    results = await FeederFetchPool(channel, max_in_flight=4, snapshot_cache=snapshot_cache).run(result.feeders, write_feeder)
+    for feeder_mrid, error in results.failed.items():
+        print(f"Failed to process {feeder_mrid}: {error}")
 
 
 if __name__ == "__main__":
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main())
+    asyncio.run(looped_feeder_example() if sys.argv[1:] == ["looped-example"] else main())
@@ -11,12 +11,14 @@ import asyncio
 import json
 import os.path
 from dataclasses import dataclass
-import pandas as pd
 
-from zepben.ewb import NetworkConsumerClient, connect_with_token, PowerTransformer
+from zepben.ewb import connect_with_token, PowerTransformer, NetworkService, IncludedEnergizedContainers
 
-OUTPUT_FILE = "transformer_id_mapping.csv"
-HEADER = True
+from zepben.examples.columnar_dataset import ColumnarDatasetWriter, arrow_schema
+from zepben.examples.network_hierarchy_browser import NetworkHierarchyBrowser
+
+# A Parquet dataset, which can be read back with `pd.read_parquet(OUTPUT_DIR)`.
+OUTPUT_DIR = "transformer_id_mapping"
 
 with open("./config.json") as f:
     c = json.loads(f.read())
@@ -24,26 +26,26 @@ with open("./config.json") as f:
 
 async def connect():
     channel = connect_with_token(host=c["host"], rpc_port=c["rpc_port"], access_token=c["access_token"], ca_filename=c["ca_path"])
-    network_client = NetworkConsumerClient(channel=channel)
 
-    if os.path.exists(OUTPUT_FILE):
-        print(f"Output file {OUTPUT_FILE} already exists, please delete it if you would like to regenerate.")
+    if os.path.exists(OUTPUT_DIR):
+        print(f"Output {OUTPUT_DIR} already exists, please delete it if you would like to regenerate.")
         return
 
-    network_hierarchy = (await network_client.get_network_hierarchy()).throw_on_error().value
+    # Only the containers that are processed are fetched, with the next two fetched while the current one is processed. See network_hierarchy_browser.py.
+    browser = NetworkHierarchyBrowser(channel, prefetch=2, include_energized_containers=IncludedEnergizedContainers.NONE)
 
     print("Network hierarchy:")
-    for gr in network_hierarchy.geographical_regions.values():
-        print(f"- Geographical region: {gr.name}")
-        for sgr in gr.sub_geographical_regions:
-            print(f"  - Subgeographical region: {sgr.name}")
-            for sub in sgr.substations:
-                print(f"    - Zone Substation: {sub.name}")
-                await process_nodes(sub.mrid, channel)
-                for fdr in sub.feeders:
-                    print(f"      - Processing Feeder: {fdr.name}")
-                    await process_nodes(fdr.mrid, channel)
-                return  # Only process the first zone...
+    gr = (await browser.children(limit=1))[0]
+    print(f"- Geographical region: {gr.name}")
+    sgr = (await browser.children(gr, limit=1))[0]
+    print(f"  - Subgeographical region: {sgr.name}")
+    sub = (await browser.children(sgr, limit=1))[0]  # Only process the first zone...
+    print(f"    - Zone Substation: {sub.name}")
+
+    with ColumnarDatasetWriter(OUTPUT_DIR, arrow_schema(NetworkObject)) as writer:
+        async for container_mrid, network_service in browser.walk([sub, *await browser.children(sub)]):
+            print(f"      - Processing: {network_service.get(container_mrid).name}")
+            process_nodes(container_mrid, network_service, writer)
 
 
 @dataclass
@@ -54,12 +56,7 @@ class NetworkObject(object):
     container_mrid: str
 
 
-async def process_nodes(container_mrid: str, channel):
-    global HEADER
-    print("Fetching from server ...")
-    network_client = NetworkConsumerClient(channel=channel)
-    network_service = network_client.service
-    (await network_client.get_equipment_container(container_mrid)).throw_on_error()
+def process_nodes(container_mrid: str, network_service: NetworkService, writer: ColumnarDatasetWriter):
     container = network_service.get(container_mrid)
     container_name = container.name
 
@@ -69,11 +66,8 @@ async def process_nodes(container_mrid: str, channel):
         no = NetworkObject(equip.mrid, equip.name, container_name, container_mrid)
         network_objects.append(no)
 
-    network_objects = pd.DataFrame(network_objects)
-    network_objects.to_csv(OUTPUT_FILE, index=False, mode='a', header=HEADER)
+    writer.write_records(network_objects)
     print(f"Finished processing {container_mrid}")
-    if HEADER:
-        HEADER = False
 
 
 if __name__ == "__main__":
@@ -0,0 +1,293 @@
+#  Copyright 2026 Zeppelin Bend Pty Ltd
+#
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Answers "which distribution substation, switch or breaker supplies this customer" without running a trace per question.
+
+The index is built once from a compiled `NetworkGraph`, by tracing out from the head of every feeder and recording, for each piece of equipment reached,
+the equipment it was reached from and the nearest `PowerTransformer`, `Switch` and `Breaker` at or above it, along with the feeder head it is supplied from.
+Each lookup is then a dictionary lookup of the equipment's index followed by an array lookup.
+
+When switches are operated, `refresh` repairs the index in place: everything that was supplied through a switch that opened is detached and reattached
+through whatever alternative supply it has, and anything newly supplied through a switch that closed is attached below it. The rest of the index is left
+alone, so a switching operation only costs in proportion to the part of the network it affects.
+"""
+
+from typing import Dict, Iterable, List, Optional, Type, Union
+
+import numba
+import numpy as np
+from zepben.ewb import Breaker, ConductingEquipment, Feeder, NetworkStateOperators, PowerTransformer, Switch, UsagePoint
+
+from zepben.examples.network_graph import NetworkGraph
+
+__all__ = ["UpstreamIndex"]
+
+_NONE = -1
+
+_TRANSFORMER = 0
+_SWITCH = 1
+_BREAKER = 2
+_HEAD = 3
+
+
+class UpstreamIndex:
+    """
+    The supply path of every piece of equipment on one or more feeders.
+
+    Equipment is supplied through anything that is in service and not open on all of its phases, regardless of feeder direction, so the index follows the
+    network as it is switched, including supply back fed from a neighbouring feeder through a closed open point. Where there is more than one path to a
+    piece of equipment, it is supplied from the one it was first reached through, which is the path with the fewest pieces of equipment when the index is
+    built.
+
+    :param graph: The compiled network.
+    :param feeders: The feeders to index, which should all be in `graph`. Defaults to every feeder in the network the graph was compiled from.
+    :param network_state_operators: The state of the network to index.
+    """
+
+    def __init__(
+        self,
+        graph: NetworkGraph,
+        feeders: Iterable[Feeder] = None,
+        network_state_operators: Type[NetworkStateOperators] = NetworkStateOperators.NORMAL
+    ):
+        self.graph = graph
+        self._state_operators = network_state_operators
+
+        n = len(graph)
+        self._kinds = np.zeros((n, 4), dtype=np.bool_)
+        for i, equipment in enumerate(graph.equipment):
+            self._kinds[i, _TRANSFORMER] = isinstance(equipment, PowerTransformer)
+            self._kinds[i, _SWITCH] = isinstance(equipment, Switch)
+            self._kinds[i, _BREAKER] = isinstance(equipment, Breaker)
+
+        # Supply only leaves a feeder head through its head terminal, so the trace does not escape back up into the zone substation.
+        self._exit_terminal = np.full(n, _NONE, dtype=np.int32)
+        self._feeders: Dict[int, Feeder] = {}
+        for feeder in graph.network.objects(Feeder) if feeders is None else feeders:
+            terminal = feeder.normal_head_terminal
+            if terminal is None or terminal.conducting_equipment is None or terminal.conducting_equipment.mrid not in graph.index:
+                continue
+
+            head = graph.index[terminal.conducting_equipment.mrid]
+            self._feeders[head] = feeder
+            self._kinds[head, _HEAD] = True
+            self._exit_terminal[head] = graph.terminals.index(terminal, graph.equipment_terminals[head], graph.equipment_terminals[head + 1])
+
+        self._passable = graph.passable(network_state_operators).copy()
+        self._reached = np.zeros(n, dtype=np.bool_)
+        self._parent = np.full(n, _NONE, dtype=np.int32)
+        self._ancestors = np.full((n, 4), _NONE, dtype=np.int32)
+
+        heads = np.array(sorted(self._feeders), dtype=np.int32)
+        for head in heads:
+            self._reached[head] = True
+            self._ancestors[head] = np.where(self._kinds[head], head, _NONE)
+
+        self._order = np.concatenate([heads, self._attach(heads)])
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, equipment: Union[ConductingEquipment, UsagePoint]) -> bool:
+        return self._index(equipment) != _NONE
+
+    def transformer(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[PowerTransformer]:
+        """The nearest `PowerTransformer` at or above `equipment`, e.g. the distribution substation supplying a customer."""
+        return self._lookup(equipment, _TRANSFORMER)
+
+    def switch(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[Switch]:
+        """The nearest `Switch` of any kind, including breakers and fuses, at or above `equipment`."""
+        return self._lookup(equipment, _SWITCH)
+
+    def breaker(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[Breaker]:
+        """The nearest `Breaker` at or above `equipment`."""
+        return self._lookup(equipment, _BREAKER)
+
+    def feeder_head(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[ConductingEquipment]:
+        """The head equipment of the feeder `equipment` is currently supplied from."""
+        return self._lookup(equipment, _HEAD)
+
+    def feeder(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[Feeder]:
+        """The feeder `equipment` is currently supplied from, or None if it is not supplied."""
+        index = self._index(equipment)
+        return self._feeders[self._ancestors[index, _HEAD]] if index != _NONE else None
+
+    def parent(self, equipment: Union[ConductingEquipment, UsagePoint]) -> Optional[ConductingEquipment]:
+        """The equipment `equipment` is supplied through, or None for a feeder head."""
+        index = self._index(equipment)
+        return self.graph.equipment[self._parent[index]] if index != _NONE and self._parent[index] != _NONE else None
+
+    def refresh(self, switches: Iterable[Switch]):
+        """
+        Update the index after the open state of `switches` has changed in the network.
+
+        :param switches: The switches that were opened or closed. Other switches are assumed to be unchanged.
+        """
+        indexes = self.graph.index_of(switches)
+        self.graph.refresh(self.graph.equipment_at(indexes), self._state_operators)
+        was_passable = self._passable[indexes]
+        self._passable[indexes] = self.graph.passable(self._state_operators)[indexes]
+
+        opened = indexes[was_passable & ~self._passable[indexes] & self._reached[indexes]]
+        closed = indexes[~was_passable & self._passable[indexes] & self._reached[indexes]]
+
+        seeds = closed
+        if len(opened):
+            detached = _detach(self._order, self._parent, self._reached, self._ancestors, opened)
+            self._order = self._order[self._reached[self._order]]
+            seeds = np.concatenate([seeds, _boundary(self.graph.indptr, self.graph.indices, detached, self._reached, self._passable)])
+
+        if len(seeds):
+            self._order = np.concatenate([self._order, self._attach(np.unique(seeds))])
+
+    def _attach(self, seeds: np.ndarray) -> np.ndarray:
+        return _attach(
+            self.graph.indptr, self.graph.indices, self.graph.edge_from_terminal, self.graph.edge_phases, self._passable,
+            self.graph.state(self._state_operators).in_service, self._exit_terminal, self._kinds,
+            seeds, self._reached, self._parent, self._ancestors
+        )
+
+    def _index(self, equipment: Union[ConductingEquipment, UsagePoint]) -> int:
+        if isinstance(equipment, UsagePoint):
+            equipment = next((e for e in equipment.equipment if isinstance(e, ConductingEquipment)), None)
+            if equipment is None:
+                return _NONE
+
+        index = self.graph.index.get(equipment.mrid, _NONE)
+        return index if index != _NONE and self._reached[index] else _NONE
+
+    def _lookup(self, equipment: Union[ConductingEquipment, UsagePoint], kind: int) -> Optional[ConductingEquipment]:
+        index = self._index(equipment)
+        if index == _NONE:
+            return None
+
+        ancestor = self._ancestors[index, kind]
+        return self.graph.equipment[ancestor] if ancestor != _NONE else None
+
+
+@numba.njit(cache=True)
+def _attach(indptr, indices, edge_from, edge_phases, passable, in_service, exit_terminal, kinds, seeds, reached, parent, ancestors):
+    # Breadth first from the seeds, which are already attached, into anything in service that is not yet attached. Open switches are attached but not
+    # passed through. Each piece of equipment inherits the ancestors of the one it is reached from, replacing any kind it is itself.
+    queue = np.empty(len(reached), dtype=np.int32)
+    head = 0
+    tail = 0
+    for s in seeds:
+        queue[tail] = s
+        tail += 1
+
+    attached = np.empty(len(reached), dtype=np.int32)
+    count = 0
+    while head < tail:
+        current = queue[head]
+        head += 1
+        if not passable[current]:
+            continue
+
+        for e in range(indptr[current], indptr[current + 1]):
+            if exit_terminal[current] != -1 and edge_from[e] != exit_terminal[current]:
+                continue
+
+            next_equipment = indices[e]
+            if reached[next_equipment] or edge_phases[e] == 0 or not in_service[next_equipment]:
+                continue
+
+            reached[next_equipment] = True
+            parent[next_equipment] = current
+            for k in range(ancestors.shape[1]):
+                ancestors[next_equipment, k] = next_equipment if kinds[next_equipment, k] else ancestors[current, k]
+
+            attached[count] = next_equipment
+            count += 1
+            queue[tail] = next_equipment
+            tail += 1
+
+    return attached[:count]
+
+
+@numba.njit(cache=True)
+def _detach(order, parent, reached, ancestors, opened):
+    # `order` lists parents before their children, so a single pass finds everything below the opened switches.
+    detached = np.zeros(len(reached), dtype=np.bool_)
+    below = np.zeros(len(reached), dtype=np.bool_)
+    for s in opened:
+        below[s] = True
+
+    count = 0
+    for i in order:
+        p = parent[i]
+        if p != -1 and (below[p] or detached[p]):
+            detached[i] = True
+            reached[i] = False
+            parent[i] = -1
+            ancestors[i, :] = -1
+            count += 1
+
+    result = np.empty(count, dtype=np.int32)
+    j = 0
+    for i in order:
+        if detached[i]:
+            result[j] = i
+            j += 1
+    return result
+
+
+@numba.njit(cache=True)
+def _boundary(indptr, indices, detached, reached, passable):
+    # The attached equipment that detached equipment could be supplied back through.
+    seen = np.zeros(len(reached), dtype=np.bool_)
+    boundary = np.empty(len(reached), dtype=np.int32)
+    count = 0
+    for i in detached:
+        for e in range(indptr[i], indptr[i + 1]):
+            neighbour = indices[e]
+            if reached[neighbour] and passable[neighbour] and not seen[neighbour]:
+                seen[neighbour] = True
+                boundary[count] = neighbour
+                count += 1
+    return boundary[:count]
+
+
+async def main():
+    from time import perf_counter
+
+    from zepben.ewb import EnergyConsumer, Fuse
+
+    from zepben.examples.synthetic_feeder import build_synthetic_feeder, assign_directions_and_feeders
+
+    network = build_synthetic_feeder(backbone_spans=100, lv_circuits_per_transformer=4, spans_per_lv_circuit=10)
+    await assign_directions_and_feeders(network)
+
+    start = perf_counter()
+    index = UpstreamIndex(NetworkGraph(network))
+    print(f"Indexed {len(index)} equipment in {(perf_counter() - start) * 1000:.1f} ms")
+
+    consumers: List[EnergyConsumer] = list(network.objects(EnergyConsumer))
+    start = perf_counter()
+    for consumer in consumers:
+        index.transformer(consumer)
+        index.breaker(consumer)
+    print(f"Looked up the transformer and breaker of {len(consumers)} consumers in {(perf_counter() - start) * 1000:.1f} ms")
+
+    consumer = consumers[0]
+    print(f"{consumer.mrid} is supplied by {index.transformer(consumer)}, {index.switch(consumer)} and {index.breaker(consumer)} on {index.feeder(consumer)}")
+
+    fuse = index.switch(consumer)
+    if isinstance(fuse, Fuse):
+        fuse.set_normally_open(True)
+        index.refresh([fuse])
+        print(f"After opening {fuse.mrid}, {consumer.mrid} is supplied by {index.transformer(consumer)}")
+
+        fuse.set_normally_open(False)
+        index.refresh([fuse])
+        print(f"After closing {fuse.mrid}, {consumer.mrid} is supplied by {index.transformer(consumer)}")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
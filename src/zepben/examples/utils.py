@@ -4,9 +4,12 @@
 #  License, v. 2.0. If a copy of the MPL was not distributed with this
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import json
-from typing import Dict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Union
 
 from zepben.eas import EasClient
+from zepben.ewb import LocalEwbDataFilePaths, DatabaseType
 
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
@@ -38,3 +41,19 @@ def get_client(config_dir, async_=True):
         ca_filename=auth_config["eas_server"].get("ca_filename"),
         asynchronous=async_
     )
+
+
+def get_available_dates(ewb_data_dir: Union[Path, str], database_type: DatabaseType) -> List[date]:
+    # Each database lives in a directory named after its date, so check every dated directory for a database of the requested type.
+    data_paths = LocalEwbDataFilePaths(Path(ewb_data_dir))
+    available_dates = []
+    for path in data_paths.enumerate_descendants():
+        try:
+            database_date = date.fromisoformat(path.name)
+        except ValueError:
+            continue
+
+        if data_paths.resolve(database_type, database_date).exists():
+            available_dates.append(database_date)
+
+    return sorted(available_dates)